@@ -0,0 +1,95 @@
+"""
+Move audit entries older than the retention window into a compressed archive collection.
+
+    python -m archive_audit_logs --months 12 --batch-size 1000 --pause 0.2
+
+audit_logs keeps the last AUDIT_RETENTION_MONTHS months (0 disables archiving). Older
+entries are copied to AUDIT_ARCHIVE_COLLECTION, created on first run with the
+AUDIT_ARCHIVE_COMPRESSOR block compressor, and then deleted from audit_logs, oldest
+first, a batch at a time. Each batch is copied before it is deleted and keeps its _id,
+so an interrupted run is simply re-run.
+"""
+import os
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+from dotenv import load_dotenv
+from dateutil.relativedelta import relativedelta
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from mongodb.mongodb_db import get_db
+
+load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "0"))
+AUDIT_ARCHIVE_COLLECTION = os.getenv("AUDIT_ARCHIVE_COLLECTION", "audit_logs_archive")
+AUDIT_ARCHIVE_COMPRESSOR = os.getenv("AUDIT_ARCHIVE_COMPRESSOR", "zstd")
+DEFAULT_BATCH_SIZE = int(os.getenv("AUDIT_ARCHIVE_BATCH_SIZE", "1000"))
+DEFAULT_PAUSE_SECONDS = float(os.getenv("AUDIT_ARCHIVE_PAUSE", "0.2"))
+DUPLICATE_KEY = 11000
+
+
+async def ensure_archive_collection(db) -> None:
+    try:
+        await db.create_collection(
+            AUDIT_ARCHIVE_COLLECTION,
+            storageEngine={"wiredTiger": {"configString": f"block_compressor={AUDIT_ARCHIVE_COMPRESSOR}"}}
+        )
+        await db[AUDIT_ARCHIVE_COLLECTION].create_index([("company_id", 1), ("timestamp", -1)])
+        print(f"Created {AUDIT_ARCHIVE_COLLECTION} ({AUDIT_ARCHIVE_COMPRESSOR})")
+    except CollectionInvalid:
+        # Already exists
+        pass
+
+
+async def archive(months: int, batch_size: int, pause: float, dry_run: bool) -> None:
+    db = await get_db()
+    cutoff = datetime.utcnow() - relativedelta(months=months)
+    query = {"timestamp": {"$lt": cutoff}}
+
+    if dry_run:
+        count = await db.audit_logs.count_documents(query)
+        print(f"{count} audit entries older than {cutoff.isoformat()} would be archived")
+        return
+
+    await ensure_archive_collection(db)
+    archive_collection = db[AUDIT_ARCHIVE_COLLECTION]
+    archived = 0
+
+    while True:
+        batch = await db.audit_logs.find(query).sort("timestamp", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+        try:
+            await archive_collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Entries copied by an interrupted earlier run are fine; anything else stops the run
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+            if errors:
+                print(f"Audit archive stopped, {len(errors)} entries not copied: {errors[0].get('errmsg')}")
+                break
+        result = await db.audit_logs.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        archived += result.deleted_count
+        print(f"Audit archive: {archived} entries moved (up to {batch[-1]['timestamp'].isoformat()})")
+        await asyncio.sleep(pause)
+
+    print(f"Audit archive finished: {archived} entries older than {cutoff.isoformat()} moved to {AUDIT_ARCHIVE_COLLECTION}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive audit log entries past the retention window")
+    parser.add_argument("--months", type=int, default=AUDIT_RETENTION_MONTHS, help="Retention window in months (0 = disabled)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Entries per batch")
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE_SECONDS, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the entries that would move")
+    args = parser.parse_args()
+    if args.months <= 0:
+        print("Audit retention disabled (set AUDIT_RETENTION_MONTHS or pass --months)")
+        return
+    asyncio.run(archive(args.months, args.batch_size, args.pause, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from cache.memory_cache import LRUCache
+from mongodb.mongodb_db import get_db
+from gemini.gemini_utils import ANALYSIS_PROMPT_VERSION
+
+# Memoized Gemini results, keyed by (company, resume text, JD fingerprint, model, prompt version).
+# Tier 1: per-process LRU with TTL. Tier 2: Mongo collection with a TTL index on expires_at.
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "256"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(6 * 3600)))
+
+# JD fields that actually reach the prompt's scoring logic
+_JD_FINGERPRINT_FIELDS = ("required_experience", "min_experience", "max_experience")
+_JD_SKILL_FIELDS = ("primary_skills", "secondary_skills")
+
+_memory_tier = LRUCache(maxsize=ANALYSIS_CACHE_MAX_ENTRIES, ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS)
+
+
+def _normalize_name(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).lower()
+
+
+def resume_text_hash(resume_text: str) -> str:
+    """Hash of the resume text with whitespace collapsed, so re-extractions of the same file match."""
+    normalized = re.sub(r"\s+", " ", resume_text or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def jd_fingerprint(jd_data: Dict[str, Any]) -> str:
+    """Canonical hash of the Gemini-relevant JD fields (order and case of skills ignored)."""
+    canonical = {field: jd_data.get(field) for field in _JD_FINGERPRINT_FIELDS}
+    if isinstance(canonical["required_experience"], str):
+        canonical["required_experience"] = canonical["required_experience"].strip()
+    for field in _JD_SKILL_FIELDS:
+        canonical[field] = sorted({_normalize_name(s) for s in jd_data.get(field) or [] if s})
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def analysis_cache_key(
+    company_id: str,
+    resume_text: str,
+    jd_data: Dict[str, Any],
+    model_name: str,
+    token_budget: Optional[int] = None
+) -> str:
+    parts = [
+        ANALYSIS_PROMPT_VERSION,
+        # "Present" in the prompt resolves to the current month, so results roll over with it
+        datetime.now().strftime("%m/%Y"),
+        company_id or "",
+        model_name or "",
+        # The budget decides which sections of the resume reach the prompt
+        str(token_budget or ""),
+        resume_text_hash(resume_text),
+        jd_fingerprint(jd_data),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+async def get_cached_analysis(
+    company_id: str,
+    resume_text: str,
+    jd_data: Dict[str, Any],
+    model_name: str,
+    token_budget: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    key = analysis_cache_key(company_id, resume_text, jd_data, model_name, token_budget)
+    entry = _memory_tier.get(key)
+    if entry:
+        return entry["analysis"]
+
+    try:
+        db = await get_db()
+        doc = await db.analysis_cache.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+    except Exception as e:
+        print(f"Analysis cache lookup failed: {e}")
+        return None
+
+    if not doc:
+        return None
+
+    _memory_tier.set(key, {"analysis": doc["analysis"], "jd_tag": doc.get("jd_tag")})
+    return doc["analysis"]
+
+
+async def store_cached_analysis(
+    company_id: str,
+    resume_text: str,
+    jd_data: Dict[str, Any],
+    model_name: str,
+    analysis: Dict[str, Any],
+    token_budget: Optional[int] = None
+) -> None:
+    key = analysis_cache_key(company_id, resume_text, jd_data, model_name, token_budget)
+    jd_tag = _jd_tag(company_id, jd_data.get("client_name"), jd_data.get("jd_title"))
+    _memory_tier.set(key, {"analysis": analysis, "jd_tag": jd_tag})
+
+    try:
+        db = await get_db()
+        now = datetime.utcnow()
+        await db.analysis_cache.replace_one(
+            {"_id": key},
+            {
+                "analysis": analysis,
+                "jd_tag": jd_tag,
+                "model": model_name,
+                "prompt_version": ANALYSIS_PROMPT_VERSION,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ANALYSIS_CACHE_TTL_SECONDS)
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Analysis cache write failed: {e}")
+
+
+async def invalidate_jd_analyses(company_id: str, client_name: str, jd_title: str) -> int:
+    """
+    Drop cached analyses for a JD after it is edited.
+    Edited JDs already miss because the fingerprint changes; this just frees the space.
+    """
+    jd_tag = _jd_tag(company_id, client_name, jd_title)
+    removed = _memory_tier.discard_where(lambda _, entry: entry.get("jd_tag") == jd_tag)
+
+    try:
+        db = await get_db()
+        result = await db.analysis_cache.delete_many({"jd_tag": jd_tag})
+        removed += result.deleted_count
+    except Exception as e:
+        print(f"Analysis cache invalidation failed: {e}")
+    return removed
+
+
+def _jd_tag(company_id: str, client_name: Optional[str], jd_title: Optional[str]) -> str:
+    return f"{company_id}|{_normalize_name(client_name)}|{_normalize_name(jd_title)}"
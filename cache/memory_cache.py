@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with an optional per-entry TTL.
+    Safe to share between the event loop and worker threads.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: Optional[float] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def discard_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove every entry for which predicate(key, value) is true."""
+        with self._lock:
+            doomed = [k for k, (v, _) in self._entries.items() if predicate(k, v)]
+            for key in doomed:
+                del self._entries[key]
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,73 @@
+import os
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional
+
+from cache.memory_cache import LRUCache
+from mongodb.mongodb_db import get_db
+
+# Content-addressed cache of extracted resume text.
+# Tier 1: per-process LRU. Tier 2: Mongo collection shared by all uvicorn workers.
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "512"))
+RESUME_CACHE_TTL_DAYS = int(os.getenv("RESUME_CACHE_TTL_DAYS", "30"))
+
+_memory_tier = LRUCache(maxsize=RESUME_CACHE_MAX_ENTRIES)
+
+
+def compute_file_hash(file_content: bytes) -> str:
+    """SHA-256 hex digest of the uploaded bytes."""
+    return hashlib.sha256(file_content).hexdigest()
+
+
+async def get_cached_resume_text(file_hash: str) -> Optional[Dict]:
+    """
+    Look up previously extracted text for a file hash.
+    :return: {"resume_text", "parser", "page_count"} or None on miss
+    """
+    entry = _memory_tier.get(file_hash)
+    if entry:
+        return entry
+
+    try:
+        db = await get_db()
+        doc = await db.resume_text_cache.find_one_and_update(
+            {"_id": file_hash},
+            {"$set": {"last_used_at": datetime.utcnow()}, "$inc": {"hits": 1}}
+        )
+    except Exception as e:
+        print(f"Resume cache lookup failed: {e}")
+        return None
+
+    if not doc or not doc.get("resume_text"):
+        return None
+
+    entry = {
+        "resume_text": doc["resume_text"],
+        "parser": doc.get("parser", "unknown"),
+        "page_count": doc.get("page_count", 1),
+    }
+    _memory_tier.set(file_hash, entry)
+    return entry
+
+
+async def store_cached_resume_text(file_hash: str, resume_text: str, parser: str, page_count: int) -> None:
+    """Write extracted text to both tiers. Blank text is never cached."""
+    if not resume_text or not resume_text.strip():
+        return
+
+    entry = {"resume_text": resume_text, "parser": parser, "page_count": page_count}
+    _memory_tier.set(file_hash, entry)
+
+    try:
+        db = await get_db()
+        now = datetime.utcnow()
+        await db.resume_text_cache.update_one(
+            {"_id": file_hash},
+            {
+                "$set": {**entry, "last_used_at": now},
+                "$setOnInsert": {"created_at": now, "hits": 0}
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Resume cache write failed: {e}")
@@ -0,0 +1,73 @@
+# Response schema for analyze_resume_comprehensive (Gemini structured output).
+# Mirrors the result structure documented in the prompt; the SDK accepts the OpenAPI subset
+# with upper-case type names.
+
+_STRING = {"type": "STRING"}
+_BOOLEAN = {"type": "BOOLEAN"}
+_INTEGER = {"type": "INTEGER"}
+_STRING_LIST = {"type": "ARRAY", "items": _STRING}
+
+_POSITION = {
+    "type": "OBJECT",
+    "properties": {
+        "company": _STRING,
+        "title": _STRING,
+        # Raw dates; durations are computed locally by utils.experience_calculator
+        "start_date": _STRING,
+        "end_date": _STRING,
+        "domain": _STRING,
+        "is_internship": _BOOLEAN,
+        "employment_type": _STRING,
+    },
+    "required": ["company", "title", "start_date", "end_date", "is_internship", "employment_type"],
+}
+
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "candidate_info": {
+            "type": "OBJECT",
+            "properties": {"candidate_name": _STRING},
+            "required": ["candidate_name"],
+        },
+        "skill_analysis": {
+            "type": "OBJECT",
+            "properties": {
+                "match_score": _INTEGER,
+                "matching_skills": _STRING_LIST,
+                "missing_primary_skills": _STRING_LIST,
+                "matching_secondary_skills": _STRING_LIST,
+                "missing_secondary_skills": _STRING_LIST,
+            },
+            "required": ["match_score", "matching_skills", "missing_primary_skills", "missing_secondary_skills"],
+        },
+        "experience_analysis": {
+            "type": "OBJECT",
+            "properties": {"positions": {"type": "ARRAY", "items": _POSITION}},
+            "required": ["positions"],
+        },
+        "profile_feedback": {
+            "type": "OBJECT",
+            "properties": {
+                "freelancer_status": _BOOLEAN,
+                "has_linkedin": _BOOLEAN,
+                "linkedin_url": _STRING,
+                "has_email": _BOOLEAN,
+                "candidate_email": _STRING,
+                "has_mobile": _BOOLEAN,
+                "candidate_mobile": _STRING,
+            },
+            "required": ["freelancer_status", "has_linkedin", "has_email", "has_mobile"],
+        },
+        "suggestions": _STRING_LIST,
+        "summary": _STRING,
+    },
+    "required": [
+        "candidate_info",
+        "skill_analysis",
+        "experience_analysis",
+        "profile_feedback",
+        "suggestions",
+        "summary",
+    ],
+}
@@ -41,48 +41,93 @@ from typing import Optional
 import os
 import asyncio
 from llama_parse import LlamaParse
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+from cache.memory_cache import LRUCache
+from parsing.text_compaction import PAGE_SEPARATOR
+
+# Reusable LlamaParse clients, one per (api_key, result_type), shared by every request of a
+# company; LLAMA_PARSE_MAX_IN_FLIGHT caps concurrent parse jobs per API key.
+LLAMA_PARSE_MAX_IN_FLIGHT = int(os.getenv("LLAMA_PARSE_MAX_IN_FLIGHT", "4"))
+# Bounded like the Gemini registry, so rotated and per-tenant keys do not pile up
+LLAMA_CLIENT_REGISTRY_MAX = int(os.getenv("LLAMA_CLIENT_REGISTRY_MAX", "256"))
+
+_parsers = LRUCache(maxsize=LLAMA_CLIENT_REGISTRY_MAX)
+_semaphores = LRUCache(maxsize=LLAMA_CLIENT_REGISTRY_MAX)
 
-# ---------- ASYNC INITIALIZATION ----------
+
+# ---------- CLIENT REGISTRY ----------
 async def initialize_llama_parser(result_type: str = "json", api_key: str = None) -> Optional[LlamaParse]:
     """
-    Initializes LlamaParse asynchronously with the given result type and API key.
+    Returns the shared LlamaParse client for the given API key and result type,
+    creating it on first use.
     :param result_type: 'json' or 'text'
     :param api_key: Company-specific API key or None to use environment variable
-    :return: LlamaParse object or None
+    :return: LlamaParse object
     """
-    def _init_sync():
+    try:
         final_api_key = api_key or os.getenv("LLAMA_CLOUD_API_KEY")
         if not final_api_key:
             raise ValueError("No Llama API key provided and LLAMA_CLOUD_API_KEY environment variable not set.")
-        return LlamaParse(
-            api_key=final_api_key,
-            result_type=result_type,
-            verbose=True
-        )
-    
-    try:
-        return await asyncio.to_thread(_init_sync)
+
+        parser = _parsers.get((final_api_key, result_type))
+        if parser is None:
+            parser = LlamaParse(
+                api_key=final_api_key,
+                result_type=result_type,
+                verbose=False
+            )
+            _parsers.set((final_api_key, result_type), parser)
+        return parser
     except Exception as e:
         raise Exception(f"LlamaParse initialization failed: {str(e)}")
 
 
+def evict_llama_parsers(api_key: Optional[str]) -> None:
+    """Drop the clients of an API key that was replaced or revoked."""
+    if not api_key:
+        return
+    _parsers.discard_where(lambda key, _: key[0] == api_key)
+    _semaphores.pop(api_key)
+
+
+def _semaphore_for(api_key: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(api_key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLAMA_PARSE_MAX_IN_FLIGHT)
+        _semaphores.set(api_key, semaphore)
+    return semaphore
+
+
 # ---------- ASYNC PARSING ----------
+def _text_from_json_result(results: List[Dict[str, Any]]) -> str:
+    """Page text from a JSON parse result, using the markdown of the same page when its text is blank."""
+    pages = []
+    for result in results or []:
+        for page in result.get("pages", []):
+            text = page.get("text") or ""
+            if not text.strip():
+                text = page.get("md") or ""
+            if text.strip():
+                pages.append(text)
+    return PAGE_SEPARATOR.join(pages)
+
+
 async def parse_resume_with_llama(file_path: str, parser: LlamaParse) -> Optional[str]:
     """
-    Parse the resume asynchronously using a given LlamaParse parser.
+    Parse the resume with a single LlamaParse job through the async API.
+    The JSON result carries both the plain text and the markdown of every page,
+    so a blank text result never needs a second upload.
     :param file_path: Path to resume PDF
     :param parser: LlamaParse instance
     :return: Extracted text
     """
-    def _parse_sync():
-        documents = parser.load_data(file_path)
-        if documents:
-            return documents[0].text
-        else:
-            raise Exception("No documents returned from parser.")
-    
     try:
-        return await asyncio.to_thread(_parse_sync)
+        async with _semaphore_for(parser.api_key):
+            results = await parser.aget_json_result(file_path)
+        text = _text_from_json_result(results)
+        if not text.strip():
+            raise Exception("No documents returned from parser.")
+        return text
     except Exception as e:
         raise Exception(f"LlamaParse failed: {str(e)}")
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends, Header, Query, UploadFile, File, Form, Request, status, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
@@ -15,7 +15,6 @@ import smtplib, ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import json
-import tempfile
 import aiofiles
 from io import BytesIO
 
@@ -28,27 +27,77 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 
-from llama.llama_utils import initialize_llama_parser
-from parsing.parsing_utils import parse_resume
-from gemini.gemini_utils import analyze_resume_comprehensive, initialize_gemini
+from llama.llama_utils import evict_llama_parsers
+from parsing.libreoffice_pool import get_converter_metrics, shutdown_libreoffice_pool
+from parsing.document_service import get_document_pool_metrics, shutdown_document_pool
+from mongodb.audit_buffer import get_audit_buffer_metrics, shutdown_audit_buffer
+from parsing.text_compaction import DEFAULT_RESUME_TOKEN_BUDGET
+from parsing.contact_extractor import extract_contacts
+from storage.blob_store import get_blob_info, get_blob_path, iter_blob_chunks
+from gemini.gemini_utils import initialize_gemini, evict_gemini_models
 from mongodb.mongodb_db import (
     initialize_mongodb,
     fetch_analysis_history,
+    fetch_history_stats,
+    HISTORY_DEFAULT_PAGE_SIZE,
+    HISTORY_MAX_PAGE_SIZE,
     fetch_client_names,
     fetch_client_details_by_jd,
     fetch_jd_names_for_client,
-    store_results_in_mongodb,
+    fetch_jd_for_analysis,
     update_job_description,
-    count_pages,
     initialize_usage_tracking,
     increment_usage,
     get_current_month_usage,
     check_usage_limit,
     get_company_page_limit,
     get_usage_stats,
-    log_audit_trail
+    log_audit_trail,
+    backfill_audit_categories,
+    fetch_audit_logs,
+    AUDIT_LOG_DEFAULT_PAGE_SIZE,
+    AUDIT_LOG_MAX_PAGE_SIZE,
+    get_dashboard_summary,
+    list_companies_with_usage,
+    get_usage_report,
+    invalidate_usage_summaries
 )
 from utils.common_utils import to_init_caps
+from mongodb.indexes import reconcile_indexes_on_startup
+from cache.analysis_cache import invalidate_jd_analyses
+from pipeline.analysis_pipeline import (
+    ResumeParseError,
+    get_company_ai_settings,
+    jd_for_gemini,
+    text_extraction_mode_for,
+    prepare_resume,
+    estimate_resume_pages,
+    extract_resume_text,
+    extraction_summary,
+    TEXT_EXTRACTION_MODES,
+    DEFAULT_TEXT_EXTRACTION_MODE,
+    ANALYSIS_MODES,
+    DEFAULT_ANALYSIS_MODE,
+    analyze_resume_text,
+    store_analysis,
+    run_resume_analysis
+)
+from pipeline.progress import (
+    emit_progress,
+    stream_progress,
+    EVENT_UPLOAD_RECEIVED,
+    EVENT_PAGE_COUNT,
+    EVENT_FILE_COMPLETED,
+    EVENT_DONE,
+    EVENT_FAILED,
+    EVENT_BATCH_COMPLETED
+)
+from pipeline.job_queue import (
+    enqueue_analysis_job,
+    get_analysis_job,
+    start_job_workers,
+    list_live_workers
+)
 
 import google.generativeai as genai
 from llama_parse import LlamaParse
@@ -56,7 +105,6 @@ from llama_parse import LlamaParse
 load_dotenv()
 # JWT Token
 from jose import jwt, JWTError
-from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -76,6 +124,23 @@ ADMIN_LIMIT = os.getenv("RATE_LIMIT_ADMIN", "100/minute")
 HIGH_TRAFFIC_LIMIT = os.getenv("RATE_LIMIT_HIGH_TRAFFIC", "200/minute")
 limiter = Limiter(key_func=get_remote_address)
 
+# Batch analysis: per-stage concurrency caps, shared by every batch on this worker
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+MULTI_JD_MAX_JDS = int(os.getenv("MULTI_JD_MAX_JDS", "20"))
+
+# In-process consumers of the analysis_jobs queue. Default 0: web nodes only enqueue and
+# analysis runs on `python -m worker`; set it for a single-process local setup
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "0"))
+JOB_SHUTDOWN_GRACE_SECONDS = int(os.getenv("ANALYSIS_JOB_SHUTDOWN_GRACE", "20"))
+batch_parse_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_PARSE_CONCURRENCY", "4")))
+batch_llm_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_LLM_CONCURRENCY", "4")))
+batch_db_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_DB_CONCURRENCY", "8")))
+
+
+def validate_analysis_mode(analysis_mode: Optional[str]) -> None:
+    if analysis_mode is not None and analysis_mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"analysis_mode must be one of {ANALYSIS_MODES}")
+
 
 # --------------------
 # Environment / Clients
@@ -148,6 +213,8 @@ class CompanyCreate(BaseModel):
     gemini_api_key: Optional[str] = None
     llama_api_key: Optional[str] = None
     gemini_model: Optional[str] = "gemini-2.0-flash"
+    text_extraction_mode: Optional[str] = DEFAULT_TEXT_EXTRACTION_MODE  # 'local_first' or 'llama_first'
+    resume_token_budget: Optional[int] = Field(default=None, description="Max resume tokens sent to Gemini")
     monthly_page_limit: Optional[int] = Field(default=1000, description="Monthly page limit for analysis")
     # New fields
     logo_url: Optional[str] = None
@@ -312,6 +379,12 @@ class JDData(BaseModel):
     number_of_positions: Optional[int] = None
     work_mode: Optional[str] = Field(None, description="in-office, remote, hybrid")
 
+class JDReference(BaseModel):
+    # Either client_name + jd_title, or jd_id (job_descriptions _id)
+    client_name: Optional[str] = None
+    jd_title: Optional[str] = None
+    jd_id: Optional[str] = None
+
 class UpdateJD(BaseModel):
     required_experience: str
     primary_skills: List[str]
@@ -489,6 +562,7 @@ async def soft_delete_company(company_id: str, deleted_by: str) -> bool:
                 }
             }
         )
+        invalidate_usage_summaries()
         
         if company_result.modified_count == 0:
             return False
@@ -577,6 +651,7 @@ async def restore_company_and_users(company_id: str, restored_by: str) -> bool:
                 }
             }
         )
+        invalidate_usage_summaries()
 
         # Restore all users of this company
         await col_company_users.update_many(
@@ -816,6 +891,7 @@ async def auto_reset_monthly_usage():
     # Execute all new-month inserts
     if operations:
         await db.company_usage.bulk_write(operations)
+        invalidate_usage_summaries()
 
     # Update last reset marker
     await db.system_settings.update_one(
@@ -871,97 +947,44 @@ from fastapi import Query
 @limiter.limit(get_rate_limit("high_traffic"))
 async def get_audit_logs(request : Request,
     current_user: dict = Depends(require_super_admin),
-    company_id: str = Query(None)
+    company_id: str = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(AUDIT_LOG_DEFAULT_PAGE_SIZE, ge=1, description=f"Page size (max {AUDIT_LOG_MAX_PAGE_SIZE})"),
+    action: Optional[str] = Query(None, description="Comma-separated actions"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None)
 ):
-    # 🔹 Actions to exclude
-    exclude_actions = [
-        "upload_company_logo",
-        "create_company",
-        "update_company_limit",
-        "upload_user_profile_photo",
-        "create_user",
-        "restore_user",
-        "restore_company_with_user",
-        "analyze_resume",
-        "restore_analysis",
-        "restore_client",
-        "restore_jd",
-        "update_client",
-        "update_client_status",
-        "reset_company_usage",
-        "create_bank",
-        "update_bank",
-        "update_bank_status",
-        "delete_bank"
-    ]
-
-    # 🔹 Base query
-    query = {}
-
+    """Visible audit entries, newest first: {"logs", "next_cursor", "limit"}."""
     # 🔹 Filter by company
+    scope = {}
     if company_id:
-        if company_id.lower() == "none":
-            query["company_id"] = None
-        else:
-            query["company_id"] = company_id
-
-    # 🔹 Exclude unwanted actions
-    query["action"] = {"$nin": exclude_actions}
+        scope["company_id"] = None if company_id.lower() == "none" else company_id
 
-    logs = await audit_collection.find(query, {"_id": 0}).sort("timestamp", -1).to_list(None)
-    
-    # 🔹 Convert timestamp to ISO
-    for log in logs:
-        if isinstance(log.get("timestamp"), datetime):
-            log["timestamp"] = log["timestamp"].isoformat()
-    
-    return {"logs": logs}
+    actions = [a.strip() for a in action.split(",") if a.strip()] if action else None
+    try:
+        return await fetch_audit_logs(scope, actions, date_from, date_to, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/audit-logs/company", response_class=JSONResponse)
 @limiter.limit(get_rate_limit("high_traffic"))
 async def get_company_audit_logs(request : Request,
-    current_user: dict = Depends(require_company_admin_or_super_admin)  # 👈 Your role-based dependency
+    current_user: dict = Depends(require_company_admin_or_super_admin),  # 👈 Your role-based dependency
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(AUDIT_LOG_DEFAULT_PAGE_SIZE, ge=1, description=f"Page size (max {AUDIT_LOG_MAX_PAGE_SIZE})"),
+    action: Optional[str] = Query(None, description="Comma-separated actions"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None)
 ):
     company_id = current_user.get("company_id")
     if not company_id:
-        return {"logs": [], "message": "No company ID found for this user."}
-
-    # 🔹 Actions to exclude (same list as before)
-    exclude_actions = [
-        "upload_company_logo",
-        "create_company",
-        "update_company_limit",
-        "upload_user_profile_photo",
-        "create_user",
-        "restore_user",
-        "restore_company_with_user",
-        "analyze_resume",
-        "restore_analysis",
-        "restore_client",
-        "restore_jd",
-        "update_client",
-        "update_client_status",
-        "reset_company_usage",
-        "create_bank",
-        "update_bank",
-        "update_bank_status",
-        "delete_bank"
-    ]
-
-    # 🔹 Build query for this company
-    query = {
-        "company_id": company_id,
-        "action": {"$nin": exclude_actions}
-    }
+        return {"logs": [], "next_cursor": None, "message": "No company ID found for this user."}
 
-    logs = await audit_collection.find(query, {"_id": 0}).sort("timestamp", -1).to_list(None)
-    
-    # 🔹 Convert timestamp → ISO
-    for log in logs:
-        if isinstance(log.get("timestamp"), datetime):
-            log["timestamp"] = log["timestamp"].isoformat()
-    
-    return {"logs": logs}
+    actions = [a.strip() for a in action.split(",") if a.strip()] if action else None
+    try:
+        return await fetch_audit_logs({"company_id": company_id}, actions, date_from, date_to, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 
@@ -1172,6 +1195,7 @@ async def upload_company_logo(
         {"id": company_id},
         {"$set": {"logo_url": f"/logos/{unique_filename}"}}
     )
+    invalidate_usage_summaries()
 
     if result.modified_count == 0:
         # Clean up file if company not found
@@ -1226,6 +1250,9 @@ async def create_company(
         "gemini_api_key": company.gemini_api_key,
         "llama_api_key": company.llama_api_key,
         "gemini_model": company.gemini_model or "gemini-2.0-flash",
+        "text_extraction_mode": company.text_extraction_mode
+        if company.text_extraction_mode in TEXT_EXTRACTION_MODES else DEFAULT_TEXT_EXTRACTION_MODE,
+        "resume_token_budget": company.resume_token_budget or DEFAULT_RESUME_TOKEN_BUDGET,
         "monthly_page_limit": company.monthly_page_limit or 1000,
         "current_month_usage": 0,  # Set to 0 for new company
         "created_at": now_iso,
@@ -1256,6 +1283,7 @@ async def create_company(
         "bank_address": company.bank_address
     }
     await col_companies.insert_one(company_doc)
+    invalidate_usage_summaries()
 
     # Initial company admin
     admin_id = str(uuid.uuid4())
@@ -1301,23 +1329,8 @@ async def get_companies(
     status: Optional[str] = None,
     _: str = Depends(get_current_user)
 ):
-    items = []
-    query = {"is_deleted": False}
-    if status:
-        query["status"] = status
-
-    # Sort by _id descending → latest first
-    cursor = col_companies.find(query, {"_id": 0}).sort("created_at", -1)
-
-    async for doc in cursor:
-        # Add current usage to response
-        usage_info = {
-            "current_month_usage": await get_current_month_usage(doc["id"]),
-            "monthly_page_limit": doc.get("monthly_page_limit", 1000)
-        }
-        items.append({**doc, **usage_info})
-
-    return items
+    # Newest first, with this month's usage joined in one aggregation
+    return await list_companies_with_usage(status)
 
 @app.patch("/companies/{company_id}", response_model=CompanyResponse)
 @limiter.limit(get_rate_limit("admin"))
@@ -1370,6 +1383,11 @@ async def update_company(
         {"$set": changed_fields},
         return_document=True
     )
+    invalidate_usage_summaries()
+    if "llama_api_key" in changed_fields:
+        evict_llama_parsers(old_company.get("llama_api_key"))
+    if "gemini_api_key" in changed_fields:
+        evict_gemini_models(old_company.get("gemini_api_key"))
 
     # Prepare audit data (only truly modified fields)
     modified_old_data = {k: old_company.get(k) for k in changed_fields.keys()}
@@ -1422,6 +1440,7 @@ async def delete_company(
         {"id": company_id, "is_deleted": False},
         {"$set": update_fields}
     )
+    invalidate_usage_summaries()
 
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Company not found")
@@ -1460,7 +1479,7 @@ async def get_company_api_keys(
     """Get API keys for a company (masked for security)"""
     company = await col_companies.find_one(
         {"id": company_id, "is_deleted": False},
-        {"gemini_api_key": 1, "llama_api_key": 1, "gemini_model": 1, "name": 1}
+        {"gemini_api_key": 1, "llama_api_key": 1, "gemini_model": 1, "text_extraction_mode": 1, "resume_token_budget": 1, "name": 1}
     )
     
     if not company:
@@ -1470,6 +1489,8 @@ async def get_company_api_keys(
     response = {
         "company_name": company["name"],
         "gemini_model": company.get("gemini_model", "gemini-2.0-flash"),
+        "text_extraction_mode": company.get("text_extraction_mode", DEFAULT_TEXT_EXTRACTION_MODE),
+        "resume_token_budget": company.get("resume_token_budget", DEFAULT_RESUME_TOKEN_BUDGET),
         "has_gemini_key": bool(company.get("gemini_api_key")),
         "has_llama_key": bool(company.get("llama_api_key"))
     }
@@ -1484,6 +1505,8 @@ async def update_company_api_keys(
     gemini_api_key: Optional[str] = Form(None),
     llama_api_key: Optional[str] = Form(None),
     gemini_model: Optional[str] = Form("gemini-2.0-flash"),
+    text_extraction_mode: Optional[str] = Form(None),
+    resume_token_budget: Optional[int] = Form(None),
     user: dict = Depends(require_super_admin)
 ):
     """Update API keys for a company"""
@@ -1499,6 +1522,19 @@ async def update_company_api_keys(
     if gemini_model is not None:
         update_data["gemini_model"] = gemini_model
 
+    if text_extraction_mode is not None:
+        if text_extraction_mode not in TEXT_EXTRACTION_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"text_extraction_mode must be one of {TEXT_EXTRACTION_MODES}"
+            )
+        update_data["text_extraction_mode"] = text_extraction_mode
+
+    if resume_token_budget is not None:
+        if resume_token_budget < 500:
+            raise HTTPException(status_code=400, detail="resume_token_budget must be at least 500")
+        update_data["resume_token_budget"] = resume_token_budget
+
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
@@ -1523,6 +1559,11 @@ async def update_company_api_keys(
         return_document=True,
         projection={"_id": 0, "gemini_api_key": 0, "llama_api_key": 0}  # hide sensitive keys
     )
+    invalidate_usage_summaries()
+    if "llama_api_key" in changed_fields:
+        evict_llama_parsers(old_company.get("llama_api_key"))
+    if "gemini_api_key" in changed_fields:
+        evict_gemini_models(old_company.get("gemini_api_key"))
 
     # Prepare audit data (only modified fields)
     modified_old_data = {k: old_company.get(k) for k in changed_fields.keys()}
@@ -1647,6 +1688,7 @@ async def update_company_limit(
         {"id": company_id, "is_deleted": False},
         {"$set": {"monthly_page_limit": new_limit}}
     )
+    invalidate_usage_summaries()
 
     # Prepare audit log — include context fields
     modified_old_data = {"monthly_page_limit": previous_limit}
@@ -1689,42 +1731,7 @@ async def get_companies_usage_report(
     If no month is provided, defaults to the current month.
     """
     current_month = month or datetime.now().strftime("%Y-%m")
-    report = []
-
-    # Fixed: Use async cursor iteration
-    companies_cursor = col_companies.find(
-        {"is_deleted": False, "status": "active"}, 
-        {"id": 1, "name": 1, "monthly_page_limit": 1}
-    )
-    
-    async for company in companies_cursor:
-        company_id = company["id"]
-        usage_doc = await db.company_usage.find_one({"company_id": company_id, "month": current_month})
-
-        if usage_doc:
-            current_usage = usage_doc.get("page_count", 0)
-            monthly_limit = usage_doc.get("page_limit", 0)
-            history = usage_doc.get("history", [])
-        else:
-            current_usage = 0
-            monthly_limit = 0
-            history = []
-
-        remaining_pages = max(monthly_limit - current_usage, 0)
-        total_paid = sum(h.get("amount_paid", 0) for h in history) if history else 0
-        usage_percentage = (current_usage / monthly_limit * 100) if monthly_limit > 0 else 0
-
-        report.append({
-            "company_id": company_id,
-            "company_name": company["name"],
-            "current_usage": current_usage,
-            "monthly_limit": monthly_limit,
-            "remaining_pages": remaining_pages,
-            "usage_percentage": round(usage_percentage, 1),
-            "total_paid": total_paid,
-            "history": history
-        })
-    
+    report = await get_usage_report(current_month)
     return {"report": report, "month": current_month}
 
 
@@ -1761,6 +1768,7 @@ async def update_company_status(
             "$push": {"status_history": status_entry}
         }
     )
+    invalidate_usage_summaries()
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Company not updated")
@@ -2312,6 +2320,8 @@ async def analyze_resume_endpoint(
     request: Request,
     resume: UploadFile = File(..., description="Resume file (.pdf or .docx)"),
     jd_data: str = Form(..., description="JSON string for JDData"),
+    job_id: Optional[str] = Form(None, description="Client-generated id to follow progress on /analyze/{job_id}/events"),
+    analysis_mode: Optional[str] = Form(None, description="'comprehensive' (Gemini) or 'fast' (local skill matching, no LLM)"),
     current_user: dict = Depends(get_current_user)
 ) -> JSONResponse:
     
@@ -2319,141 +2329,481 @@ async def analyze_resume_endpoint(
         jd: JDData = JDData(**json.loads(jd_data))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid jd_data JSON: {e}")
+    validate_analysis_mode(analysis_mode)
+
+    company_id = current_user["company_id"]
+    content = await resume.read()
+    await emit_progress(job_id, company_id, EVENT_UPLOAD_RECEIVED, filename=resume.filename, size=len(content))
+
+    try:
+        prepared = await prepare_resume(content, resume.filename)
+        page_count = prepared["page_count"]
+        await emit_progress(job_id, company_id, EVENT_PAGE_COUNT, page_count=page_count)
+
+        if not await check_usage_limit(company_id, page_count):
+            current_usage = await get_current_month_usage(company_id)
+            page_limit = await get_company_page_limit(company_id)
+            raise HTTPException(
+                status_code=429, 
+                detail=f"Monthly page limit exceeded. Current usage: {current_usage}/{page_limit}"
+            )
+
+        company = await get_company_ai_settings(company_id)
+        if not company:
+            raise HTTPException(status_code=404, detail="Company not found")
+
+        try:
+            result = await run_resume_analysis(
+                company, current_user, resume.filename, content, prepared, jd.dict(), job_id=job_id,
+                analysis_mode=analysis_mode
+            )
+        except ResumeParseError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException as e:
+        await emit_progress(job_id, company_id, EVENT_FAILED, error=e.detail, status_code=e.status_code)
+        raise
+    except Exception as e:
+        await emit_progress(job_id, company_id, EVENT_FAILED, error=str(e))
+        raise
+
+    await emit_progress(job_id, company_id, EVENT_DONE, analysis_id=result["analysis_id"])
+
+    # ------------------ AUDIT LOG ------------------
+    # new_data_for_audit = {
+    #     k: v for k, v in analysis.items() if k != "file_content"
+    # }
+    # await log_audit_trail(
+    #     user_id=current_user.get("user_id"),
+    #     name=current_user.get("name"),
+    #     role=current_user.get("role"),
+    #     company_id=current_user.get("company_id"),
+    #     action="analyze_resume",
+    #     target_table="analysis_history",
+    #     target_id=store_key,
+    #     old_data=None,
+    #     new_data=new_data_for_audit,
+    #     screen="users"  
+    # )
+    # ------------------------------------------------
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "analysis_id": result["analysis_id"],
+            "analysis": result["analysis"],
+            "page_count": page_count,
+            "text_parser": result["text_parser"],
+            "text_extraction": result["text_extraction"],
+            "parse_cache_hit": result["parse_cache_hit"],
+            "analysis_cache_hit": result["analysis_cache_hit"],
+            "analysis_mode": result["analysis_mode"],
+            "token_usage": result["token_usage"],
+            "timings_ms": result["timings_ms"],
+        },
+    )
+
+@app.get("/analyze/{job_id}/events")
+@limiter.limit(get_rate_limit("high_traffic"))
+async def analysis_events_endpoint(
+    request: Request,
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Server-Sent Events for an analysis: upload_received, page_count, text_extracted,
+    llm_started, llm_finished, stored, then done/failed. Batches emit file_completed
+    per resume and end with batch_completed.
+    """
+    return StreamingResponse(
+        stream_progress(job_id, current_user["company_id"], request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/analyze/jobs", status_code=202)
+@limiter.limit(get_rate_limit("high_traffic"))
+async def enqueue_analysis_endpoint(
+    request: Request,
+    resume: UploadFile = File(..., description="Resume file (.pdf or .docx)"),
+    jd_data: str = Form(..., description="JSON string for JDData"),
+    analysis_mode: Optional[str] = Form(None, description="'comprehensive' (Gemini) or 'fast' (local skill matching, no LLM)"),
+    current_user: dict = Depends(get_current_user)
+) -> JSONResponse:
+    """
+    Asynchronous /analyze: validates the request and quota, persists a job and
+    returns 202 immediately. Poll GET /analyze/jobs/{job_id} for the result.
+    """
+    try:
+        jd: JDData = JDData(**json.loads(jd_data))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid jd_data JSON: {e}")
+    validate_analysis_mode(analysis_mode)
 
     content = await resume.read()
-    page_count = count_pages(content, resume.filename)
+    # Normalization (LibreOffice, text extraction) runs on the worker; only count pages here
+    prepared = await estimate_resume_pages(content, resume.filename)
 
-    if not await check_usage_limit(current_user["company_id"], page_count):
+    if not await check_usage_limit(current_user["company_id"], prepared["page_count"]):
         current_usage = await get_current_month_usage(current_user["company_id"])
         page_limit = await get_company_page_limit(current_user["company_id"])
         raise HTTPException(
-            status_code=429, 
+            status_code=429,
             detail=f"Monthly page limit exceeded. Current usage: {current_usage}/{page_limit}"
         )
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(resume.filename)[1]) as tmp:
-        tmp.write(content)
-        tmp_path = tmp.name
 
+    job_id = await enqueue_analysis_job(current_user, resume.filename, content, jd.dict(), prepared, analysis_mode)
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "state": "queued",
+            "page_count": prepared["page_count"],
+            "status_url": f"/analyze/jobs/{job_id}"
+        },
+        headers={"Location": f"/analyze/jobs/{job_id}"}
+    )
+
+@app.get("/analyze/jobs/{job_id}")
+@limiter.limit(get_rate_limit("high_traffic"))
+async def get_analysis_job_endpoint(
+    request: Request,
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    job = await get_analysis_job(job_id, current_user["company_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if current_user["role"] != "company_admin" and job["created_by"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+
+    for key in ["created_at", "updated_at", "available_at", "lease_expires_at", "dead_lettered_at"]:
+        if isinstance(job.get(key), datetime):
+            job[key] = job[key].isoformat()
+    for entry in job.get("history", []):
+        if isinstance(entry.get("at"), datetime):
+            entry["at"] = entry["at"].isoformat()
+    return job
+
+@app.get("/analyze/workers")
+@limiter.limit(get_rate_limit("admin"))
+async def list_analysis_workers_endpoint(
+    request: Request,
+    current_user: dict = Depends(require_super_admin)
+):
+    """Live analysis queue consumers (web and standalone), from their heartbeat documents."""
+    workers = await list_live_workers()
+    for worker in workers:
+        for key in ["started_at", "last_heartbeat"]:
+            if isinstance(worker.get(key), datetime):
+                worker[key] = worker[key].isoformat()
+    return {
+        "live_workers": len(workers),
+        "total_concurrency": sum(w.get("concurrency", 0) for w in workers),
+        "in_flight": sum(w.get("in_flight", 0) for w in workers),
+        "workers": workers
+    }
+
+@app.get("/analyze/converter")
+@limiter.limit(get_rate_limit("admin"))
+async def libreoffice_pool_metrics_endpoint(
+    request: Request,
+    current_user: dict = Depends(require_super_admin)
+):
+    """Document pools of this web process: LibreOffice queue depth and latency, process pool tasks."""
+    return {
+        "libreoffice": get_converter_metrics(),
+        "document_pool": get_document_pool_metrics(),
+    }
+
+@app.get("/audit-logs/buffer")
+@limiter.limit(get_rate_limit("admin"))
+async def audit_buffer_metrics_endpoint(
+    request: Request,
+    current_user: dict = Depends(require_super_admin)
+):
+    """Audit write-behind buffer of this web process: queue depth, flush latency, spilled entries."""
+    return get_audit_buffer_metrics()
+
+@app.post("/analyze/batch")
+@limiter.limit(get_rate_limit("upload"))
+async def analyze_resume_batch_endpoint(
+    request: Request,
+    resumes: List[UploadFile] = File(..., description="Resume files (.pdf or .docx)"),
+    jd_data: str = Form(..., description="JSON string for JDData"),
+    job_id: Optional[str] = Form(None, description="Client-generated id to follow progress on /analyze/{job_id}/events"),
+    analysis_mode: Optional[str] = Form(None, description="'comprehensive' (Gemini) or 'fast' (local skill matching, no LLM)"),
+    current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Analyze many resumes against one JD.
+    Quota is checked once for the summed page count; results stream back as NDJSON
+    (one line per resume, in completion order) followed by a summary line.
+    """
     try:
-        company = await col_companies.find_one(
-            {"id": current_user["company_id"], "is_deleted": False},
-            {"gemini_api_key": 1, "llama_api_key": 1, "gemini_model": 1}
-        )
+        jd: JDData = JDData(**json.loads(jd_data))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid jd_data JSON: {e}")
+    validate_analysis_mode(analysis_mode)
+
+    if not resumes:
+        raise HTTPException(status_code=400, detail="No resumes uploaded")
+    if len(resumes) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_MAX_FILES} resumes")
+
+    company_id = current_user["company_id"]
+    files = [(upload.filename, await upload.read()) for upload in resumes]
+
+    async def _prepare(filename: str, content: bytes) -> Dict[str, Any]:
+        # Normalization (LibreOffice, document pool) is bounded like the parse stage
+        async with batch_parse_semaphore:
+            return await prepare_resume(content, filename)
+
+    prepared_files = await asyncio.gather(*(_prepare(filename, content) for filename, content in files))
+    total_pages = sum(prepared["page_count"] for prepared in prepared_files)
+    batch_id = job_id or str(uuid.uuid4())
+    await emit_progress(batch_id, company_id, EVENT_UPLOAD_RECEIVED, files=len(files))
+    await emit_progress(batch_id, company_id, EVENT_PAGE_COUNT, page_count=total_pages)
+
+    try:
+        if not await check_usage_limit(company_id, total_pages):
+            current_usage = await get_current_month_usage(company_id)
+            page_limit = await get_company_page_limit(company_id)
+            raise HTTPException(
+                status_code=429,
+                detail=f"Monthly page limit exceeded. Batch needs {total_pages} pages, current usage: {current_usage}/{page_limit}"
+            )
+
+        company = await get_company_ai_settings(company_id)
         if not company:
             raise HTTPException(status_code=404, detail="Company not found")
-        
-        # Note: These parsing functions might need to be wrapped in asyncio.to_thread if they're synchronous
-        # parser_json = await initialize_llama_parser("json", company.get("llama_api_key"))
-        # resume_text = await parse_resume(tmp_path, parser_json)
-        # if not resume_text:
-        #     parser_text = await initialize_llama_parser("text", company.get("llama_api_key"))
-        #     resume_text = await parse_resume(tmp_path, parser_text)
-        # resume_text = ""
-        # try:
-        #     parser_json = await initialize_llama_parser("json")
-        #     resume_text = await parse_resume(tmp_path, parser_json)
-        # except Exception:
-        #     parser_text = await initialize_llama_parser("text")
-        #     resume_text = await parse_resume(tmp_path, parser_text)
-        parser_json = await initialize_llama_parser("json", company.get("llama_api_key"))
-        resume_text = await parse_resume(tmp_path, parser_json)
-
-        # ✅ Explicitly check for empty or whitespace-only result
-        if not resume_text or not resume_text.strip():
-            parser_text = await initialize_llama_parser("text", company.get("llama_api_key"))
-            resume_text = await parse_resume(tmp_path, parser_text)
-
-        if not resume_text or not resume_text.strip():
-            raise HTTPException(status_code=422, detail="❌ Failed to parse resume text")
-
-        # if not resume_text:
-        #     raise HTTPException(status_code=422, detail="Failed to parse resume text")
-
-        # parser_text = await initialize_llama_parser("text", company.get("llama_api_key"))
-        # resume_text = await parse_resume(tmp_path, parser_text)
-        # if not resume_text:
-        #     parser_text = await initialize_llama_parser("json", company.get("llama_api_key"))
-        #     resume_text = await parse_resume(tmp_path, parser_text)
-
-        # if not resume_text:
-        #     raise HTTPException(status_code=422, detail="❌ Failed to parse resume")
-        # parser_json = await initialize_llama_parser("json", company.get("llama_api_key"))
-        # resume_text = await parse_resume(tmp_path, parser_json)
-        # if not resume_text:
-        #     parser_text = await initialize_llama_parser("text", company.get("llama_api_key"))
-        #     resume_text = await parse_resume(tmp_path, parser_text)
-        # if not resume_text:
-        #     raise HTTPException(status_code=422, detail="❌ Failed to parse resume")
-        
-        gemini_model = await initialize_gemini(
-            company.get("gemini_api_key"), 
-            company.get("gemini_model", "gemini-2.5-flash")
+    except HTTPException as e:
+        # Release subscribers of /analyze/{job_id}/events
+        await emit_progress(batch_id, company_id, EVENT_FAILED, error=e.detail, status_code=e.status_code)
+        raise
+
+    jd_dict = jd.dict()
+
+    async def _process(index: int, filename: str, content: bytes, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        item = {"type": "result", "index": index, "filename": filename, "page_count": prepared["page_count"]}
+        try:
+            result = await run_resume_analysis(
+                company, current_user, filename, content, prepared, jd_dict,
+                job_id=batch_id,
+                event_context={"index": index, "filename": filename},
+                parse_limiter=batch_parse_semaphore,
+                llm_limiter=batch_llm_semaphore,
+                db_limiter=batch_db_semaphore,
+                analysis_mode=analysis_mode
+            )
+            item.update({"status": "done", **result})
+        except Exception as e:
+            # One bad file must not abort the rest of the batch; its pages are not charged
+            item.update({"status": "failed", "error": str(e)})
+        await emit_progress(
+            batch_id, company_id, EVENT_FILE_COMPLETED,
+            index=index, filename=filename, status=item["status"],
+            analysis_id=item.get("analysis_id"), error=item.get("error")
         )
-        
+        return item
+
+    async def _stream():
+        tasks = [
+            asyncio.create_task(_process(index, filename, content, prepared))
+            for index, ((filename, content), prepared) in enumerate(zip(files, prepared_files))
+        ]
+        succeeded = failed = 0
+        try:
+            yield json.dumps({"type": "batch_started", "job_id": batch_id, "total": len(tasks), "page_count": total_pages}) + "\n"
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                if item["status"] == "done":
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps(item, default=str) + "\n"
+            await emit_progress(batch_id, company_id, EVENT_BATCH_COMPLETED, succeeded=succeeded, failed=failed)
+            yield json.dumps({"type": "batch_completed", "succeeded": succeeded, "failed": failed}) + "\n"
+        finally:
+            # Client went away mid-stream: stop the remaining work
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+@app.post("/analyze/multi-jd")
+@limiter.limit(get_rate_limit("upload"))
+async def analyze_resume_multi_jd_endpoint(
+    request: Request,
+    resume: UploadFile = File(..., description="Resume file (.pdf or .docx)"),
+    jd_refs: str = Form(..., description="JSON list of {client_name, jd_title} or {jd_id}"),
+    analysis_mode: Optional[str] = Form(None, description="'comprehensive' (Gemini) or 'fast' (local skill matching, no LLM)"),
+    current_user: dict = Depends(get_current_user)
+) -> JSONResponse:
+    """
+    Analyze one resume against several existing JDs: the file is page-counted and
+    parsed once, then the Gemini analyses run concurrently, one analysis_history
+    record per JD.
+
+    Charging rule: the resume's pages are charged once per upload (not once per JD),
+    and only if at least one JD analysis is stored.
+    """
+    try:
+        refs = [JDReference(**ref) for ref in json.loads(jd_refs)]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid jd_refs JSON: {e}")
+    validate_analysis_mode(analysis_mode)
+
+    if not refs:
+        raise HTTPException(status_code=400, detail="No job descriptions given")
+    if len(refs) > MULTI_JD_MAX_JDS:
+        raise HTTPException(status_code=400, detail=f"At most {MULTI_JD_MAX_JDS} job descriptions per request")
+
+    company_id = current_user["company_id"]
+    jd_list = []
+    for ref in refs:
+        if not ref.jd_id and not (ref.client_name and ref.jd_title):
+            raise HTTPException(status_code=400, detail="Each JD reference needs jd_id or client_name + jd_title")
+        try:
+            jd = await fetch_jd_for_analysis(company_id, ref.client_name, ref.jd_title, ref.jd_id)
+        except Exception:
+            jd = None
+        if not jd:
+            raise HTTPException(status_code=404, detail=f"JD not found: {ref.jd_id or f'{ref.client_name} / {ref.jd_title}'}")
+        jd_list.append(jd)
 
-        jd_for_gemini = jd.dict()
-        for key in ["location", "budget", "number_of_positions", "work_mode"]:
-            jd_for_gemini.pop(key, None)
+    content = await resume.read()
+    prepared = await prepare_resume(content, resume.filename)
+    page_count = prepared["page_count"]
 
-        analysis = await analyze_resume_comprehensive(
-            resume_text, jd_for_gemini, gemini_model, company.get("gemini_api_key")
+    if not await check_usage_limit(company_id, page_count):
+        current_usage = await get_current_month_usage(company_id)
+        page_limit = await get_company_page_limit(company_id)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Monthly page limit exceeded. Current usage: {current_usage}/{page_limit}"
         )
 
-        store_key = await store_results_in_mongodb(
-            analysis,
-            jd.dict(),
-            resume.filename,
-            resume_text,
-            content,
-            jd.client_name,
-            jd.jd_title,
-            current_user["user_id"],
-            current_user["company_id"],
-            current_user.get("name"),
-            current_user.get("role")
+    company = await get_company_ai_settings(company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    analysis_mode = analysis_mode or DEFAULT_ANALYSIS_MODE
+    try:
+        extraction = await extract_resume_text(
+            content, resume.filename, prepared, company.get("llama_api_key"),
+            text_extraction_mode_for(company, analysis_mode)
         )
-        await increment_usage(current_user["company_id"], page_count)
-
-        # ------------------ AUDIT LOG ------------------
-        # new_data_for_audit = {
-        #     k: v for k, v in analysis.items() if k != "file_content"
-        # }
-        # await log_audit_trail(
-        #     user_id=current_user.get("user_id"),
-        #     name=current_user.get("name"),
-        #     role=current_user.get("role"),
-        #     company_id=current_user.get("company_id"),
-        #     action="analyze_resume",
-        #     target_table="analysis_history",
-        #     target_id=store_key,
-        #     old_data=None,
-        #     new_data=new_data_for_audit,
-        #     screen="users"  
-        # )
-        # ------------------------------------------------
-
-        return JSONResponse(
-            status_code=200,
-            content={
-                "analysis_id": store_key,
-                "analysis": analysis,
-                "page_count": page_count,
-            },
+    except ResumeParseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    gemini_model = None
+    if analysis_mode != "fast":
+        gemini_model = await initialize_gemini(
+            company.get("gemini_api_key"), company.get("gemini_model", "gemini-2.5-flash")
         )
-    finally:
+
+    resume_text = extraction["resume_text"]
+    contacts = extract_contacts(resume_text)
+    text_extraction = extraction_summary(extraction)
+
+    async def _analyze_for_jd(jd: Dict[str, Any]) -> Dict[str, Any]:
+        item = {"jd_id": jd["jd_id"], "client_name": jd["client_name"], "jd_title": jd["jd_title"]}
         try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+            async with batch_llm_semaphore:
+                analysis, analysis_cache_hit, token_usage = await analyze_resume_text(
+                    company_id, company, resume_text, jd_for_gemini(jd), gemini_model, page_count,
+                    analysis_mode, contacts
+                )
+            async with batch_db_semaphore:
+                analysis_id = await store_analysis(
+                    analysis, jd, resume.filename, resume_text, content, current_user, page_count,
+                    charge_usage=False,
+                    extra_fields={
+                        "text_extraction": text_extraction,
+                        "token_usage": token_usage,
+                        "analysis_mode": analysis_mode,
+                    },
+                    contacts=contacts
+                )
+            item.update({
+                "status": "done",
+                "analysis_id": analysis_id,
+                "analysis": analysis,
+                "analysis_cache_hit": analysis_cache_hit,
+                "token_usage": token_usage,
+            })
+        except Exception as e:
+            item.update({"status": "failed", "error": str(e)})
+        return item
+
+    results = await asyncio.gather(*(_analyze_for_jd(jd) for jd in jd_list))
+
+    charged_pages = page_count if any(r["status"] == "done" for r in results) else 0
+    if charged_pages:
+        await increment_usage(company_id, charged_pages)
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "page_count": page_count,
+            "charged_pages": charged_pages,
+            "text_parser": extraction["parser"],
+            "text_extraction": text_extraction,
+            "parse_cache_hit": extraction["path"] == "cache",
+            "analysis_mode": analysis_mode,
+            "results": results,
+        },
+    )
 
 @app.get("/history")
 @limiter.limit(get_rate_limit("admin"))
 async def list_history(
     request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(HISTORY_DEFAULT_PAGE_SIZE, ge=1, description=f"Page size (max {HISTORY_MAX_PAGE_SIZE})"),
+    view: str = Query("list", description="'list' (table columns) or 'full' (whole record)"),
+    created_by: Optional[str] = Query(None, description="Comma-separated user ids (company admins)"),
+    client_name: Optional[str] = Query(None),
+    jd_id: Optional[str] = Query(None),
+    jd_title: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Analyses at or after this time"),
+    date_to: Optional[datetime] = Query(None, description="Analyses at or before this time"),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    experience_match: Optional[bool] = Query(None),
+    frequent_hopper: Optional[bool] = Query(None),
+    freelancer_status: Optional[bool] = Query(None),
     current_user: dict = Depends(get_current_user)
-) -> List[Dict[str, Any]]:
-    return await fetch_analysis_history(current_user)
+) -> Dict[str, Any]:
+    """Keyset-paginated history, newest first: {"items", "next_cursor", "limit"}."""
+    filters = {
+        "created_by": created_by,
+        "client_name": client_name,
+        "jd_id": jd_id,
+        "jd_title": jd_title,
+        "date_from": date_from,
+        "date_to": date_to,
+        "min_score": min_score,
+        "max_score": max_score,
+        "experience_match": experience_match,
+        "frequent_hopper": frequent_hopper,
+        "freelancer_status": freelancer_status,
+    }
+    try:
+        return await fetch_analysis_history(current_user, filters, cursor, limit, view)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/history/stats")
+@limiter.limit(get_rate_limit("admin"))
+async def history_stats(
+    request: Request,
+    year: Optional[int] = Query(None, ge=2000, le=2100, description="Year of the monthly breakdown"),
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Dashboard counts (total, this month, per user, per month) without paging the history."""
+    return await fetch_history_stats(current_user, year)
 
 @app.get("/download/{analysis_id}")
 @limiter.limit(get_rate_limit("admin"))
@@ -2463,11 +2813,11 @@ async def download_resume(
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        # Get analysis record
+        # Get analysis record (without a legacy embedded file)
         analysis = await db.analysis_history.find_one({
             "analysis_id": analysis_id,
             "company_id": current_user["company_id"]
-        })
+        }, {"file_content": 0})
         
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
@@ -2475,18 +2825,29 @@ async def download_resume(
         # If user is not admin, check if they created this analysis
         if current_user["role"] != "company_admin" and analysis["created_by"] != current_user["user_id"]:
             raise HTTPException(status_code=403, detail="Not authorized to access this resource")
-        
-        # Get file content from BSON Binary
-        file_content = analysis["file_content"]
-        
-        # Return file as download
+
+        headers = {"Content-Disposition": f"attachment; filename={analysis['filename']}"}
+        blob = await get_blob_info(analysis["file_hash"]) if analysis.get("file_hash") else None
+        if blob:
+            media_type = analysis.get("mime_type") or blob.get("mime_type") or "application/octet-stream"
+            headers["Content-Length"] = str(blob["size"])
+            # Disk backend: hand the path to the server (sendfile where supported)
+            path = get_blob_path(blob)
+            if path:
+                return FileResponse(path, media_type=media_type, headers=headers)
+            return StreamingResponse(iter_blob_chunks(blob["_id"]), media_type=media_type, headers=headers)
+
+        # Record not migrated to the blob store yet
+        legacy = await db.analysis_history.find_one({"analysis_id": analysis_id}, {"file_content": 1})
+        if not legacy or not legacy.get("file_content"):
+            raise HTTPException(status_code=404, detail="File not found")
         return StreamingResponse(
-            BytesIO(file_content),
+            BytesIO(legacy["file_content"]),
             media_type="application/octet-stream",
-            headers={
-                "Content-Disposition": f"attachment; filename={analysis['filename']}"
-            }
+            headers=headers
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to download file: {str(e)}")
     
@@ -2956,6 +3317,10 @@ async def update_job_description_endpoint(
     # Fetch new JD after update
     new_jd = await db.job_descriptions.find_one({"_id": jd_oid})
 
+    jd_client = await db.clients.find_one({"_id": old_jd["client_id"]}, {"client_name": 1})
+    if jd_client:
+        await invalidate_jd_analyses(current_user["company_id"], jd_client["client_name"], old_jd["jd_title"])
+
     # Determine only changed fields
     changed_fields = {}
     for k, new_value in jd_data.items():
@@ -2995,29 +3360,8 @@ async def get_dashboard_data(
     request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    companies_count = await col_companies.count_documents({"is_deleted": False, "status": "active"})
-    users_count = await col_company_users.count_documents({"is_deleted": False, "status": "active"})
-    inactive_companies_count = await col_companies.count_documents({"is_deleted": False, "status": "inactive"})
-    inactive_users_count = await col_company_users.count_documents({"is_deleted": False, "status": "inactive"})
-    
-    # Get total usage statistics
-    total_limit = 0
-    total_usage = 0
-    companies_cursor = col_companies.find({"is_deleted": False, "status": "active"}, {"id": 1, "monthly_page_limit": 1})
-    
-    async for company in companies_cursor:
-        total_limit += company.get("monthly_page_limit", 1000)
-        total_usage += await get_current_month_usage(company["id"])
-    
-    return {
-        "companies_count": companies_count,
-        "users_count": users_count,
-        "inactive_companies_count": inactive_companies_count,
-        "inactive_users_count": inactive_users_count,
-        "total_page_limit": total_limit,
-        "total_current_usage": total_usage,
-        "total_usage_percentage": (total_usage / total_limit * 100) if total_limit > 0 else 0
-    }
+    # Counts and usage totals in one aggregation per collection (cached briefly)
+    return await get_dashboard_summary()
 
 @app.get("/usage/stats")
 @limiter.limit(get_rate_limit("admin"))
@@ -3072,6 +3416,7 @@ async def reset_company_usage(
         {"company_id": company_id, "month": current_month},
         {"$set": new_usage_data}
     )
+    invalidate_usage_summaries()
 
     if result.modified_count == 0:
         raise HTTPException(status_code=400, detail="Failed to reset usage")
@@ -3192,12 +3537,37 @@ async def on_startup():
     except Exception as e:
         print(f"Startup error: {e}")
         # Defer errors to first DB call
-    # Initialize Gemini model once
+    # Declarative index registry (mongodb/indexes.py); idempotent across workers
+    try:
+        await reconcile_indexes_on_startup()
+    except Exception as e:
+        print(f"Indexes not reconciled: {e}")
+    # Categorize audit entries written before categories existed (no-op once done)
+    try:
+        await backfill_audit_categories()
+    except Exception as e:
+        print(f"Audit categories not backfilled: {e}")
+    # Warm the default (GEMINI_API_KEY) Gemini client in the registry
     try:
-        app.state.gemini_model = await initialize_gemini()
+        await initialize_gemini()
     except Exception as e:
-        app.state.gemini_model = None
         print(f"Gemini not initialized: {e}")
+    # Consume queued analysis jobs on this worker
+    app.state.job_stop_event = asyncio.Event()
+    app.state.job_workers = start_job_workers(ANALYSIS_JOB_WORKERS, app.state.job_stop_event)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Finish in-flight jobs; anything still running after the grace period is
+    # cancelled and its lease expires, so another worker retries it
+    app.state.job_stop_event.set()
+    if app.state.job_workers:
+        await asyncio.wait(app.state.job_workers, timeout=JOB_SHUTDOWN_GRACE_SECONDS)
+        for task in app.state.job_workers:
+            task.cancel()
+    await shutdown_libreoffice_pool()
+    shutdown_document_pool()
+    await shutdown_audit_buffer()
 
 #-----country and state ----
 @app.get("/countries")
@@ -0,0 +1,108 @@
+"""
+Move resume binaries embedded in analysis_history into the blob store.
+
+    python -m migrate_blobs --batch-size 50 --pause 0.5
+
+Records are processed in _id order, a batch at a time, with a pause between batches
+(and an optional --max-per-second cap) so the migration can run next to live traffic.
+Progress is checkpointed in blob_migrations after every batch; re-running continues
+where the last run stopped. --restart ignores the checkpoint, which retries records that
+failed earlier (already migrated records no longer match, so nothing is done twice).
+"""
+import os
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from mongodb.mongodb_db import get_db
+from storage.blob_store import put_blob, release_blob
+
+load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+MIGRATION_ID = "analysis_history.file_content"
+DEFAULT_BATCH_SIZE = int(os.getenv("BLOB_MIGRATION_BATCH_SIZE", "50"))
+DEFAULT_PAUSE_SECONDS = float(os.getenv("BLOB_MIGRATION_PAUSE", "0.5"))
+
+
+async def migrate(batch_size: int, pause: float, max_per_second: float, limit: int, restart: bool) -> None:
+    db = await get_db()
+    checkpoint = None if restart else await db.blob_migrations.find_one({"_id": MIGRATION_ID})
+    last_id = checkpoint.get("last_id") if checkpoint else None
+    migrated = skipped = failed = 0
+    started = time.monotonic()
+
+    while limit <= 0 or migrated + skipped + failed < limit:
+        query = {"file_content": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        size = batch_size if limit <= 0 else min(batch_size, limit - migrated - skipped - failed)
+        batch = await db.analysis_history.find(
+            query, {"file_content": 1, "filename": 1}
+        ).sort("_id", 1).limit(size).to_list(length=size)
+        if not batch:
+            break
+
+        for doc in batch:
+            last_id = doc["_id"]
+            content = doc.get("file_content")
+            if not content:
+                await db.analysis_history.update_one({"_id": doc["_id"]}, {"$unset": {"file_content": ""}})
+                skipped += 1
+                continue
+            blob = None
+            try:
+                blob = await put_blob(bytes(content), doc.get("filename", ""))
+                result = await db.analysis_history.update_one(
+                    {"_id": doc["_id"], "file_content": {"$exists": True}},
+                    {"$set": blob, "$unset": {"file_content": ""}}
+                )
+                if result.modified_count:
+                    migrated += 1
+                else:
+                    # Migrated concurrently by another run
+                    await release_blob(blob["file_hash"])
+                    skipped += 1
+            except Exception as e:
+                print(f"Record {doc['_id']} not migrated: {e}")
+                if blob is not None:
+                    await release_blob(blob["file_hash"])
+                failed += 1
+
+            if max_per_second > 0:
+                expected = (migrated + skipped + failed) / max_per_second
+                elapsed = time.monotonic() - started
+                if expected > elapsed:
+                    await asyncio.sleep(expected - elapsed)
+
+        await db.blob_migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {
+                "last_id": last_id,
+                "updated_at": datetime.utcnow(),
+                "last_run": {"migrated": migrated, "skipped": skipped, "failed": failed},
+            }},
+            upsert=True
+        )
+        print(f"Blob migration: {migrated} migrated, {skipped} skipped, {failed} failed (last _id {last_id})")
+        await asyncio.sleep(pause)
+
+    print(f"Blob migration finished: {migrated} migrated, {skipped} skipped, {failed} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded resume files into the blob store")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Records per batch")
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE_SECONDS, help="Seconds to sleep between batches")
+    parser.add_argument("--max-per-second", type=float, default=0, help="Record rate cap (0 = no cap)")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many records (0 = all)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.pause, args.max_per_second, args.limit, args.restart))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from mongodb.mongodb_db import get_db
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (local development, single process): no cross-process lock
+    fcntl = None
+
+# ---------- AUDIT LOG WRITE-BEHIND BUFFER ----------
+# log_audit_trail only appends to an in-process buffer; a background task writes batches with
+# insert_many(ordered=False) when AUDIT_FLUSH_BATCH_SIZE entries are waiting or every
+# AUDIT_FLUSH_INTERVAL seconds. Batches that cannot be written (Mongo down) are appended to
+# AUDIT_SPILL_PATH as extended JSON and replayed after the next successful flush. The file
+# is shared by every process of the service (uvicorn --workers); an exclusive lock on
+# AUDIT_SPILL_PATH.lock serializes appends with the take-over of the file for a replay.
+# Entries become visible to /audit-logs up to one flush interval later.
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+# Beyond this many buffered entries new ones go straight to the spill file
+AUDIT_BUFFER_CAPACITY = int(os.getenv("AUDIT_BUFFER_CAPACITY", "20000"))
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "audit_spill.jsonl")
+AUDIT_SPILL_REPLAY_BATCH = 1000
+
+
+@contextmanager
+def _spill_lock():
+    if fcntl is None:
+        yield
+        return
+    with open(AUDIT_SPILL_PATH + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _append_spill(entries: List[Dict[str, Any]]) -> None:
+    with _spill_lock():
+        with open(AUDIT_SPILL_PATH, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json_util.dumps(entry) + "\n")
+
+
+def _take_spill(replay_path: str) -> List[Dict[str, Any]]:
+    """Move the spill file aside (this process's replay path) and read it; [] if there is none."""
+    with _spill_lock():
+        if not os.path.exists(AUDIT_SPILL_PATH):
+            return []
+        os.replace(AUDIT_SPILL_PATH, replay_path)
+        with open(replay_path, "r", encoding="utf-8") as f:
+            return [json_util.loads(line) for line in f if line.strip()]
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class AuditBuffer:
+    """In-process audit queue with a single background flusher per event loop."""
+
+    def __init__(self, batch_size: int = AUDIT_FLUSH_BATCH_SIZE, interval: float = AUDIT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._entries: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.metrics = {
+            "enqueued": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "write_errors": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "max_buffered": 0,
+            "last_flush_at": None,
+            "last_flush_ms": 0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._task = loop.create_task(self._run())
+
+    def enqueue(self, entry: Dict[str, Any]) -> None:
+        """Never blocks and never raises on the request path."""
+        self.metrics["enqueued"] += 1
+        if len(self._entries) >= AUDIT_BUFFER_CAPACITY:
+            try:
+                _append_spill([entry])
+                self.metrics["spilled"] += 1
+            except Exception as e:
+                print(f"Audit entry dropped, buffer full and spill failed: {e}")
+            return
+        self._entries.append(entry)
+        self.metrics["max_buffered"] = max(self.metrics["max_buffered"], len(self._entries))
+        self._ensure_started()
+        if self._wakeup is not None and len(self._entries) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Audit flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Write everything buffered right now. :return: entries written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        written = 0
+        async with self._flush_lock:
+            while self._entries:
+                batch = [self._entries.popleft() for _ in range(min(self.batch_size, len(self._entries)))]
+                if not await self._write(batch):
+                    break
+                written += len(batch)
+            if written and os.path.exists(AUDIT_SPILL_PATH):
+                await self._replay_spill()
+        return written
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        started = time.perf_counter()
+        try:
+            db = await get_db()
+            await db.audit_logs.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything but the failed documents was written
+            errors = e.details.get("writeErrors", [])
+            self.metrics["write_errors"] += len(errors)
+            self.metrics["flushed"] += len(batch) - len(errors)
+        except Exception as e:
+            print(f"Audit flush failed, spilling {len(batch)} entries: {e}")
+            self.metrics["failed_flushes"] += 1
+            await self._spill(batch)
+            return False
+        else:
+            self.metrics["flushed"] += len(batch)
+        self.metrics["flushes"] += 1
+        self.metrics["last_flush_at"] = datetime.utcnow().isoformat()
+        self.metrics["last_flush_ms"] = int((time.perf_counter() - started) * 1000)
+        return True
+
+    async def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        for entry in batch:
+            # insert_many set _id on the dicts; keep it so a replay cannot duplicate them
+            entry.setdefault("_spilled_at", datetime.utcnow())
+        try:
+            await asyncio.to_thread(_append_spill, batch)
+            self.metrics["spilled"] += len(batch)
+        except Exception as e:
+            print(f"Audit spill failed, {len(batch)} entries lost: {e}")
+
+    async def _replay_spill(self) -> None:
+        replay_path = f"{AUDIT_SPILL_PATH}.{os.getpid()}.replay"
+        try:
+            entries = await asyncio.to_thread(_take_spill, replay_path)
+        except Exception as e:
+            print(f"Audit spill not replayed: {e}")
+            return
+        if not entries:
+            _remove_file(replay_path)
+            return
+        db = await get_db()
+        for start in range(0, len(entries), AUDIT_SPILL_REPLAY_BATCH):
+            chunk = entries[start:start + AUDIT_SPILL_REPLAY_BATCH]
+            for entry in chunk:
+                entry.pop("_spilled_at", None)
+            try:
+                await db.audit_logs.insert_many(chunk, ordered=False)
+                self.metrics["replayed"] += len(chunk)
+            except BulkWriteError as e:
+                # Duplicate _id: already written before the spill
+                self.metrics["replayed"] += len(chunk) - len(e.details.get("writeErrors", []))
+            except Exception as e:
+                print(f"Audit spill replay stopped: {e}")
+                try:
+                    await asyncio.to_thread(_append_spill, entries[start:])
+                except Exception as e:
+                    # Keep the replay file; it still holds every entry
+                    print(f"Audit spill not restored, entries kept in {replay_path}: {e}")
+                    return
+                break
+        _remove_file(replay_path)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        spill_bytes = os.path.getsize(AUDIT_SPILL_PATH) if os.path.exists(AUDIT_SPILL_PATH) else 0
+        return {
+            **self.metrics,
+            "buffered": len(self._entries),
+            "capacity": AUDIT_BUFFER_CAPACITY,
+            "batch_size": self.batch_size,
+            "interval_seconds": self.interval,
+            "spill_file_bytes": spill_bytes,
+            "flusher_running": self._task is not None and not self._task.done(),
+        }
+
+    async def close(self) -> None:
+        """Stop the flusher and write (or spill) whatever is left."""
+        self._closing = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=self.interval + 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._entries:
+            await self._spill(list(self._entries))
+            self._entries.clear()
+
+
+_audit_buffer = AuditBuffer()
+
+
+def get_audit_buffer() -> AuditBuffer:
+    return _audit_buffer
+
+
+def get_audit_buffer_metrics() -> Dict[str, Any]:
+    return _audit_buffer.get_metrics()
+
+
+async def shutdown_audit_buffer() -> None:
+    await _audit_buffer.close()
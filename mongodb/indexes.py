@@ -0,0 +1,344 @@
+"""
+Declarative MongoDB index registry.
+
+on_startup reconciles INDEX_REGISTRY against the database: missing indexes are created,
+indexes whose options drifted are rebuilt (TTL changes are applied in place with collMod),
+and indexes not in the registry are only reported. Check mode explains every hot query
+shape from mongodb_db.py and main.py and fails if any of them plans a COLLSCAN:
+
+    python -m mongodb.indexes --check
+"""
+import os
+import sys
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from mongodb.mongodb_db import get_db
+from cache.resume_cache import RESUME_CACHE_TTL_DAYS
+
+INDEX_RECONCILE_ON_STARTUP = os.getenv("INDEX_RECONCILE_ON_STARTUP", "true").lower() == "true"
+
+# Most reads only see live rows, so indexes that exist for them skip soft-deleted documents
+LIVE = {"partialFilterExpression": {"is_deleted": False}}
+KEYSET = [("timestamp", -1), ("_id", -1)]
+
+# collection -> [{"keys": [(field, direction)], "options": {...}}]
+INDEX_REGISTRY: Dict[str, List[Dict[str, Any]]] = {
+    "super_admins": [
+        {"keys": [("email", 1)], "options": {"unique": True}},
+    ],
+    "companies": [
+        {"keys": [("id", 1)], "options": {"unique": True}},
+        {"keys": [("is_deleted", 1), ("status", 1)]},
+        {"keys": [("is_deleted", 1), ("created_at", -1)]},
+    ],
+    "company_users": [
+        {"keys": [("email", 1)]},
+        {"keys": [("id", 1)]},
+        {"keys": [("company_id", 1), ("is_deleted", 1), ("status", 1)]},
+        {"keys": [("created_at", -1)], "options": LIVE},
+    ],
+    "password_resets": [
+        {"keys": [("email", 1)]},
+        {"keys": [("token", 1)]},
+    ],
+    "banks": [
+        {"keys": [("bank_name", 1)]},
+    ],
+    "states": [
+        {"keys": [("country_id", 1)]},
+    ],
+    "audit_logs": [
+        # Audit screens: equality on company and category, keyset on (timestamp, _id)
+        {"keys": [("company_id", 1), ("category", 1), ("timestamp", -1), ("_id", -1)]},
+        # Super admin view across all companies
+        {"keys": [("category", 1), ("timestamp", -1), ("_id", -1)]},
+        # Retention (archive_audit_logs.py)
+        {"keys": [("timestamp", -1)]},
+    ],
+    "clients": [
+        {"keys": [("company_id", 1), ("client_name", 1)], "options": {"unique": True}},
+        {"keys": [("company_id", 1), ("is_deleted", 1), ("status", 1)]},
+    ],
+    "job_descriptions": [
+        {"keys": [("client_id", 1), ("jd_title", 1)], "options": {"unique": True}},
+        {"keys": [("company_id", 1), ("client_id", 1), ("is_deleted", 1)]},
+        {"keys": [("company_id", 1), ("is_deleted", 1), ("status", 1)]},
+    ],
+    "analysis_history": [
+        {"keys": [("analysis_id", 1)], "options": {"unique": True}},
+        # One record per analysis job (records of synchronous uploads have no job_id)
+        {"keys": [("job_id", 1)], "options": {"unique": True, "partialFilterExpression": {"job_id": {"$exists": True}}}},
+        # /history for company admins (and the deleted-analyses list)
+        {"keys": [("company_id", 1), ("is_deleted", 1)] + KEYSET},
+        # /history for users and its client/JD filters
+        {"keys": [("company_id", 1), ("created_by", 1)] + KEYSET, "options": LIVE},
+        {"keys": [("company_id", 1), ("client_name", 1)] + KEYSET, "options": LIVE},
+        {"keys": [("company_id", 1), ("jd_id", 1)] + KEYSET, "options": LIVE},
+        {"keys": [("company_id", 1), ("status", 1)], "options": LIVE},
+        # Soft-delete/restore cascades from clients and JDs (live and deleted rows)
+        {"keys": [("client_id", 1), ("company_id", 1)]},
+        {"keys": [("jd_id", 1), ("company_id", 1)]},
+    ],
+    "company_usage": [
+        {"keys": [("company_id", 1), ("month", 1)], "options": {"unique": True}},
+    ],
+    "resume_text_cache": [
+        # Expire persistent entries RESUME_CACHE_TTL_DAYS after they were first written
+        {"keys": [("created_at", 1)], "options": {"expireAfterSeconds": RESUME_CACHE_TTL_DAYS * 24 * 3600}},
+    ],
+    "analysis_cache": [
+        {"keys": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+        {"keys": [("jd_tag", 1)]},
+    ],
+    "analysis_events": [
+        {"keys": [("job_id", 1), ("seq", 1)]},
+        {"keys": [("at", 1)], "options": {"expireAfterSeconds": 24 * 3600}},
+    ],
+    "analysis_event_counters": [
+        {"keys": [("updated_at", 1)], "options": {"expireAfterSeconds": 24 * 3600}},
+    ],
+    "analysis_jobs": [
+        {"keys": [("job_id", 1)], "options": {"unique": True}},
+        {"keys": [("state", 1), ("available_at", 1)]},
+        {"keys": [("state", 1), ("lease_expires_at", 1)]},
+    ],
+    "analysis_workers": [
+        # Forget workers that stopped heartbeating an hour ago
+        {"keys": [("last_heartbeat", 1)], "options": {"expireAfterSeconds": 3600}},
+    ],
+}
+
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _normalize_keys(keys) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in keys)
+
+
+def _option_diff(existing: Dict[str, Any], options: Dict[str, Any]) -> List[str]:
+    diff = []
+    for option in _COMPARED_OPTIONS:
+        current = existing.get(option)
+        wanted = options.get(option)
+        if option in ("unique", "sparse"):
+            current, wanted = bool(current), bool(wanted)
+        elif option == "expireAfterSeconds" and current is not None:
+            current = int(current)
+        if current != wanted:
+            diff.append(option)
+    return diff
+
+
+async def reconcile_indexes(db=None) -> Dict[str, List[str]]:
+    """
+    Bring every registered collection in line with INDEX_REGISTRY. Idempotent; errors are
+    reported per index instead of aborting the rest.
+    :return: {"created", "rebuilt", "ttl_updated", "unchanged", "unmanaged", "failed"}
+    """
+    db = db if db is not None else await get_db()
+    report = {"created": [], "rebuilt": [], "ttl_updated": [], "unchanged": [], "unmanaged": [], "failed": []}
+
+    for collection_name, specs in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except Exception as e:
+            report["failed"].append(f"{collection_name}: {e}")
+            continue
+        by_key = {_normalize_keys(info["key"]): (name, info) for name, info in existing.items()}
+        managed = {"_id_"}
+
+        for spec in specs:
+            keys = _normalize_keys(spec["keys"])
+            options = spec.get("options", {})
+            label = f"{collection_name}.{'_'.join(f'{f}_{d}' for f, d in keys)}"
+            try:
+                found = by_key.get(keys)
+                if found is None:
+                    managed.add(await collection.create_index(list(keys), **options))
+                    report["created"].append(label)
+                    continue
+
+                name, info = found
+                managed.add(name)
+                diff = _option_diff(info, options)
+                if not diff:
+                    report["unchanged"].append(label)
+                elif diff == ["expireAfterSeconds"] and info.get("expireAfterSeconds") is not None and "expireAfterSeconds" in options:
+                    await db.command("collMod", collection_name, index={"name": name, "expireAfterSeconds": options["expireAfterSeconds"]})
+                    report["ttl_updated"].append(label)
+                else:
+                    await collection.drop_index(name)
+                    managed.add(await collection.create_index(list(keys), **options))
+                    report["rebuilt"].append(f"{label} ({', '.join(diff)})")
+            except Exception as e:
+                report["failed"].append(f"{label}: {e}")
+
+        report["unmanaged"].extend(f"{collection_name}.{name}" for name in existing if name not in managed)
+
+    return report
+
+
+async def reconcile_indexes_on_startup() -> None:
+    if not INDEX_RECONCILE_ON_STARTUP:
+        return
+    report = await reconcile_indexes()
+    changed = report["created"] + report["rebuilt"] + report["ttl_updated"]
+    if changed:
+        print(f"Indexes reconciled: {', '.join(changed)}")
+    for failure in report["failed"]:
+        print(f"Index not reconciled: {failure}")
+
+
+# ---------- QUERY PLAN CHECK ----------
+# Representative filters/sorts of the hot queries. Placeholder values only need the right
+# type; the planner picks the same index for any value. Whole-collection listings of small
+# collections (e.g. every company for the super admin) are deliberately not listed.
+_ID = ObjectId()
+_NOW = datetime.utcnow()
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"name": "login super admin", "collection": "super_admins", "filter": {"email": "a@b.c"}},
+    {"name": "login company user", "collection": "company_users", "filter": {"email": "a@b.c", "is_deleted": False}},
+    {"name": "company by id", "collection": "companies", "filter": {"id": "x", "is_deleted": False}},
+    {"name": "active companies", "collection": "companies", "filter": {"is_deleted": False, "status": "active"}},
+    {"name": "deleted companies", "collection": "companies", "filter": {"is_deleted": True}},
+    {"name": "user by id", "collection": "company_users", "filter": {"id": "x", "is_deleted": False}},
+    {"name": "company users", "collection": "company_users", "filter": {"company_id": "x", "is_deleted": False}},
+    {"name": "company admins", "collection": "company_users",
+     "filter": {"company_id": "x", "is_deleted": False, "role": "company_admin"}},
+    {"name": "users by status", "collection": "company_users",
+     "filter": {"company_id": "x", "is_deleted": False, "status": "active"}, "sort": {"created_at": -1}},
+    {"name": "all live users", "collection": "company_users", "filter": {"is_deleted": False}, "sort": {"created_at": -1}},
+    {"name": "password reset token", "collection": "password_resets", "filter": {"token": "x"}},
+    {"name": "company audit logs", "collection": "audit_logs",
+     "filter": {"company_id": "x", "category": "activity"}, "sort": dict(KEYSET)},
+    {"name": "company audit logs page 2", "collection": "audit_logs",
+     "filter": {"$and": [{"company_id": "x", "category": "activity"},
+                         {"$or": [{"timestamp": {"$lt": _NOW}}, {"timestamp": _NOW, "_id": {"$lt": _ID}}]}]},
+     "sort": dict(KEYSET)},
+    {"name": "company audit logs by action", "collection": "audit_logs",
+     "filter": {"company_id": "x", "category": "activity", "action": {"$in": ["update_user"]},
+                "timestamp": {"$gte": _NOW}}, "sort": dict(KEYSET)},
+    {"name": "all audit logs", "collection": "audit_logs", "filter": {"category": "activity"}, "sort": dict(KEYSET)},
+    {"name": "uncategorized audit logs", "collection": "audit_logs", "filter": {"category": None}},
+    {"name": "audit logs to archive", "collection": "audit_logs", "filter": {"timestamp": {"$lt": _NOW}},
+     "sort": {"timestamp": 1}},
+    {"name": "client names", "collection": "clients", "filter": {"company_id": "x", "is_deleted": False},
+     "sort": {"client_name": 1}},
+    {"name": "client by name", "collection": "clients",
+     "filter": {"company_id": "x", "client_name": "Acme", "is_deleted": False}},
+    {"name": "clients by status", "collection": "clients", "filter": {"company_id": "x", "is_deleted": False, "status": "active"}},
+    {"name": "JDs for client", "collection": "job_descriptions",
+     "filter": {"client_id": _ID, "company_id": "x", "is_deleted": False}},
+    {"name": "JD by title", "collection": "job_descriptions",
+     "filter": {"client_id": _ID, "jd_title": "Engineer", "company_id": "x", "is_deleted": False}},
+    {"name": "JDs by status", "collection": "job_descriptions",
+     "filter": {"company_id": "x", "is_deleted": False, "status": "active"}},
+    {"name": "deleted JDs", "collection": "job_descriptions", "filter": {"company_id": "x", "is_deleted": True}},
+    {"name": "analysis by id", "collection": "analysis_history", "filter": {"analysis_id": "x", "company_id": "x"}},
+    {"name": "analysis by job", "collection": "analysis_history", "filter": {"job_id": "x"}},
+    {"name": "history (company admin)", "collection": "analysis_history",
+     "filter": {"company_id": "x", "is_deleted": False}, "sort": dict(KEYSET)},
+    {"name": "history page 2", "collection": "analysis_history",
+     "filter": {"$and": [{"company_id": "x", "is_deleted": False},
+                         {"$or": [{"timestamp": {"$lt": _NOW}}, {"timestamp": _NOW, "_id": {"$lt": _ID}}]}]},
+     "sort": dict(KEYSET)},
+    {"name": "history (user)", "collection": "analysis_history",
+     "filter": {"company_id": "x", "created_by": "u", "is_deleted": False}, "sort": dict(KEYSET)},
+    {"name": "history by client", "collection": "analysis_history",
+     "filter": {"company_id": "x", "is_deleted": False, "client_name": "Acme"}, "sort": dict(KEYSET)},
+    {"name": "history by JD", "collection": "analysis_history",
+     "filter": {"company_id": "x", "is_deleted": False, "jd_id": _ID}, "sort": dict(KEYSET)},
+    {"name": "analyses by status", "collection": "analysis_history",
+     "filter": {"company_id": "x", "is_deleted": False, "status": "active"}},
+    {"name": "deleted analyses", "collection": "analysis_history", "filter": {"company_id": "x", "is_deleted": True}},
+    {"name": "client cascade", "collection": "analysis_history",
+     "filter": {"client_id": _ID, "company_id": "x", "is_deleted": True}},
+    {"name": "JD cascade", "collection": "analysis_history", "filter": {"jd_id": _ID, "company_id": "x"}},
+    {"name": "monthly usage", "collection": "company_usage", "filter": {"company_id": "x", "month": "2024-01"}},
+    {"name": "analysis cache by JD", "collection": "analysis_cache", "filter": {"jd_tag": "x"}},
+    {"name": "job by id", "collection": "analysis_jobs", "filter": {"job_id": "x", "company_id": "x"}},
+    {"name": "claim next job", "collection": "analysis_jobs",
+     "filter": {"$or": [
+         {"state": "queued", "available_at": {"$lte": _NOW}},
+         {"state": {"$in": ["parsing", "analyzing", "storing"]}, "lease_expires_at": {"$lt": _NOW},
+          "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+     ]},
+     "sort": {"available_at": 1}},
+    {"name": "expired jobs out of attempts", "collection": "analysis_jobs",
+     "filter": {"state": {"$in": ["parsing", "analyzing", "storing"]}, "lease_expires_at": {"$lt": _NOW},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]}}},
+    {"name": "progress events", "collection": "analysis_events", "filter": {"job_id": "x", "seq": {"$gt": 0}},
+     "sort": {"seq": 1}},
+]
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Every "stage" name anywhere in an explain plan tree (classic and SBE formats)."""
+    stages = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def explain_query_shape(db, shape: Dict[str, Any]) -> List[str]:
+    command = {"find": shape["collection"], "filter": shape["filter"], "limit": 1}
+    if shape.get("sort"):
+        command["sort"] = shape["sort"]
+    explained = await db.command("explain", command, verbosity="queryPlanner")
+    return _plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+
+
+async def check_query_plans(db=None, shapes: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    """
+    Explain every query shape.
+    :return: names of the shapes whose winning plan is a collection scan
+    """
+    db = db if db is not None else await get_db()
+    failures = []
+    for shape in shapes or QUERY_SHAPES:
+        stages = await explain_query_shape(db, shape)
+        status = "COLLSCAN" if "COLLSCAN" in stages else ("IXSCAN" if any("IXSCAN" in s or s == "IDHACK" for s in stages) else "/".join(stages) or "?")
+        print(f"{status:10} {shape['collection']:18} {shape['name']}")
+        if "COLLSCAN" in stages:
+            failures.append(shape["name"])
+    return failures
+
+
+async def _main(check: bool, reconcile: bool) -> int:
+    if reconcile:
+        report = await reconcile_indexes()
+        for key in ("created", "rebuilt", "ttl_updated", "unmanaged", "failed"):
+            for item in report[key]:
+                print(f"{key}: {item}")
+    if not check:
+        return 0
+    failures = await check_query_plans()
+    if failures:
+        print(f"{len(failures)} query shape(s) use a COLLSCAN: {', '.join(failures)}")
+        return 1
+    print("All query shapes use an index")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile MongoDB indexes and verify query plans")
+    parser.add_argument("--check", action="store_true", help="Explain every query shape; exit 1 on a COLLSCAN")
+    parser.add_argument("--no-reconcile", action="store_true", help="Only check, do not create or rebuild indexes")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_main(args.check, not args.no_reconcile)))
+
+
+if __name__ == "__main__":
+    main()
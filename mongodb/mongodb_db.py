@@ -4,14 +4,15 @@ from datetime import datetime
 import uuid
 from typing import Dict, List, Optional, Set
 from utils.common_utils import to_init_caps
-from parsing.parsing_utils import extract_email, extract_mobile_number
+from parsing.contact_extractor import extract_contacts
 from dotenv import load_dotenv
 from pathlib import Path
-from bson import Binary
-from docx import Document
-import PyPDF2
-import io
 import asyncio
+import json
+import base64
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from cache.memory_cache import LRUCache
 
 # --------------------
 # Database Initialization (Async)
@@ -43,82 +44,22 @@ async def get_db():
     return db
 
 # --------------------
-# Utility Functions (Keep sync for file processing)
+# Utility Functions (File processing)
 # --------------------
-import os
-import io
-import tempfile
-import subprocess
-import platform
-from typing import Optional
-import PyPDF2
-
-try:
-    from docx import Document
-except ImportError:
-    Document = None
+from parsing.document_normalizer import normalize_document
+from storage.blob_store import put_blob, release_blob
+from mongodb.audit_buffer import get_audit_buffer
 
 
-def count_pages(file_content: bytes, filename: str) -> int:
+async def count_pages(file_content: bytes, filename: str, bundle: Optional[Dict] = None) -> int:
     """
     Count pages in PDF, DOC, or DOCX files.
-    Uses:
-        - PDF: direct count
-        - DOC/DOCX: via LibreOffice (Linux/macOS) or fallback estimate
+    Reads the page count from the upload's normalization bundle (DOC/DOCX are
+    converted to PDF once there); normalizes the upload if no bundle is given.
     """
-    file_extension = os.path.splitext(filename)[1].lower()
-
-    try:
-        # ---------- PDF ----------
-        if file_extension == ".pdf":
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            return len(pdf_reader.pages)
-
-        # ---------- DOC/DOCX ----------
-        elif file_extension in [".doc", ".docx"]:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                input_path = os.path.join(tmpdir, filename)
-                output_pdf = os.path.join(tmpdir, "converted.pdf")
-
-                with open(input_path, "wb") as f:
-                    f.write(file_content)
-
-                # Convert DOC/DOCX → PDF using LibreOffice
-                try:
-                    subprocess.run(
-                        ["soffice", "--headless", "--convert-to", "pdf", "--outdir", tmpdir, input_path],
-                        check=True,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL
-                    )
-
-                    if os.path.exists(output_pdf):
-                        with open(output_pdf, "rb") as pdf_file:
-                            pdf_reader = PyPDF2.PdfReader(pdf_file)
-                            return len(pdf_reader.pages)
-                except Exception as err:
-                    print(f"LibreOffice conversion failed: {err}")
-
-                # --- Fallback (no LibreOffice or error) ---
-                if Document:
-                    doc = Document(io.BytesIO(file_content))
-                    return max(1, len(doc.paragraphs) // 10)
-                return 1
-
-        # ---------- Other file types ----------
-        else:
-            return 1
-
-    except Exception as e:
-        print(f"Error counting pages for {filename}: {e}")
-        # Fallback to paragraph-based estimate for DOCX
-        if Document and file_extension in [".doc", ".docx"]:
-            try:
-                doc = Document(io.BytesIO(file_content))
-                return max(1, len(doc.paragraphs) // 10)
-            except:
-                return 1
-        return 1
+    if bundle is None:
+        bundle = await normalize_document(file_content, filename)
+    return bundle["page_count"]
 
 
 # --------------------
@@ -203,6 +144,61 @@ async def fetch_client_details_by_jd(client_name: str, jd_name: str, company_id:
     except Exception as e:
         raise Exception(f"Failed to fetch client details by JD: {str(e)}")
 
+async def fetch_jd_for_analysis(
+    company_id: str,
+    client_name: Optional[str] = None,
+    jd_title: Optional[str] = None,
+    jd_id: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    Resolve a JD reference (client + jd_title, or a job_descriptions _id) into
+    the jd_data dict used by the analysis pipeline.
+    """
+    try:
+        db = await get_db()
+        if jd_id:
+            from bson import ObjectId
+            jd_doc = await db.job_descriptions.find_one({
+                "_id": ObjectId(jd_id),
+                "company_id": company_id,
+                "is_deleted": False
+            })
+            if not jd_doc:
+                return None
+            client_doc = await db.clients.find_one({"_id": jd_doc["client_id"], "is_deleted": False})
+        else:
+            client_doc = await db.clients.find_one({
+                "client_name": await to_init_caps(client_name),
+                "company_id": company_id,
+                "is_deleted": False
+            })
+            if not client_doc:
+                return None
+            jd_doc = await db.job_descriptions.find_one({
+                "client_id": client_doc["_id"],
+                "jd_title": await to_init_caps(jd_title),
+                "company_id": company_id,
+                "is_deleted": False
+            })
+
+        if not jd_doc or not client_doc:
+            return None
+
+        return {
+            "jd_id": str(jd_doc["_id"]),
+            "client_name": client_doc["client_name"],
+            "jd_title": jd_doc.get("jd_title", ""),
+            "required_experience": jd_doc.get("required_experience", ""),
+            "primary_skills": jd_doc.get("primary_skills", []),
+            "secondary_skills": jd_doc.get("secondary_skills", []),
+            "location": jd_doc.get("location"),
+            "budget": jd_doc.get("budget"),
+            "number_of_positions": jd_doc.get("number_of_positions"),
+            "work_mode": jd_doc.get("work_mode")
+        }
+    except Exception as e:
+        raise Exception(f"Failed to fetch JD for analysis: {str(e)}")
+
 async def fetch_jd_names_for_client(client_name: str, company_id: str, status: Optional[str] = None) -> Optional[List[str]]:
     try:
         db = await get_db()
@@ -448,6 +444,10 @@ async def update_job_description(client_name: str, jd_name: str, required_experi
                 "secondary_skills": secondary_skills
             }}
         )
+
+        if result.modified_count > 0:
+            from cache.analysis_cache import invalidate_jd_analyses
+            await invalidate_jd_analyses(company_id, client_name, jd_name)
         
         return result.modified_count > 0
     except Exception as e:
@@ -629,11 +629,20 @@ async def store_results_in_mongodb(
     created_by: str,
     company_id: str,
     name: str,
-    role: str
+    role: str,
+    page_count: Optional[int] = None,
+    extra_fields: Optional[Dict] = None,
+    contacts: Optional[Dict] = None,
+    job_id: Optional[str] = None
 ) -> Optional[str]:
+    """
+    :param job_id: analysis job the record belongs to; a retried job gets back the record an
+        earlier attempt stored instead of a second one
+    """
     try:
         db = await get_db()
-        page_count = count_pages(file_content, filename)
+        if page_count is None:
+            page_count = await count_pages(file_content, filename)
         current_time = datetime.now()
 
         # ===== CLIENT SECTION =====
@@ -722,8 +731,13 @@ async def store_results_in_mongodb(
 
         # ===== ANALYSIS SECTION =====
         analysis_id = str(uuid.uuid4())
-        candidate_email = extract_email(resume_text)
-        candidate_mobile = extract_mobile_number(resume_text)  # NEW: Extract mobile
+        # The upload itself goes to the blob store (once per content); the record references it
+        blob = await put_blob(file_content, filename)
+        # Contacts are extracted once per request upstream; fall back for direct callers
+        if contacts is None:
+            contacts = extract_contacts(resume_text)
+        candidate_email = contacts["email"] or "No email found"
+        candidate_mobile = contacts["mobile"]
         candidate_name = analysis_data.get("candidate_info", {}).get("candidate_name", "Not specified")
         profile_feedback = analysis_data.get("profile_feedback", {})
         
@@ -736,7 +750,9 @@ async def store_results_in_mongodb(
             "timestamp": current_time,
             "candidate_name": candidate_name,
             "filename": filename,
-            "file_content": Binary(file_content),
+            "file_hash": blob["file_hash"],
+            "file_size": blob["file_size"],
+            "mime_type": blob["mime_type"],
             "page_count": page_count,
             "client_id": client_id,
             "client_name": client_doc["client_name"],
@@ -750,6 +766,7 @@ async def store_results_in_mongodb(
             "freelancer_status": profile_feedback.get("freelancer_status", False),
             "has_linkedin": profile_feedback.get("has_linkedin", False),
             "linkedin_url": profile_feedback.get("linkedin_url", ""),
+            "github_url": contacts["github_url"],
             "has_email": profile_feedback.get("has_email", False),
             "has_mobile": bool(candidate_mobile),  # NEW FIELD
             "match_score": analysis_data.get("skill_analysis", {}).get("match_score", 0),
@@ -764,41 +781,232 @@ async def store_results_in_mongodb(
             "status": "active",
             "is_deleted": False,
         }
+        if extra_fields:
+            analysis_record.update(extra_fields)
 
-        await db.analysis_history.insert_one(analysis_record)
+        if job_id:
+            analysis_record["job_id"] = job_id
+            try:
+                result = await db.analysis_history.update_one(
+                    {"job_id": job_id}, {"$setOnInsert": analysis_record}, upsert=True
+                )
+                stored = result.upserted_id is not None
+            except DuplicateKeyError:
+                # Concurrent upsert by another attempt of the same job
+                stored = False
+            except Exception:
+                await release_blob(blob["file_hash"])
+                raise
+            if not stored:
+                await release_blob(blob["file_hash"])
+                existing = await db.analysis_history.find_one({"job_id": job_id}, {"analysis_id": 1})
+                return existing["analysis_id"]
+            return analysis_id
+
+        try:
+            await db.analysis_history.insert_one(analysis_record)
+        except Exception:
+            await release_blob(blob["file_hash"])
+            raise
 
         return analysis_id
 
     except Exception as e:
         raise Exception(f"Failed to store results in MongoDB: {str(e)}")
 
-async def fetch_analysis_history(current_user: dict) -> List[Dict]:
+# ---------- ANALYSIS HISTORY (KEYSET PAGINATION) ----------
+# Pages are ordered by (timestamp, _id) descending; the cursor is the last row's key, so
+# every page is an index range scan no matter how deep the client pages.
+HISTORY_DEFAULT_PAGE_SIZE = int(os.getenv("HISTORY_DEFAULT_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+HISTORY_SORT = [("timestamp", -1), ("_id", -1)]
+
+# Projection presets: "list" carries what the history tables render, "full" everything
+# except a legacy embedded file
+HISTORY_PROJECTIONS = {
+    "list": {
+        "analysis_id": 1, "timestamp": 1, "candidate_name": 1, "candidate_email": 1,
+        "candidate_mobile": 1, "filename": 1, "page_count": 1, "client_id": 1, "client_name": 1,
+        "jd_id": 1, "jd_title": 1, "required_experience": 1, "match_score": 1,
+        "experience_match": 1, "frequent_hopper": 1, "freelancer_status": 1,
+        "total_experience": 1, "status": 1, "created_by": 1, "analysis_mode": 1,
+    },
+    "full": {"file_content": 0},
+}
+
+
+def encode_history_cursor(item: Dict) -> str:
+    payload = json.dumps({"t": item["timestamp"].isoformat(), "i": str(item["_id"])})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Dict:
+    """Keyset condition for the page after the cursor. Raises ValueError for a bad cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        timestamp = datetime.fromisoformat(payload["t"])
+        last_id = ObjectId(payload["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": last_id}},
+    ]}
+
+
+def build_history_filters(filters: Dict) -> Dict:
+    """
+    Server-side filters: created_by (comma-separated user ids), client_name, jd_id, jd_title,
+    date_from/date_to, min_score/max_score, experience_match, frequent_hopper,
+    freelancer_status. None values are ignored.
+    """
+    query: Dict = {}
+    if filters.get("created_by"):
+        user_ids = [user_id for user_id in filters["created_by"].split(",") if user_id]
+        query["created_by"] = user_ids[0] if len(user_ids) == 1 else {"$in": user_ids}
+    if filters.get("client_name"):
+        query["client_name"] = filters["client_name"]
+    if filters.get("jd_id"):
+        try:
+            query["jd_id"] = ObjectId(filters["jd_id"])
+        except Exception:
+            raise ValueError("Invalid jd_id")
+    if filters.get("jd_title"):
+        query["jd_title"] = filters["jd_title"]
+
+    date_range = {}
+    if filters.get("date_from"):
+        date_range["$gte"] = filters["date_from"]
+    if filters.get("date_to"):
+        date_range["$lte"] = filters["date_to"]
+    if date_range:
+        query["timestamp"] = date_range
+
+    score_range = {}
+    if filters.get("min_score") is not None:
+        score_range["$gte"] = filters["min_score"]
+    if filters.get("max_score") is not None:
+        score_range["$lte"] = filters["max_score"]
+    if score_range:
+        query["match_score"] = score_range
+
+    for flag in ("experience_match", "frequent_hopper", "freelancer_status"):
+        if filters.get(flag) is not None:
+            query[flag] = filters[flag]
+    return query
+
+
+def history_scope(current_user: dict) -> Dict:
+    """The analysis_history rows a user may see."""
+    if current_user["role"] == "company_admin":
+        # Company admin can see all analyses for their company
+        return {"company_id": current_user["company_id"], "is_deleted": False}
+    if current_user["role"] == "user":
+        # Regular user can only see their own analyses within their company
+        return {
+            "company_id": current_user["company_id"],
+            "created_by": current_user["user_id"],
+            "is_deleted": False
+        }
+    # For other roles, return empty
+    return {"company_id": "invalid_id"}  # Ensure no results
+
+
+async def fetch_history_stats(current_user: dict, year: Optional[int] = None) -> Dict:
+    """
+    Dashboard numbers over the user's whole history, computed in one aggregation so the
+    dashboards never download the history itself.
+    :param year: year of the monthly breakdown (default: current year)
+    :return: {"total", "current_month": {"analyses", "pages"}, "by_user": [{"user_id",
+              "analyses", "pages"}], "monthly": [{"user_id", "month", "analyses", "pages"}],
+              "clients", "jd_titles"}
+    """
+    # Timestamps are stored in server-local time (datetime.now())
+    now = datetime.now()
+    year = year or now.year
+    month_start = datetime(now.year, now.month, 1)
+    totals = {"analyses": {"$sum": 1}, "pages": {"$sum": {"$ifNull": ["$page_count", 0]}}}
+
     try:
         db = await get_db()
-        # Build query based on user role - only for analysis history
-        if current_user["role"] == "company_admin":
-            # Company admin can see all analyses for their company
-            query = {"company_id": current_user["company_id"],
-                     "is_deleted": False}
-        elif current_user["role"] == "user":
-            # Regular user can only see their own analyses within their company
-            query = {
-                "company_id": current_user["company_id"],
-                "created_by": current_user["user_id"],
-                "is_deleted": False
-            }
-        else:
-            # For other roles, return empty
-            query = {"company_id": "invalid_id"}  # Ensure no results
-            
-        # Exclude file_content from the query to reduce payload size
-        history_cursor = db.analysis_history.find(
-            query, 
-            {"file_content": 0}  # Exclude file content from results
-        ).sort("timestamp", -1)
-        
-        history = await history_cursor.to_list(length=None)
-        
+        result = await db.analysis_history.aggregate([
+            {"$match": history_scope(current_user)},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "current_month": [
+                    {"$match": {"timestamp": {"$gte": month_start}}},
+                    {"$group": {"_id": None, **totals}},
+                ],
+                "by_user": [{"$group": {"_id": "$created_by", **totals}}],
+                "monthly": [
+                    {"$match": {"timestamp": {"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)}}},
+                    {"$group": {"_id": {"user_id": "$created_by", "month": {"$month": "$timestamp"}}, **totals}},
+                ],
+                "clients": [{"$group": {"_id": "$client_name"}}, {"$sort": {"_id": 1}}],
+                "jd_titles": [{"$group": {"_id": "$jd_title"}}, {"$sort": {"_id": 1}}],
+            }},
+        ]).to_list(length=1)
+        facets = result[0] if result else {}
+
+        current_month = (facets.get("current_month") or [{}])[0]
+        return {
+            "total": (facets.get("total") or [{"count": 0}])[0]["count"],
+            "current_month": {"analyses": current_month.get("analyses", 0), "pages": current_month.get("pages", 0)},
+            "by_user": [
+                {"user_id": row["_id"], "analyses": row["analyses"], "pages": row["pages"]}
+                for row in facets.get("by_user", [])
+            ],
+            "monthly": [
+                {"user_id": row["_id"]["user_id"], "month": row["_id"]["month"], "analyses": row["analyses"], "pages": row["pages"]}
+                for row in facets.get("monthly", [])
+            ],
+            "clients": [row["_id"] for row in facets.get("clients", []) if row["_id"]],
+            "jd_titles": [row["_id"] for row in facets.get("jd_titles", []) if row["_id"]],
+        }
+
+    except Exception as e:
+        raise Exception(f"Failed to fetch history stats: {str(e)}")
+
+
+async def fetch_analysis_history(
+    current_user: dict,
+    filters: Optional[Dict] = None,
+    cursor: Optional[str] = None,
+    limit: int = HISTORY_DEFAULT_PAGE_SIZE,
+    view: str = "list"
+) -> Dict:
+    """
+    One page of the analysis history visible to the user, newest first.
+    :param cursor: next_cursor of the previous page
+    :param limit: page size, capped at HISTORY_MAX_PAGE_SIZE
+    :param view: projection preset ("list" or "full")
+    :return: {"items", "next_cursor" (None on the last page), "limit"}
+    """
+    # Bad cursors/filters are the caller's fault: raise ValueError before the generic wrapper
+    if view not in HISTORY_PROJECTIONS:
+        raise ValueError(f"view must be one of {list(HISTORY_PROJECTIONS)}")
+    limit = max(1, min(limit or HISTORY_DEFAULT_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE))
+    filter_query = build_history_filters(filters or {})
+    cursor_query = decode_history_cursor(cursor) if cursor else None
+
+    try:
+        db = await get_db()
+        query = history_scope(current_user)
+        if "created_by" in query:
+            # Regular users only ever see their own analyses
+            filter_query.pop("created_by", None)
+        query.update(filter_query)
+        if cursor_query:
+            query = {"$and": [query, cursor_query]}
+
+        # One extra row tells whether another page exists
+        history = await db.analysis_history.find(
+            query, HISTORY_PROJECTIONS[view]
+        ).sort(HISTORY_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = encode_history_cursor(history[limit - 1]) if len(history) > limit else None
+        history = history[:limit]
+
         # Convert ObjectId to string for JSON serialization
         for item in history:
             item["_id"] = str(item["_id"])
@@ -806,11 +1014,12 @@ async def fetch_analysis_history(current_user: dict) -> List[Dict]:
                 item["client_id"] = str(item["client_id"])
             if "jd_id" in item:
                 item["jd_id"] = str(item["jd_id"])
-        return history
+        return {"items": history, "next_cursor": next_cursor, "limit": limit}
     
     except Exception as e:
         raise Exception(f"Failed to fetch history: {str(e)}")
 
+
 async def update_analysis_status(analysis_id: str, company_id: str, status: str) -> bool:
     """
     Update the status of an analysis
@@ -903,6 +1112,7 @@ async def initialize_usage_tracking(company_id: str):
         "last_updated": datetime.now()
     }
     await db.company_usage.insert_one(usage_record)
+    invalidate_usage_summaries()
 
 async def get_current_month_usage(company_id: str) -> int:
     """Get current month's page usage for a company"""
@@ -930,6 +1140,7 @@ async def increment_usage(company_id: str, page_count: int):
         },
         upsert=True
     )
+    invalidate_usage_summaries()
     
     return result.modified_count > 0
 
@@ -963,6 +1174,153 @@ async def get_usage_stats(company_id: str) -> Dict:
         "usage_percentage": (current_usage / page_limit * 100) if page_limit > 0 else 0
     }
 
+# ---------- SUPER ADMIN USAGE SUMMARIES ----------
+# Dashboard, company list and usage report join companies with this month's company_usage
+# in one aggregation ($lookup on the (company_id, month) index) instead of one usage query
+# per company. Results are cached per process for USAGE_SUMMARY_TTL_SECONDS and dropped on
+# every usage or company write made through this process; writes from other processes
+# (queue workers) show up within the TTL.
+USAGE_SUMMARY_TTL_SECONDS = int(os.getenv("USAGE_SUMMARY_TTL_SECONDS", "15"))
+DEFAULT_MONTHLY_PAGE_LIMIT = 1000
+
+_usage_summaries = LRUCache(maxsize=64, ttl_seconds=USAGE_SUMMARY_TTL_SECONDS)
+
+
+def invalidate_usage_summaries() -> None:
+    _usage_summaries.clear()
+
+
+def _usage_lookup(month: str) -> Dict:
+    """Attach the company's usage document for the month as a 0/1-element "usage" array."""
+    # let + $expr rather than localField/foreignField with a pipeline, which needs MongoDB 5.0+
+    return {"$lookup": {
+        "from": "company_usage",
+        "let": {"company_id": "$id"},
+        "pipeline": [
+            {"$match": {"$expr": {"$and": [
+                {"$eq": ["$company_id", "$$company_id"]},
+                {"$eq": ["$month", month]},
+            ]}}},
+            {"$limit": 1},
+        ],
+        "as": "usage",
+    }}
+
+
+_USAGE_PAGE_COUNT = {"$ifNull": [{"$arrayElemAt": ["$usage.page_count", 0]}, 0]}
+_PAGE_LIMIT = {"$ifNull": ["$monthly_page_limit", DEFAULT_MONTHLY_PAGE_LIMIT]}
+
+
+async def get_dashboard_summary() -> Dict:
+    """Company/user counts by status and this month's usage totals over active companies."""
+    cached = _usage_summaries.get(("dashboard",))
+    if cached is not None:
+        return cached
+
+    db = await get_db()
+    current_month = datetime.now().strftime("%Y-%m")
+    company_pipeline = [
+        {"$match": {"is_deleted": False}},
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "usage": [
+                {"$match": {"status": "active"}},
+                _usage_lookup(current_month),
+                {"$group": {
+                    "_id": None,
+                    "total_limit": {"$sum": _PAGE_LIMIT},
+                    "total_usage": {"$sum": _USAGE_PAGE_COUNT},
+                }},
+            ],
+        }},
+    ]
+    user_pipeline = [
+        {"$match": {"is_deleted": False}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]
+    company_facets, user_counts = await asyncio.gather(
+        db.companies.aggregate(company_pipeline).to_list(length=1),
+        db.company_users.aggregate(user_pipeline).to_list(length=None),
+    )
+
+    facets = company_facets[0] if company_facets else {"by_status": [], "usage": []}
+    companies_by_status = {row["_id"]: row["count"] for row in facets["by_status"]}
+    users_by_status = {row["_id"]: row["count"] for row in user_counts}
+    totals = facets["usage"][0] if facets["usage"] else {}
+    total_limit = totals.get("total_limit", 0)
+    total_usage = totals.get("total_usage", 0)
+
+    summary = {
+        "companies_count": companies_by_status.get("active", 0),
+        "users_count": users_by_status.get("active", 0),
+        "inactive_companies_count": companies_by_status.get("inactive", 0),
+        "inactive_users_count": users_by_status.get("inactive", 0),
+        "total_page_limit": total_limit,
+        "total_current_usage": total_usage,
+        "total_usage_percentage": (total_usage / total_limit * 100) if total_limit > 0 else 0
+    }
+    _usage_summaries.set(("dashboard",), summary)
+    return summary
+
+
+async def list_companies_with_usage(status: Optional[str] = None) -> List[Dict]:
+    """Live companies (newest first) with current_month_usage and monthly_page_limit."""
+    cached = _usage_summaries.get(("companies", status))
+    if cached is not None:
+        return cached
+
+    db = await get_db()
+    query = {"is_deleted": False}
+    if status:
+        query["status"] = status
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"created_at": -1}},
+        _usage_lookup(datetime.now().strftime("%Y-%m")),
+        {"$addFields": {"current_month_usage": _USAGE_PAGE_COUNT, "monthly_page_limit": _PAGE_LIMIT}},
+        {"$project": {"_id": 0, "usage": 0}},
+    ]
+    items = await db.companies.aggregate(pipeline).to_list(length=None)
+    _usage_summaries.set(("companies", status), items)
+    return items
+
+
+async def get_usage_report(month: str) -> List[Dict]:
+    """Per active company: usage, limit, remaining pages and total paid for the month."""
+    cached = _usage_summaries.get(("usage_report", month))
+    if cached is not None:
+        return cached
+
+    db = await get_db()
+    pipeline = [
+        {"$match": {"is_deleted": False, "status": "active"}},
+        {"$project": {"_id": 0, "id": 1, "name": 1}},
+        _usage_lookup(month),
+    ]
+    report = []
+    async for company in db.companies.aggregate(pipeline):
+        usage_doc = company["usage"][0] if company["usage"] else {}
+        current_usage = usage_doc.get("page_count", 0)
+        monthly_limit = usage_doc.get("page_limit", 0)
+        history = usage_doc.get("history", [])
+
+        remaining_pages = max(monthly_limit - current_usage, 0)
+        total_paid = sum(h.get("amount_paid", 0) for h in history) if history else 0
+        usage_percentage = (current_usage / monthly_limit * 100) if monthly_limit > 0 else 0
+
+        report.append({
+            "company_id": company["id"],
+            "company_name": company["name"],
+            "current_usage": current_usage,
+            "monthly_limit": monthly_limit,
+            "remaining_pages": remaining_pages,
+            "usage_percentage": round(usage_percentage, 1),
+            "total_paid": total_paid,
+            "history": history
+        })
+    _usage_summaries.set(("usage_report", month), report)
+    return report
+
 # --------------------
 # Deleted Items Functions (Async)
 # --------------------
@@ -1023,6 +1381,40 @@ async def get_analyses_by_status(company_id: str, status: str):
 # --------------------
 # Audit Log Functions (Async)
 # --------------------
+# Routine actions are recorded for traceability but hidden from the audit screens. The
+# category is stored on each entry at write time, so the screens filter with an equality
+# match on an indexed field instead of an action $nin list.
+AUDIT_CATEGORY_ACTIVITY = "activity"
+AUDIT_CATEGORY_SYSTEM = "system"
+AUDIT_SYSTEM_ACTIONS = frozenset({
+    "upload_company_logo",
+    "create_company",
+    "update_company_limit",
+    "upload_user_profile_photo",
+    "create_user",
+    "restore_user",
+    "restore_company_with_user",
+    "analyze_resume",
+    "restore_analysis",
+    "restore_client",
+    "restore_jd",
+    "update_client",
+    "update_client_status",
+    "reset_company_usage",
+    "create_bank",
+    "update_bank",
+    "update_bank_status",
+    "delete_bank",
+})
+
+AUDIT_LOG_DEFAULT_PAGE_SIZE = int(os.getenv("AUDIT_LOG_DEFAULT_PAGE_SIZE", "100"))
+AUDIT_LOG_MAX_PAGE_SIZE = int(os.getenv("AUDIT_LOG_MAX_PAGE_SIZE", "500"))
+
+
+def audit_category(action: Optional[str]) -> str:
+    return AUDIT_CATEGORY_SYSTEM if action in AUDIT_SYSTEM_ACTIONS else AUDIT_CATEGORY_ACTIVITY
+
+
 async def log_audit_trail(
     user_id: str = None, 
     name: str = None,
@@ -1035,7 +1427,6 @@ async def log_audit_trail(
     new_data: dict = None,
     screen: str = None 
 ):
-    db = await get_db()
     log = {
         "user_id": user_id,
         "name": name,
@@ -1047,6 +1438,73 @@ async def log_audit_trail(
         "old_data": old_data,
         "new_data": new_data,
         "screen": screen,
+        "category": audit_category(action),
         "timestamp": datetime.utcnow()
     }
-    await db.audit_logs.insert_one(log)
+    # Written behind by the audit buffer in batches
+    get_audit_buffer().enqueue(log)
+
+
+async def backfill_audit_categories() -> int:
+    """
+    Set the category on entries written before it existed. Cheap once done: the query is a
+    null range on the (category, timestamp) index.
+    :return: number of entries updated
+    """
+    db = await get_db()
+    system = await db.audit_logs.update_many(
+        {"category": None, "action": {"$in": list(AUDIT_SYSTEM_ACTIONS)}},
+        {"$set": {"category": AUDIT_CATEGORY_SYSTEM}}
+    )
+    activity = await db.audit_logs.update_many(
+        {"category": None},
+        {"$set": {"category": AUDIT_CATEGORY_ACTIVITY}}
+    )
+    return system.modified_count + activity.modified_count
+
+
+async def fetch_audit_logs(
+    scope: Dict,
+    actions: Optional[List[str]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = AUDIT_LOG_DEFAULT_PAGE_SIZE
+) -> Dict:
+    """
+    One page of visible audit entries, newest first (same keyset as the analysis history).
+    :param scope: company condition, e.g. {"company_id": "..."}; {} for all companies
+    :param actions: only these actions
+    :param cursor: next_cursor of the previous page
+    :return: {"logs", "next_cursor" (None on the last page), "limit"}
+    """
+    limit = max(1, min(limit or AUDIT_LOG_DEFAULT_PAGE_SIZE, AUDIT_LOG_MAX_PAGE_SIZE))
+    cursor_query = decode_history_cursor(cursor) if cursor else None
+
+    query = {**scope, "category": AUDIT_CATEGORY_ACTIVITY}
+    if actions:
+        query["action"] = {"$in": actions}
+    date_range = {}
+    if date_from:
+        date_range["$gte"] = date_from
+    if date_to:
+        date_range["$lte"] = date_to
+    if date_range:
+        query["timestamp"] = date_range
+    if cursor_query:
+        query = {"$and": [query, cursor_query]}
+
+    try:
+        db = await get_db()
+        logs = await db.audit_logs.find(query, {"category": 0}).sort(HISTORY_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = encode_history_cursor(logs[limit - 1]) if len(logs) > limit else None
+        logs = logs[:limit]
+        for log in logs:
+            log.pop("_id", None)
+            if isinstance(log.get("timestamp"), datetime):
+                log["timestamp"] = log["timestamp"].isoformat()
+        return {"logs": logs, "next_cursor": next_cursor, "limit": limit}
+
+    except Exception as e:
+        raise Exception(f"Failed to fetch audit logs: {str(e)}")
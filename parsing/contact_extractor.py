@@ -0,0 +1,91 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+# ---------- CONTACT EXTRACTION ----------
+# One precompiled pattern, one finditer sweep: emails, phones, LinkedIn and GitHub URLs come
+# out of the same scan. Alternatives are ordered so a URL or email is consumed before its
+# digits could be read as a phone number.
+
+# Country code assumed for national numbers without one
+DEFAULT_PHONE_COUNTRY_CODE = os.getenv("DEFAULT_PHONE_COUNTRY_CODE", "91")
+
+_CONTACT_RE = re.compile(
+    r"(?P<linkedin>(?<![\w/.])(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[\w\-%]+/?)"
+    r"|(?P<github>(?<![\w/.])(?:https?://)?(?:www\.)?github\.com/[a-z0-9](?:[a-z0-9\-]{0,38}))"
+    r"|(?P<email>(?<![\w.%+-])[\w.%+-]+@[a-z0-9.-]+\.[a-z]{2,})"
+    r"|(?P<phone>(?<![\w+])(?:\+|00)?\d(?:[ .\-()]{0,2}\d){7,14}(?!\w))",
+    re.IGNORECASE
+)
+_NON_DIGIT_RE = re.compile(r"\D")
+_PHONE_GROUP_RE = re.compile(r"[ .\-()]+")
+
+
+def _e164(digits: str, international: bool) -> Optional[str]:
+    """E.164 form of a digit string, or None if it is not a plausible phone number."""
+    if international:
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10 and digits[0] in "6789":
+        return f"+{DEFAULT_PHONE_COUNTRY_CODE}{digits}"
+    if len(digits) == 11 and digits[0] == "0" and digits[1] in "6789":
+        return f"+{DEFAULT_PHONE_COUNTRY_CODE}{digits[1:]}"
+    if len(digits) == 12 and digits.startswith("91") and digits[2] in "6789":
+        return f"+{digits}"
+    return None
+
+
+def normalize_phone(candidate: str) -> Optional[str]:
+    """
+    Normalize a phone-like match to E.164. If the whole match is not a phone (e.g. a number
+    glued to a following year), shorter prefixes of its digit groups are tried.
+    """
+    candidate = candidate.strip()
+    international = candidate.startswith("+") or candidate.startswith("00")
+    groups = [g for g in _PHONE_GROUP_RE.split(candidate.lstrip("+")) if g]
+    for end in range(len(groups), 0, -1):
+        digits = _NON_DIGIT_RE.sub("", "".join(groups[:end]))
+        if international and candidate.startswith("00"):
+            digits = digits[2:]
+        phone = _e164(digits, international)
+        if phone:
+            return phone
+    return None
+
+
+def _normalize_url(url: str) -> str:
+    url = url.rstrip("/")
+    if not url.lower().startswith("http"):
+        url = "https://" + url
+    return url
+
+
+def extract_contacts(text: str) -> Dict[str, object]:
+    """
+    All contact fields from one pass over the text.
+    :return: {"emails", "phones" (E.164), "linkedin_urls", "github_urls"} lists in order of
+             appearance, plus the first of each as "email", "mobile", "linkedin_url",
+             "github_url" ("" when absent)
+    """
+    found: Dict[str, List[str]] = {"emails": [], "phones": [], "linkedin_urls": [], "github_urls": []}
+    for match in _CONTACT_RE.finditer(text or ""):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "email":
+            found["emails"].append(value.strip("."))
+        elif kind == "phone":
+            phone = normalize_phone(value)
+            if phone:
+                found["phones"].append(phone)
+        elif kind == "linkedin":
+            found["linkedin_urls"].append(_normalize_url(value))
+        else:
+            found["github_urls"].append(_normalize_url(value))
+
+    contacts: Dict[str, object] = {key: list(dict.fromkeys(values)) for key, values in found.items()}
+    contacts.update({
+        "email": contacts["emails"][0] if contacts["emails"] else "",
+        "mobile": contacts["phones"][0] if contacts["phones"] else "",
+        "linkedin_url": contacts["linkedin_urls"][0] if contacts["linkedin_urls"] else "",
+        "github_url": contacts["github_urls"][0] if contacts["github_urls"] else "",
+    })
+    return contacts
@@ -0,0 +1,72 @@
+import os
+import time
+import tempfile
+from typing import Any, Dict, Optional
+
+from parsing.parsing_utils import extract_text_local, score_text_quality
+from parsing.libreoffice_pool import convert_document
+from parsing.document_service import run_document_task, read_pdf_file, docx_paragraph_page_estimate
+
+# ---------- DOCUMENT NORMALIZATION ----------
+# Every upload is normalized exactly once into a bundle that page counting and text
+# extraction both read from. Word files are converted to PDF a single time; the PDF is
+# kept for LlamaParse instead of being thrown away after counting pages.
+
+SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".doc"]
+
+
+async def normalize_document(file_content: bytes, filename: str, file_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Convert an upload once and extract everything later stages need from it.
+    :param file_content: Raw upload
+    :param filename: Original file name, used for its extension
+    :param file_hash: SHA-256 of the upload, carried on the bundle
+    :return: {"file_hash", "extension", "page_count", "pdf_bytes", "text", "text_parser",
+              "quality", "elapsed_ms"}; pdf_bytes is None if no PDF could be produced
+    """
+    started = time.perf_counter()
+    extension = os.path.splitext(filename)[1].lower()
+    pdf_bytes = None
+    page_count = 1
+    text, text_parser, quality = "", "local", score_text_quality("", 1)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        original_path = os.path.join(tmpdir, "upload" + extension)
+        with open(original_path, "wb") as f:
+            f.write(file_content)
+
+        pdf_path = None
+        if extension == ".pdf":
+            pdf_path = original_path
+        elif extension in [".doc", ".docx"]:
+            try:
+                pdf_path = await convert_document(original_path, "pdf", tmpdir)
+            except Exception as e:
+                print(f"LibreOffice conversion failed for {filename}: {e}")
+
+        if pdf_path:
+            try:
+                pdf_bytes, page_count = await run_document_task(read_pdf_file, pdf_path)
+            except Exception as e:
+                print(f"Error counting pages for {filename}: {e}")
+                pdf_bytes = None
+        if pdf_bytes is None and extension in [".doc", ".docx"]:
+            page_count = await run_document_task(docx_paragraph_page_estimate, file_content)
+
+        # docx2txt keeps Word structure better than text pulled back out of the PDF;
+        # .doc has no direct reader, so its text comes from the converted PDF
+        if extension == ".docx":
+            text, text_parser, quality = await extract_text_local(original_path, page_count)
+        elif pdf_path and pdf_bytes is not None:
+            text, text_parser, quality = await extract_text_local(pdf_path, page_count)
+
+    return {
+        "file_hash": file_hash,
+        "extension": extension,
+        "page_count": page_count,
+        "pdf_bytes": pdf_bytes,
+        "text": text,
+        "text_parser": text_parser,
+        "quality": quality,
+        "elapsed_ms": int((time.perf_counter() - started) * 1000),
+    }
@@ -0,0 +1,166 @@
+import os
+import io
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from parsing.text_compaction import PAGE_SEPARATOR
+
+# CPU-bound document work (PyPDF2, pdfminer, docx2txt, python-docx) runs in a process pool so it
+# never holds the GIL of the event loop. Workers are recycled after DOCUMENT_WORKER_MAX_TASKS
+# tasks to contain pdfminer memory growth; a task that times out takes its pool down with it.
+# DOCUMENT_POOL_SIZE=0 runs the same functions in a thread instead (local development).
+DOCUMENT_POOL_SIZE = int(os.getenv("DOCUMENT_POOL_SIZE", "2"))
+DOCUMENT_TASK_TIMEOUT = float(os.getenv("DOCUMENT_TASK_TIMEOUT", "30"))
+DOCUMENT_WORKER_MAX_TASKS = int(os.getenv("DOCUMENT_WORKER_MAX_TASKS", "50"))
+
+
+class DocumentTaskError(Exception):
+    """Raised when a document task timed out or its worker process died."""
+
+
+# ---------- WORKER FUNCTIONS (run in child processes) ----------
+def pdf_page_count(pdf_bytes: bytes) -> int:
+    import PyPDF2
+    return len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def read_pdf_file(pdf_path: str):
+    """:return: (pdf_bytes, page_count)"""
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+    return pdf_bytes, pdf_page_count(pdf_bytes)
+
+
+def pypdf2_text(pdf_path: str) -> str:
+    import PyPDF2
+    with open(pdf_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return PAGE_SEPARATOR.join([page.extract_text() for page in reader.pages if page.extract_text()])
+
+
+def pdfminer_text(pdf_path: str) -> str:
+    from pdfminer.high_level import extract_text
+    return extract_text(pdf_path)
+
+
+def docx_text(docx_path: str) -> str:
+    import docx2txt
+    return docx2txt.process(docx_path)
+
+
+def docx_paragraph_page_estimate(file_content: bytes) -> int:
+    try:
+        from docx import Document
+        doc = Document(io.BytesIO(file_content))
+        return max(1, len(doc.paragraphs) // 10)
+    except Exception:
+        return 1
+
+
+# ---------- POOL ----------
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_metrics = {"tasks": 0, "failures": 0, "timeouts": 0, "pool_resets": 0, "retries": 0}
+# One slot per pool worker: a task is only submitted (and its timeout started) once a worker
+# is free, so tasks queued behind a large batch cannot time out and reset the pool
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots, _slots_loop = asyncio.Semaphore(DOCUMENT_POOL_SIZE), loop
+    return _slots
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # max_tasks_per_child needs a non-fork start method
+            _executor = ProcessPoolExecutor(
+                max_workers=DOCUMENT_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=DOCUMENT_WORKER_MAX_TASKS or None
+            )
+        return _executor
+
+
+def _reset_executor(executor: ProcessPoolExecutor) -> bool:
+    """
+    Drop the given pool, killing its processes, if it is still the current one; the next
+    task starts a fresh pool. A pool already replaced by another task is left alone.
+    :return: True if this call replaced the pool
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not executor:
+            return False
+        _executor = None
+    _metrics["pool_resets"] += 1
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        try:
+            process.kill()
+        except Exception:
+            pass
+    # Queued tasks fail with BrokenProcessPool (and are retried), not CancelledError
+    executor.shutdown(wait=False)
+    return True
+
+
+async def run_document_task(func: Callable, *args, timeout: float = DOCUMENT_TASK_TIMEOUT) -> Any:
+    """
+    Run one of the worker functions above off the event loop.
+    :param func: Module-level (picklable) function
+    :param timeout: Seconds before the task is abandoned and its pool replaced
+    """
+    _metrics["tasks"] += 1
+    if DOCUMENT_POOL_SIZE <= 0:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+
+    loop = asyncio.get_running_loop()
+    # ProcessPoolExecutor fails every in-flight task once any of its workers dies, so a
+    # hung worker cannot be killed on its own. Tasks that only broke because another task
+    # replaced their pool get one more try on the new pool.
+    for attempt in range(2):
+        try:
+            async with _get_slots():
+                executor = _get_executor()
+                return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), timeout=timeout)
+        except asyncio.TimeoutError:
+            _metrics["failures"] += 1
+            _metrics["timeouts"] += 1
+            # The child keeps running after wait_for gives up; kill it so it cannot pile up
+            _reset_executor(executor)
+            raise DocumentTaskError(f"{func.__name__} timed out after {timeout}s")
+        except BrokenProcessPool:
+            if not _reset_executor(executor) and attempt == 0:
+                _metrics["retries"] += 1
+                continue
+            _metrics["failures"] += 1
+            raise DocumentTaskError(f"{func.__name__} failed: document worker process died")
+
+
+def get_document_pool_metrics() -> Dict:
+    return {
+        "size": DOCUMENT_POOL_SIZE,
+        "max_tasks_per_worker": DOCUMENT_WORKER_MAX_TASKS,
+        "task_timeout_seconds": DOCUMENT_TASK_TIMEOUT,
+        "started": _executor is not None,
+        **_metrics,
+    }
+
+
+def shutdown_document_pool() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
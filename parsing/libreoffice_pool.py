@@ -0,0 +1,277 @@
+import os
+import time
+import shlex
+import shutil
+import socket
+import asyncio
+import tempfile
+from typing import Dict, List, Optional
+
+# Pool of long-lived headless LibreOffice instances shared by page counting and .doc conversion.
+# Each slot owns an isolated profile dir (concurrent soffice runs on one profile lock each other out)
+# and, when unoserver is installed, a persistent soffice + UNO socket listener so a conversion
+# no longer pays the 1-3 s cold start. Without unoserver each slot still runs soffice with its own
+# warm profile.
+LIBREOFFICE_POOL_SIZE = int(os.getenv("LIBREOFFICE_POOL_SIZE", "2"))
+LIBREOFFICE_CONVERT_TIMEOUT = float(os.getenv("LIBREOFFICE_CONVERT_TIMEOUT", "60"))
+LIBREOFFICE_START_TIMEOUT = float(os.getenv("LIBREOFFICE_START_TIMEOUT", "30"))
+LIBREOFFICE_BINARY = os.getenv("LIBREOFFICE_BINARY", "soffice")
+# May be a full command: the server needs a Python with the uno module (python3-uno), which
+# is the system interpreter rather than the app's venv, e.g. "/usr/bin/python3 -m unoserver.server"
+UNOSERVER_BINARY = os.getenv("UNOSERVER_BINARY", "unoserver")
+UNOSERVER_COMMAND = shlex.split(UNOSERVER_BINARY)
+UNOCONVERT_BINARY = os.getenv("UNOCONVERT_BINARY", "unoconvert")
+
+
+class DocumentConversionError(Exception):
+    """Raised when LibreOffice could not convert a document."""
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _kill(process: Optional[asyncio.subprocess.Process]) -> None:
+    if process is None or process.returncode is not None:
+        return
+    try:
+        process.kill()
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(process.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        pass
+
+
+class _OfficeSlot:
+    """One LibreOffice instance: its own profile dir and, with unoserver, a persistent listener."""
+
+    def __init__(self, index: int, base_dir: str, use_unoserver: bool):
+        self.index = index
+        self.profile_dir = os.path.join(base_dir, f"profile-{index}")
+        self.use_unoserver = use_unoserver
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.port: Optional[int] = None
+        self.restarts = 0
+
+    @property
+    def profile_url(self) -> str:
+        return "file://" + os.path.abspath(self.profile_dir)
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if not self.use_unoserver:
+            return
+
+        self.port = _free_port()
+        self.process = await asyncio.create_subprocess_exec(
+            *UNOSERVER_COMMAND,
+            "--interface", "127.0.0.1",
+            "--port", str(self.port),
+            "--uno-port", str(_free_port()),
+            "--user-installation", self.profile_url,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+        # Wait for the listener; a fresh profile takes a few seconds to initialise
+        deadline = time.monotonic() + LIBREOFFICE_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.returncode is not None:
+                break
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+                writer.close()
+                return
+            except OSError:
+                await asyncio.sleep(0.25)
+
+        await _kill(self.process)
+        raise DocumentConversionError(f"LibreOffice instance {self.index} did not start")
+
+    async def restart(self) -> None:
+        self.restarts += 1
+        await self.stop()
+        await self.start()
+
+    async def stop(self) -> None:
+        await _kill(self.process)
+        self.process = None
+
+    async def convert(self, input_path: str, target_format: str, output_dir: str, timeout: float) -> str:
+        if self.use_unoserver and not self.is_alive():
+            await self.restart()
+
+        output_path = os.path.join(
+            output_dir, os.path.splitext(os.path.basename(input_path))[0] + "." + target_format
+        )
+        if self.use_unoserver:
+            args = [
+                UNOCONVERT_BINARY, "--host", "127.0.0.1", "--port", str(self.port),
+                "--convert-to", target_format, input_path, output_path
+            ]
+        else:
+            args = [
+                LIBREOFFICE_BINARY, f"-env:UserInstallation={self.profile_url}",
+                "--headless", "--convert-to", target_format, "--outdir", output_dir, input_path
+            ]
+
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            returncode = await asyncio.wait_for(process.wait(), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            await _kill(process)
+            # A hung conversion usually means a wedged instance
+            if self.use_unoserver:
+                await self.restart()
+            raise
+
+        if returncode != 0 or not os.path.exists(output_path):
+            if self.use_unoserver and not self.is_alive():
+                await self.restart()
+            raise DocumentConversionError(
+                f"LibreOffice conversion to {target_format} failed (exit code {returncode})"
+            )
+        return output_path
+
+
+class LibreOfficePool:
+    """Request queue in front of a fixed number of LibreOffice slots."""
+
+    def __init__(self, size: int = LIBREOFFICE_POOL_SIZE):
+        self.size = max(1, size)
+        self.base_dir = tempfile.mkdtemp(prefix="libreoffice-pool-")
+        self.use_unoserver = bool(UNOSERVER_COMMAND) and shutil.which(UNOSERVER_COMMAND[0]) is not None and \
+            shutil.which(UNOCONVERT_BINARY) is not None
+        self.slots: List[_OfficeSlot] = []
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.started = False
+        self._start_lock = asyncio.Lock()
+        self.metrics = {
+            "conversions": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "waiting": 0,
+            "latency_ms_total": 0,
+            "latency_ms_max": 0,
+        }
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self.started:
+                return
+            for index in range(self.size):
+                slot = _OfficeSlot(index, self.base_dir, self.use_unoserver)
+                try:
+                    await slot.start()
+                except DocumentConversionError as e:
+                    # Started lazily on its first conversion instead
+                    print(f"{e}; will retry on first use")
+                self.slots.append(slot)
+                self.idle.put_nowait(slot)
+            self.started = True
+            mode = "unoserver" if self.use_unoserver else "soffice per call"
+            print(f"LibreOffice pool started: {self.size} instance(s), {mode}")
+            if not self.use_unoserver:
+                print(f"{UNOSERVER_BINARY!r} or {UNOCONVERT_BINARY!r} not found: every conversion starts LibreOffice cold")
+
+    async def convert(self, input_path: str, target_format: str, output_dir: Optional[str] = None,
+                      timeout: float = LIBREOFFICE_CONVERT_TIMEOUT) -> str:
+        """
+        Convert a document with the next free instance.
+        :param input_path: Source document
+        :param target_format: LibreOffice target, e.g. "pdf" or "docx"
+        :param output_dir: Defaults to the source document's directory
+        :return: Path of the converted file
+        """
+        if not self.started:
+            await self.start()
+
+        self.metrics["waiting"] += 1
+        try:
+            slot = await self.idle.get()
+        finally:
+            self.metrics["waiting"] -= 1
+
+        started = time.perf_counter()
+        try:
+            output_path = await slot.convert(
+                input_path, target_format, output_dir or os.path.dirname(input_path), timeout
+            )
+        except asyncio.TimeoutError:
+            self.metrics["failures"] += 1
+            self.metrics["timeouts"] += 1
+            raise DocumentConversionError(f"LibreOffice conversion timed out after {timeout}s")
+        except DocumentConversionError:
+            self.metrics["failures"] += 1
+            raise
+        except Exception as e:
+            self.metrics["failures"] += 1
+            raise DocumentConversionError(f"LibreOffice conversion failed: {str(e)}")
+        finally:
+            self.idle.put_nowait(slot)
+
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        self.metrics["conversions"] += 1
+        self.metrics["latency_ms_total"] += elapsed_ms
+        self.metrics["latency_ms_max"] = max(self.metrics["latency_ms_max"], elapsed_ms)
+        return output_path
+
+    def get_metrics(self) -> Dict:
+        conversions = self.metrics["conversions"]
+        return {
+            "size": self.size,
+            "mode": "unoserver" if self.use_unoserver else "soffice",
+            "started": self.started,
+            "queue_depth": self.metrics["waiting"],
+            "idle": self.idle.qsize(),
+            "conversions": conversions,
+            "failures": self.metrics["failures"],
+            "timeouts": self.metrics["timeouts"],
+            "restarts": sum(slot.restarts for slot in self.slots),
+            "latency_ms_avg": int(self.metrics["latency_ms_total"] / conversions) if conversions else 0,
+            "latency_ms_max": self.metrics["latency_ms_max"],
+        }
+
+    async def shutdown(self) -> None:
+        for slot in self.slots:
+            await slot.stop()
+        self.slots = []
+        self.started = False
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+
+# One pool per process (uvicorn worker or standalone analysis worker), created on first use
+_pool: Optional[LibreOfficePool] = None
+
+
+def get_libreoffice_pool() -> LibreOfficePool:
+    global _pool
+    if _pool is None:
+        _pool = LibreOfficePool()
+    return _pool
+
+
+async def convert_document(input_path: str, target_format: str, output_dir: Optional[str] = None) -> str:
+    return await get_libreoffice_pool().convert(input_path, target_format, output_dir)
+
+
+def get_converter_metrics() -> Dict:
+    if _pool is None:
+        return {"size": LIBREOFFICE_POOL_SIZE, "started": False}
+    return _pool.get_metrics()
+
+
+async def shutdown_libreoffice_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.shutdown()
+        _pool = None
@@ -68,61 +68,25 @@
 #         raise Exception("Unsupported file type.")
 import re
 import os
-import asyncio
-from PyPDF2 import PdfReader
-import docx2txt
-from pdfminer.high_level import extract_text as pdfminer_extract_text
-from typing import Optional
+from typing import Optional, Tuple
 from llama.llama_utils import parse_resume_with_llama
 from llama_parse import LlamaParse
-import subprocess
-import PyPDF2
+from parsing.libreoffice_pool import convert_document
+from parsing.document_service import run_document_task, pypdf2_text, pdfminer_text, docx_text
+from parsing.contact_extractor import extract_contacts
 
 
 # ---------- EMAIL EXTRACTION ----------
 def extract_email(resume_text: str) -> str:
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    match = re.search(email_pattern, resume_text)
-    return match.group(0) if match else "No email found"
+    return extract_contacts(resume_text)["email"] or "No email found"
 
 # ---------- Mobile Extraction ---------
 def extract_mobile_number(text: str) -> str:
     """
-    Extract mobile number from resume text
-    Supports various formats: 
-    - 10-digit numbers
-    - Numbers with country codes
-    - Numbers with separators (spaces, hyphens, dots)
+    Extract mobile number from resume text, normalized to E.164 ("" if none).
+    Prefer extract_contacts when more than one contact field is needed.
     """
-    # Common patterns for mobile numbers
-    patterns = [
-        r'\b[6-9]\d{9}\b',  # 10-digit Indian numbers
-        r'\b\+91[\s-]?[6-9]\d{9}\b',  # +91 prefix
-        r'\b91[\s-]?[6-9]\d{9}\b',  # 91 prefix
-        r'\b0[\s-]?[6-9]\d{9}\b',  # 0 prefix
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        if matches:
-            # Clean the number - remove non-digit characters except +
-            clean_number = re.sub(r'[^\d+]', '', matches[0])
-            
-            # If it's a 10-digit number without country code, add +91
-            if len(clean_number) == 10 and clean_number[0] in '6789':
-                return f"+91{clean_number}"
-            elif len(clean_number) == 11 and clean_number.startswith('91'):
-                return f"+{clean_number}"
-            elif len(clean_number) == 11 and clean_number.startswith('0'):
-                return f"+91{clean_number[1:]}"
-            elif len(clean_number) == 12 and clean_number.startswith('91'):
-                return f"+{clean_number}"
-            elif clean_number.startswith('+91') and len(clean_number) == 13:
-                return clean_number
-            else:
-                return clean_number
-    
-    return ""
+    return extract_contacts(text)["mobile"]
 
 # ---------- TEXT EXTRACTION ----------
 async def extract_text(file_path: str) -> str:
@@ -141,46 +105,114 @@ async def extract_text(file_path: str) -> str:
 
 
 async def extract_text_from_pdf(file_path: str) -> str:
-    def _read_pdf():
-        with open(file_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-
-    return await asyncio.to_thread(_read_pdf)
+    return await run_document_task(pypdf2_text, file_path)
 
 
 async def extract_text_from_docx(file_path: str) -> str:
-    def _read_docx():
-        return docx2txt.process(file_path)
-
-    return await asyncio.to_thread(_read_docx)
+    return await run_document_task(docx_text, file_path)
 
 
 async def convert_doc_to_docx(doc_path: str) -> str:
-    async def _convert():
-        output_dir = os.path.dirname(doc_path)
-        subprocess.run(
-            ["soffice", "--headless", "--convert-to", "docx", "--outdir", output_dir, doc_path],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        return os.path.splitext(doc_path)[0] + ".docx"
-
-    return await asyncio.to_thread(_convert)
+    # Convert DOC → DOCX through the shared LibreOffice pool
+    return await convert_document(doc_path, "docx")
+
+# ---------- LOCAL EXTRACTION + QUALITY GATE ----------
+TEXT_QUALITY_MIN_CHARS_PER_PAGE = int(os.getenv("TEXT_QUALITY_MIN_CHARS_PER_PAGE", "200"))
+TEXT_QUALITY_MIN_PRINTABLE_RATIO = float(os.getenv("TEXT_QUALITY_MIN_PRINTABLE_RATIO", "0.95"))
+TEXT_QUALITY_MIN_SCORE = float(os.getenv("TEXT_QUALITY_MIN_SCORE", "0.6"))
+
+_QUALITY_EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+_QUALITY_SECTION_RE = re.compile(
+    r'^\s*(experience|work experience|professional experience|employment|education|skills|'
+    r'technical skills|projects|summary|profile|objective|certifications?)\b',
+    re.IGNORECASE | re.MULTILINE
+)
+
+def score_text_quality(text: str, page_count: int = 1) -> dict:
+    """
+    Heuristic quality score (0-1) for locally extracted resume text.
+    Scanned PDFs give almost no characters; broken font maps give unprintable garbage.
+    """
+    text = text or ""
+    stripped = text.strip()
+    chars_per_page = len(stripped) / max(1, page_count)
+    printable = sum(1 for ch in stripped if ch.isprintable() or ch in "\n\t")
+    printable_ratio = printable / len(stripped) if stripped else 0.0
+    has_email = bool(_QUALITY_EMAIL_RE.search(text))
+    # Same E.164 check as contact extraction; a bare pattern also matched date ranges
+    has_phone = bool(extract_contacts(text)["phones"])
+    section_headers = len(set(m.group(1).lower() for m in _QUALITY_SECTION_RE.finditer(text)))
+
+    score = 0.0
+    score += 0.35 * min(1.0, chars_per_page / TEXT_QUALITY_MIN_CHARS_PER_PAGE)
+    score += 0.25 * (1.0 if printable_ratio >= TEXT_QUALITY_MIN_PRINTABLE_RATIO else printable_ratio / 2)
+    score += 0.15 * has_email
+    score += 0.10 * has_phone
+    score += 0.15 * min(1.0, section_headers / 2)
+
+    return {
+        "score": round(score, 3),
+        "chars_per_page": int(chars_per_page),
+        "printable_ratio": round(printable_ratio, 3),
+        "has_email": has_email,
+        "has_phone": has_phone,
+        "section_headers": section_headers,
+    }
+
+def is_text_quality_acceptable(quality: dict) -> bool:
+    return (
+        quality["score"] >= TEXT_QUALITY_MIN_SCORE
+        and quality["chars_per_page"] >= TEXT_QUALITY_MIN_CHARS_PER_PAGE / 4
+        and quality["printable_ratio"] >= TEXT_QUALITY_MIN_PRINTABLE_RATIO
+    )
+
+async def extract_text_local(file_path: str, page_count: int = 1) -> Tuple[str, str, dict]:
+    """
+    Extract text without any remote call: PyPDF2 / docx2txt first, pdfminer for PDFs
+    PyPDF2 handled badly. Never raises; returns empty text if nothing worked.
+    :return: (text, parser, quality)
+    """
+    ext = os.path.splitext(file_path)[-1].lower()
+    best = ("", "local", score_text_quality("", page_count))
+
+    try:
+        text = await extract_text(file_path)
+        parser = "pypdf2" if ext == ".pdf" else "docx2txt"
+        best = (text, parser, score_text_quality(text, page_count))
+    except Exception as e:
+        print(f"Local extraction failed for {file_path}: {e}")
+
+    if ext == ".pdf" and not is_text_quality_acceptable(best[2]):
+        try:
+            text = await run_document_task(pdfminer_text, file_path)
+            quality = score_text_quality(text, page_count)
+            if quality["score"] > best[2]["score"]:
+                best = (text, "pdfminer", quality)
+        except Exception as e:
+            print(f"pdfminer extraction failed for {file_path}: {e}")
+
+    return best
 
 async def parse_resume(file_path: str, parser: Optional[LlamaParse] = None) -> str:
     """
     Primary async parser. Tries LlamaParse first, falls back to pdfminer if it fails.
     """
+    resume_text, _ = await parse_resume_with_source(file_path, parser)
+    return resume_text
+
+async def parse_resume_with_source(file_path: str, parser: Optional[LlamaParse] = None) -> Tuple[str, str]:
+    """
+    Same as parse_resume, but also reports which parser produced the text.
+    :return: (resume_text, "llama" | "pdfminer")
+    """
     try:
         if parser:
-            return await parse_resume_with_llama(file_path, parser)  # <-- await directly
+            return await parse_resume_with_llama(file_path, parser), "llama"  # <-- await directly
     except Exception:
         pass
 
-    # fallback to pdfminer (sync, run in thread)
-    return await asyncio.to_thread(pdfminer_extract_text, file_path)
+    # fallback to pdfminer (in the document process pool)
+    return await run_document_task(pdfminer_text, file_path), "pdfminer"
 # ---------- PRIMARY PARSER ----------
 # async def parse_resume(file_path: str, parser: Optional[LlamaParse] = None) -> str:
 #     """
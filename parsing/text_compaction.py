@@ -0,0 +1,216 @@
+import os
+import re
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# ---------- RESUME TEXT COMPACTION ----------
+# Everything in the resume text is billed as prompt tokens. Compaction strips what carries no
+# signal (per-page headers/footers, table borders, duplicate lines, LlamaParse JSON scaffolding,
+# whitespace runs); the token budget then drops low-value sections, never experience or skills.
+DEFAULT_RESUME_TOKEN_BUDGET = int(os.getenv("DEFAULT_RESUME_TOKEN_BUDGET", "6000"))
+CHARS_PER_TOKEN = 4
+# Page separator used by the text extractors (pdfminer emits a bare form feed)
+PAGE_SEPARATOR = "\n\f\n"
+# Running headers/footers: short lines among the first/last lines of a page that recur at
+# the edge of (nearly) every page. Lines elsewhere on the page are never treated as such,
+# so repeated date ranges or "Responsibilities:" labels inside sections are kept.
+HEADER_FOOTER_LINES = 2
+REPEATED_LINE_MAX_LENGTH = 80
+# Long lines repeated anywhere in the text are duplicated paragraphs
+DUPLICATE_LINE_MIN_LENGTH = 40
+
+_BORDER_LINE_RE = re.compile(r"^[\s|+\-=_~*#.:─━│┃┌┐└┘├┤┬┴┼═║╔╗╚╝]*$")
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$|^-\s*\d{1,3}\s*-$", re.IGNORECASE)
+_INLINE_SPACE_RE = re.compile(r"[ \t\u00a0\u2000-\u200b]+")
+_TABLE_PIPES_RE = re.compile(r"\s*\|\s*(\|\s*)*")
+
+# Section headers, and the order sections are dropped in when over budget
+_SECTION_HEADER_RE = re.compile(
+    r"^\W*(declaration|references?|hobbies|interests|hobbies (and|&) interests|personal (details|information|profile)|"
+    r"extra[- ]?curricular( activities)?|languages( known)?|achievements|awards|certifications?|"
+    r"publications|volunteer(ing)?( experience)?|summary|profile|objective|career objective|"
+    r"professional summary|education|academic (details|qualifications?)|projects|"
+    r"(technical |key )?skills|(work |professional )?experience|employment( history)?)\W*$",
+    re.IGNORECASE
+)
+LOW_VALUE_SECTIONS = [
+    "declaration",
+    "references",
+    "hobbies",
+    "interests",
+    "personal",
+    "extracurricular",
+    "volunteer",
+    "languages",
+    "publications",
+    "awards",
+    "achievements",
+    "objective",
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate (~4 characters per token for English prose)."""
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _unwrap_llama_json(text: str) -> str:
+    """LlamaParse JSON output that leaked into the text: keep only the page text."""
+    stripped = text.strip()
+    if not stripped or stripped[0] not in "[{":
+        return text
+    try:
+        payload = json.loads(stripped)
+    except ValueError:
+        return text
+
+    results = payload if isinstance(payload, list) else [payload]
+    pages = []
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        for page in result.get("pages", []):
+            if isinstance(page, dict):
+                pages.append(page.get("text") or page.get("md") or "")
+    return PAGE_SEPARATOR.join(pages) if pages else text
+
+
+def _clean_lines(page: str) -> List[str]:
+    lines: List[str] = []
+    for raw in page.split("\n"):
+        line = _INLINE_SPACE_RE.sub(" ", raw).strip()
+        if "|" in line:
+            line = _TABLE_PIPES_RE.sub(" | ", line).strip(" |")
+        if line and (_BORDER_LINE_RE.match(line) or _PAGE_NUMBER_RE.match(line)):
+            continue
+        lines.append(line)
+    return lines
+
+
+def _page_edges(pages: List[List[str]]) -> Set[Tuple[int, int]]:
+    """(page, line) positions of the first and last non-blank short lines of every page."""
+    edges = set()
+    for p, lines in enumerate(pages):
+        filled = [i for i, line in enumerate(lines) if line and len(line) <= REPEATED_LINE_MAX_LENGTH]
+        edges.update((p, i) for i in filled[:HEADER_FOOTER_LINES] + filled[-HEADER_FOOTER_LINES:])
+    return edges
+
+
+def compact_resume_text(resume_text: str, page_count: int = 1) -> str:
+    """
+    Normalize whitespace and drop headers/footers, borders and duplicate lines.
+    :param page_count: Headers/footers are only detected on multi-page documents
+        whose text has form-feed page breaks
+    """
+    text = _unwrap_llama_json(resume_text or "").replace("\r\n", "\n")
+    pages = [_clean_lines(page) for page in text.split("\f")]
+
+    edges: Set[Tuple[int, int]] = set()
+    repeated: Set[str] = set()
+    if page_count > 1 and len(pages) > 1:
+        edges = _page_edges(pages)
+        # Pages each edge line appears on; allow one page without it (e.g. a cover page)
+        page_hits = Counter(line for _, line in {(p, pages[p][i]) for p, i in edges})
+        min_pages = max(2, sum(1 for lines in pages if any(lines)) - 1)
+        repeated = {line for line, n in page_hits.items() if n >= min_pages}
+
+    compacted: List[str] = []
+    seen_repeated = set()
+    seen_long = set()
+    previous = None
+    for p, lines in enumerate(pages):
+        if p and compacted and compacted[-1] != "":
+            # A page break counts as a blank line
+            compacted.append("")
+            previous = ""
+        for i, line in enumerate(lines):
+            if not line:
+                # Collapse runs of blank lines
+                if compacted and compacted[-1] != "":
+                    compacted.append("")
+                previous = line
+                continue
+            if line == previous:
+                continue
+            if line in repeated and (p, i) in edges:
+                # Keep the first occurrence (often the candidate's name in the page header)
+                if line in seen_repeated:
+                    continue
+                seen_repeated.add(line)
+            if len(line) >= DUPLICATE_LINE_MIN_LENGTH:
+                if line in seen_long:
+                    continue
+                seen_long.add(line)
+            compacted.append(line)
+            previous = line
+
+    return "\n".join(compacted).strip()
+
+
+def _section_key(line: str) -> Optional[str]:
+    if len(line) > 40:
+        return None
+    match = _SECTION_HEADER_RE.match(line)
+    if not match:
+        return None
+    header = match.group(1).lower()
+    for key in LOW_VALUE_SECTIONS:
+        if key in header.replace("-", "").replace(" ", ""):
+            return key
+    return "core"
+
+
+def apply_token_budget(text: str, token_budget: int) -> Tuple[str, List[str]]:
+    """
+    Trim text to the token budget: drop low-value sections first, then cut the tail.
+    :return: (text, names of dropped sections; "truncated" if the tail was cut)
+    """
+    if token_budget <= 0 or estimate_tokens(text) <= token_budget:
+        return text, []
+
+    # Split into (section_key, lines); the preamble before the first header is "core"
+    sections: List[Tuple[str, List[str]]] = [("core", [])]
+    for line in text.split("\n"):
+        key = _section_key(line)
+        if key is not None:
+            sections.append((key, [line]))
+        else:
+            sections[-1][1].append(line)
+
+    dropped: List[str] = []
+    for low_value in LOW_VALUE_SECTIONS:
+        if estimate_tokens("\n".join(l for _, ls in sections for l in ls)) <= token_budget:
+            break
+        if any(key == low_value for key, _ in sections):
+            sections = [(key, ls) for key, ls in sections if key != low_value]
+            dropped.append(low_value)
+
+    text = "\n".join(l for _, ls in sections for l in ls).strip()
+    if estimate_tokens(text) > token_budget:
+        cut = text[:token_budget * CHARS_PER_TOKEN]
+        text = cut[:cut.rfind("\n")] if "\n" in cut else cut
+        dropped.append("truncated")
+    return text, dropped
+
+
+def prepare_prompt_resume_text(
+    resume_text: str,
+    page_count: int = 1,
+    token_budget: Optional[int] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compaction + budget in one step.
+    :return: (prompt text, stats for the analysis record)
+    """
+    budget = token_budget if token_budget is not None else DEFAULT_RESUME_TOKEN_BUDGET
+    compacted = compact_resume_text(resume_text, page_count)
+    compacted_tokens = estimate_tokens(compacted)
+    budgeted, dropped = apply_token_budget(compacted, budget)
+    return budgeted, {
+        "token_budget": budget,
+        "resume_tokens_raw": estimate_tokens(resume_text),
+        "resume_tokens_compacted": compacted_tokens,
+        "resume_tokens_prompt": estimate_tokens(budgeted),
+        "dropped_sections": dropped,
+    }
@@ -0,0 +1,376 @@
+import os
+import time
+import tempfile
+from contextlib import nullcontext
+from typing import Any, Dict, Optional, Tuple
+
+from llama.llama_utils import initialize_llama_parser
+from parsing.parsing_utils import parse_resume_with_source, is_text_quality_acceptable
+from parsing.document_normalizer import normalize_document
+from parsing.document_service import run_document_task, pdf_page_count, docx_paragraph_page_estimate
+from parsing.contact_extractor import extract_contacts
+from parsing.text_compaction import prepare_prompt_resume_text, DEFAULT_RESUME_TOKEN_BUDGET
+from gemini.gemini_utils import analyze_resume_comprehensive, initialize_gemini
+from pipeline.fast_analysis import analyze_resume_fast
+from mongodb.mongodb_db import get_db, count_pages, store_results_in_mongodb, increment_usage
+from cache.resume_cache import compute_file_hash, get_cached_resume_text, store_cached_resume_text
+from cache.analysis_cache import get_cached_analysis, store_cached_analysis
+from pipeline.progress import (
+    emit_progress,
+    EVENT_TEXT_EXTRACTED,
+    EVENT_LLM_STARTED,
+    EVENT_LLM_FINISHED,
+    EVENT_STORED
+)
+
+# Per-company "text_extraction_mode"; local_first only calls LlamaParse for poor local text
+TEXT_EXTRACTION_MODES = ["local_first", "llama_first"]
+DEFAULT_TEXT_EXTRACTION_MODE = os.getenv("DEFAULT_TEXT_EXTRACTION_MODE", "local_first")
+
+# "comprehensive" runs Gemini; "fast" is local-only screening (skill matcher + local extraction)
+ANALYSIS_MODES = ["comprehensive", "fast"]
+DEFAULT_ANALYSIS_MODE = os.getenv("DEFAULT_ANALYSIS_MODE", "comprehensive")
+# Extraction mode forced by the "fast" analysis mode (not a company setting): never LlamaParse
+TEXT_EXTRACTION_LOCAL_ONLY = "local_only"
+
+# JDData fields that are stored with the JD but never sent to Gemini
+NON_GEMINI_JD_FIELDS = ["location", "budget", "number_of_positions", "work_mode", "jd_id"]
+
+
+class ResumeParseError(Exception):
+    """Raised when no parser could extract usable text from a resume."""
+
+
+# ---------- COMPANY SETTINGS ----------
+async def get_company_ai_settings(company_id: str) -> Optional[Dict]:
+    db = await get_db()
+    return await db.companies.find_one(
+        {"id": company_id, "is_deleted": False},
+        {"gemini_api_key": 1, "llama_api_key": 1, "gemini_model": 1, "text_extraction_mode": 1, "resume_token_budget": 1}
+    )
+
+
+def text_extraction_mode_for(company: Dict[str, Any], analysis_mode: Optional[str] = None) -> Optional[str]:
+    """The company's text_extraction_mode, or local_only for the no-remote-cost fast mode."""
+    if (analysis_mode or DEFAULT_ANALYSIS_MODE) == "fast":
+        return TEXT_EXTRACTION_LOCAL_ONLY
+    return company.get("text_extraction_mode")
+
+
+def jd_for_gemini(jd_data: Dict[str, Any]) -> Dict[str, Any]:
+    gemini_jd = dict(jd_data)
+    for key in NON_GEMINI_JD_FIELDS:
+        gemini_jd.pop(key, None)
+    return gemini_jd
+
+
+# ---------- STAGE 1: NORMALIZATION ----------
+async def prepare_resume(file_content: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Hash the upload and normalize it once (page count, PDF, local text), unless the
+    text cache already has it.
+    :return: {"file_hash", "page_count", "cached_text", "bundle"}
+    """
+    file_hash = compute_file_hash(file_content)
+    cached_text = await get_cached_resume_text(file_hash)
+    if cached_text:
+        return {"file_hash": file_hash, "page_count": cached_text["page_count"], "cached_text": cached_text, "bundle": None}
+
+    bundle = await normalize_document(file_content, filename, file_hash)
+    page_count = await count_pages(file_content, filename, bundle)
+    return {"file_hash": file_hash, "page_count": page_count, "cached_text": None, "bundle": bundle}
+
+
+async def estimate_resume_pages(file_content: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Cheap stand-in for prepare_resume where only the quota check needs a page count (job
+    enqueue on the web tier): the text cache, else the PDF page tree or a Word paragraph
+    estimate. Nothing is converted; the worker normalizes the upload and corrects the count.
+    :return: {"file_hash", "page_count", "cached_text", "bundle": None}
+    """
+    file_hash = compute_file_hash(file_content)
+    cached_text = await get_cached_resume_text(file_hash)
+    if cached_text:
+        return {"file_hash": file_hash, "page_count": cached_text["page_count"], "cached_text": cached_text, "bundle": None}
+
+    try:
+        if os.path.splitext(filename)[1].lower() == ".pdf":
+            page_count = await run_document_task(pdf_page_count, file_content)
+        else:
+            page_count = await run_document_task(docx_paragraph_page_estimate, file_content)
+    except Exception as e:
+        print(f"Error estimating pages for {filename}: {e}")
+        page_count = 1
+    return {"file_hash": file_hash, "page_count": page_count, "cached_text": None, "bundle": None}
+
+
+# ---------- STAGE 2: TEXT EXTRACTION ----------
+async def _parse_with_llama(content: bytes, suffix: str, llama_api_key: Optional[str]) -> Tuple[str, str]:
+    """One LlamaParse job (text and markdown of every page); pdfminer if LlamaParse fails."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(content)
+        tmp_path = tmp.name
+
+    try:
+        parser = await initialize_llama_parser("json", llama_api_key)
+        return await parse_resume_with_source(tmp_path, parser)
+    finally:
+        try:
+            os.remove(tmp_path)
+        except Exception:
+            pass
+
+
+async def extract_resume_text(
+    file_content: bytes,
+    filename: str,
+    prepared: Dict[str, Any],
+    llama_api_key: Optional[str] = None,
+    mode: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extract resume text, cache first, then from the normalization bundle.
+    - local_first: the bundle's PyPDF2/docx2txt/pdfminer text, scored by a quality heuristic;
+      LlamaParse only for scanned or garbled documents.
+    - llama_first: LlamaParse, pdfminer if it fails.
+    - local_only (fast analysis mode): the bundle's text, whatever its quality.
+    LlamaParse gets the bundle's normalized PDF, so Word files are never converted again.
+    :return: {"resume_text", "parser", "path", "mode", "quality", "elapsed_ms", "normalize_ms"}
+    """
+    if mode not in TEXT_EXTRACTION_MODES and mode != TEXT_EXTRACTION_LOCAL_ONLY:
+        mode = DEFAULT_TEXT_EXTRACTION_MODE
+    started = time.perf_counter()
+
+    cached_text = prepared.get("cached_text")
+    if cached_text:
+        return {
+            "resume_text": cached_text["resume_text"],
+            "parser": cached_text["parser"],
+            "path": "cache",
+            "mode": mode,
+            "quality": None,
+            "elapsed_ms": int((time.perf_counter() - started) * 1000),
+            "normalize_ms": 0,
+        }
+
+    bundle = prepared.get("bundle")
+    if bundle is None:
+        bundle = await normalize_document(file_content, filename, prepared["file_hash"])
+    if bundle["pdf_bytes"] is not None:
+        remote_content, remote_suffix = bundle["pdf_bytes"], ".pdf"
+    else:
+        remote_content, remote_suffix = file_content, os.path.splitext(filename)[1]
+
+    quality = None
+    if mode == TEXT_EXTRACTION_LOCAL_ONLY:
+        resume_text, text_parser, quality = bundle["text"], bundle["text_parser"], bundle["quality"]
+        path = "local" if is_text_quality_acceptable(quality) else "local_low_quality"
+    elif mode == "local_first":
+        resume_text, text_parser, quality = bundle["text"], bundle["text_parser"], bundle["quality"]
+        path = "local"
+        if not is_text_quality_acceptable(quality):
+            local_text, local_parser = resume_text, text_parser
+            try:
+                resume_text, text_parser = await _parse_with_llama(remote_content, remote_suffix, llama_api_key)
+                path = "remote"
+            except Exception as e:
+                print(f"LlamaParse unavailable, keeping local text: {e}")
+                resume_text = ""
+            # Low-quality local text still beats nothing
+            if not resume_text or not resume_text.strip():
+                resume_text, text_parser, path = local_text, local_parser, "local_low_quality"
+    else:
+        resume_text, text_parser = await _parse_with_llama(remote_content, remote_suffix, llama_api_key)
+        path = "remote"
+
+    if not resume_text or not resume_text.strip():
+        raise ResumeParseError("❌ Failed to parse resume text")
+
+    await store_cached_resume_text(prepared["file_hash"], resume_text, text_parser, prepared["page_count"])
+    return {
+        "resume_text": resume_text,
+        "parser": text_parser,
+        "path": path,
+        "mode": mode,
+        "quality": quality,
+        "elapsed_ms": int((time.perf_counter() - started) * 1000),
+        "normalize_ms": bundle["elapsed_ms"],
+    }
+
+
+def extraction_summary(extraction: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of an extraction result recorded on analysis_history."""
+    quality = extraction.get("quality") or {}
+    return {
+        "path": extraction["path"],
+        "parser": extraction["parser"],
+        "mode": extraction["mode"],
+        "quality_score": quality.get("score"),
+        "elapsed_ms": extraction["elapsed_ms"],
+        "normalize_ms": extraction["normalize_ms"],
+    }
+
+
+# ---------- STAGE 3: LLM ANALYSIS ----------
+async def analyze_resume_text(
+    company_id: str,
+    company: Dict[str, Any],
+    resume_text: str,
+    gemini_jd: Dict[str, Any],
+    gemini_model=None,
+    page_count: int = 1,
+    analysis_mode: Optional[str] = None,
+    contacts: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], bool, Dict[str, Any]]:
+    """
+    Run (or reuse) the Gemini analysis for one resume against one JD.
+    The prompt gets the compacted resume text, trimmed to the company's resume_token_budget.
+    :param gemini_model: already-initialized model to reuse across several JDs
+    :param analysis_mode: "fast" skips Gemini and the analysis cache entirely
+    :param contacts: extract_contacts(resume_text), shared with the storage step
+    :return: (analysis, analysis_cache_hit, token_usage)
+    """
+    if (analysis_mode or DEFAULT_ANALYSIS_MODE) == "fast":
+        analysis = await analyze_resume_fast(resume_text, gemini_jd, contacts)
+        return analysis, False, {"input_tokens": 0, "output_tokens": 0, "source": "local"}
+
+    model_name = company.get("gemini_model", "gemini-2.5-flash")
+    token_budget = company.get("resume_token_budget") or DEFAULT_RESUME_TOKEN_BUDGET
+
+    # Identical resume + JD + model already analyzed (double submit / retry) - skip the LLM call
+    analysis = await get_cached_analysis(company_id, resume_text, gemini_jd, model_name, token_budget)
+    if analysis is not None:
+        return analysis, True, {"input_tokens": 0, "output_tokens": 0, "source": "cache", "token_budget": token_budget}
+
+    prompt_resume_text, token_usage = prepare_prompt_resume_text(resume_text, page_count, token_budget)
+    if gemini_model is None:
+        gemini_model = await initialize_gemini(company.get("gemini_api_key"), model_name)
+    analysis = await analyze_resume_comprehensive(
+        resume_text, gemini_jd, gemini_model, company.get("gemini_api_key"), prompt_resume_text, contacts
+    )
+    # Billing data belongs to this call, not to the cached result
+    token_usage.update(analysis.pop("token_usage", {}))
+    await store_cached_analysis(company_id, resume_text, gemini_jd, model_name, analysis, token_budget)
+    return analysis, False, token_usage
+
+
+# ---------- STAGE 4: STORAGE ----------
+async def store_analysis(
+    analysis: Dict[str, Any],
+    jd_data: Dict[str, Any],
+    filename: str,
+    resume_text: str,
+    file_content: bytes,
+    current_user: Dict[str, Any],
+    page_count: int,
+    charge_usage: bool = True,
+    extra_fields: Optional[Dict[str, Any]] = None,
+    contacts: Optional[Dict[str, Any]] = None,
+    job_id: Optional[str] = None
+) -> str:
+    """
+    Persist the analysis record and charge its pages to the company's monthly usage.
+    :param charge_usage: False when the pages were already charged for this upload
+    :param contacts: extract_contacts(resume_text) from the analysis step
+    :param job_id: analysis job id; at most one record is stored per job
+    """
+    analysis_id = await store_results_in_mongodb(
+        analysis,
+        jd_data,
+        filename,
+        resume_text,
+        file_content,
+        jd_data.get("client_name"),
+        jd_data.get("jd_title"),
+        current_user["user_id"],
+        current_user["company_id"],
+        current_user.get("name"),
+        current_user.get("role"),
+        page_count=page_count,
+        extra_fields=extra_fields,
+        contacts=contacts,
+        job_id=job_id
+    )
+    if charge_usage:
+        await increment_usage(current_user["company_id"], page_count)
+    return analysis_id
+
+
+# ---------- FULL PIPELINE ----------
+async def run_resume_analysis(
+    company: Dict[str, Any],
+    current_user: Dict[str, Any],
+    filename: str,
+    file_content: bytes,
+    prepared: Dict[str, Any],
+    jd_data: Dict[str, Any],
+    job_id: Optional[str] = None,
+    event_context: Optional[Dict[str, Any]] = None,
+    parse_limiter=None,
+    llm_limiter=None,
+    db_limiter=None,
+    analysis_mode: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extract, analyze and store one resume, emitting progress events under job_id.
+    The optional limiters (e.g. semaphores) bound each stage when many resumes run at once.
+    :param analysis_mode: "comprehensive" (Gemini) or "fast" (local only); None uses the default
+    """
+    company_id = current_user["company_id"]
+    analysis_mode = analysis_mode or DEFAULT_ANALYSIS_MODE
+    if analysis_mode == "fast":
+        # No LLM call to bound
+        llm_limiter = None
+    event_context = event_context or {}
+
+    async with parse_limiter or nullcontext():
+        extraction = await extract_resume_text(
+            file_content, filename, prepared, company.get("llama_api_key"),
+            text_extraction_mode_for(company, analysis_mode)
+        )
+    resume_text = extraction["resume_text"]
+    contacts = extract_contacts(resume_text)
+    parse_ms = extraction["elapsed_ms"]
+    await emit_progress(
+        job_id, company_id, EVENT_TEXT_EXTRACTED, **event_context,
+        parser=extraction["parser"], path=extraction["path"],
+        cache_hit=extraction["path"] == "cache", elapsed_ms=parse_ms
+    )
+
+    async with llm_limiter or nullcontext():
+        await emit_progress(job_id, company_id, EVENT_LLM_STARTED, **event_context)
+        started = time.perf_counter()
+        analysis, analysis_cache_hit, token_usage = await analyze_resume_text(
+            company_id, company, resume_text, jd_for_gemini(jd_data), page_count=prepared["page_count"],
+            analysis_mode=analysis_mode, contacts=contacts
+        )
+        llm_ms = int((time.perf_counter() - started) * 1000)
+    await emit_progress(
+        job_id, company_id, EVENT_LLM_FINISHED, **event_context,
+        cache_hit=analysis_cache_hit, elapsed_ms=llm_ms
+    )
+
+    async with db_limiter or nullcontext():
+        analysis_id = await store_analysis(
+            analysis, jd_data, filename, resume_text, file_content, current_user, prepared["page_count"],
+            extra_fields={
+                "text_extraction": extraction_summary(extraction),
+                "token_usage": token_usage,
+                "analysis_mode": analysis_mode,
+            },
+            contacts=contacts
+        )
+    await emit_progress(job_id, company_id, EVENT_STORED, **event_context, analysis_id=analysis_id)
+
+    return {
+        "analysis_id": analysis_id,
+        "analysis": analysis,
+        "page_count": prepared["page_count"],
+        "text_parser": extraction["parser"],
+        "text_extraction": extraction_summary(extraction),
+        "parse_cache_hit": extraction["path"] == "cache",
+        "analysis_cache_hit": analysis_cache_hit,
+        "analysis_mode": analysis_mode,
+        "token_usage": token_usage,
+        "timings_ms": {"normalize": extraction["normalize_ms"], "parse": parse_ms, "llm": llm_ms},
+    }
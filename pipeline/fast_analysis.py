@@ -0,0 +1,156 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from gemini.gemini_utils import finalize_analysis
+from utils.skill_matcher import match_skills
+
+# ---------- FAST (LOCAL) ANALYSIS ----------
+# First-pass screening without an LLM call: skills from the Aho-Corasick matcher, positions
+# from the date ranges in the experience section, contacts and experience arithmetic from
+# the same post-processing the comprehensive analysis uses. Same result shape, no token cost.
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s*,?\s*'?\d{{4}}|\d{{1,2}}\s*[/\-.]\s*\d{{4}}|\d{{4}}\s*[/\-.]\s*\d{{1,2}}|\d{{4}})"
+_END = rf"(?:{_DATE}|present|current(?:ly)?|now|till date|till now|to date|ongoing|today)"
+DATE_RANGE_RE = re.compile(
+    rf"(?<![\w/])({_DATE})\s*(?:-|–|—|to|till|until)\s*({_END})(?![\w/])",
+    re.IGNORECASE
+)
+
+_EXPERIENCE_HEADER_RE = re.compile(
+    r"^\W*((work |professional |employment |career )?(experience|history)|employment( history)?|work history)\W*$",
+    re.IGNORECASE
+)
+# Any other section header ends the experience section
+_OTHER_HEADER_RE = re.compile(
+    r"^\W*(education|academic (details|qualifications?)|qualifications?|projects|(technical |key )?skills|"
+    r"certifications?|achievements|awards|publications|languages( known)?|hobbies|interests|references?|"
+    r"declaration|personal (details|information|profile)|summary|profile|objective|career objective)\W*$",
+    re.IGNORECASE
+)
+_EDUCATION_WORDS_RE = re.compile(
+    r"\b(university|college|school|institute|b\.?tech|m\.?tech|bachelor|master|mba|b\.?sc|m\.?sc|"
+    r"b\.?e|m\.?e|ph\.?d|diploma|cgpa|gpa|percentage|ssc|hsc|class x|class xii)\b",
+    re.IGNORECASE
+)
+_NAME_RE = re.compile(r"^[A-Za-z][A-Za-z.'\-]*(\s+[A-Za-z][A-Za-z.'\-]*){1,3}$")
+_NOT_NAME_WORDS = {"resume", "curriculum", "vitae", "cv", "profile", "summary", "contact"}
+_SEPARATOR_RE = re.compile(r"\s*(?:\||,|@|\bat\b|–|—|-)\s*")
+
+
+def _experience_lines(lines: List[str]) -> List[str]:
+    """Lines of the experience section(s); the whole text if the resume has no such header."""
+    selected, inside, has_header = [], False, False
+    for line in lines:
+        if len(line) <= 40 and _EXPERIENCE_HEADER_RE.match(line):
+            inside, has_header = True, True
+            continue
+        if len(line) <= 40 and _OTHER_HEADER_RE.match(line):
+            inside = False
+            continue
+        if inside:
+            selected.append(line)
+    return selected if has_header else lines
+
+
+def _split_role(context: str) -> Dict[str, str]:
+    parts = [p.strip(" .:;()") for p in _SEPARATOR_RE.split(context) if p.strip(" .:;()")]
+    if not parts:
+        return {"title": "Not specified", "company": "Not specified"}
+    if len(parts) == 1:
+        return {"title": parts[0], "company": "Not specified"}
+    return {"title": parts[0], "company": parts[1]}
+
+
+def extract_positions(resume_text: str) -> List[Dict[str, Any]]:
+    """
+    Positions from date ranges ("Jan 2020 - Present", "03/2019 - 06/2021", "2018 - 2020").
+    The role is taken from the rest of the line, or the line above when the dates stand alone.
+    """
+    lines = [line.strip() for line in (resume_text or "").splitlines() if line.strip()]
+    exp_lines = _experience_lines(lines)
+
+    positions, seen = [], set()
+    for index, line in enumerate(exp_lines):
+        match = DATE_RANGE_RE.search(line)
+        if not match:
+            continue
+        rest = (line[:match.start()] + " " + line[match.end():]).strip(" |,-–—()")
+        context = rest if len(rest) >= 3 else (exp_lines[index - 1] if index > 0 else "")
+        if _EDUCATION_WORDS_RE.search(context) or _EDUCATION_WORDS_RE.search(line):
+            continue
+
+        key = (match.group(1).lower(), match.group(2).lower(), context.lower())
+        if key in seen:
+            continue
+        seen.add(key)
+
+        lowered = context.lower()
+        is_internship = "intern" in lowered
+        if is_internship:
+            employment_type = "internship"
+        elif "freelance" in lowered:
+            employment_type = "freelance"
+        elif "contract" in lowered:
+            employment_type = "contract"
+        else:
+            employment_type = "full-time"
+
+        positions.append({
+            **_split_role(context),
+            "start_date": match.group(1),
+            "end_date": match.group(2),
+            "domain": "Not specified",
+            "is_internship": is_internship,
+            "employment_type": employment_type,
+        })
+    return positions
+
+
+def extract_candidate_name(resume_text: str) -> str:
+    """First short, purely alphabetic line near the top of the resume."""
+    for line in [l.strip() for l in (resume_text or "").splitlines() if l.strip()][:8]:
+        if _NAME_RE.match(line) and not (set(line.lower().split()) & _NOT_NAME_WORDS):
+            return line.title() if line.isupper() else line
+    return "Not specified"
+
+
+async def analyze_resume_fast(
+    resume_text: str,
+    jd_data: Dict[str, Any],
+    contacts: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Local analysis with the same result structure as analyze_resume_comprehensive.
+    :param resume_text: Full resume text
+    :param jd_data: JD as sent to Gemini (primary_skills, secondary_skills, experience fields)
+    :param contacts: extract_contacts(resume_text), if the caller already has it
+    """
+    try:
+        skill_analysis = match_skills(
+            resume_text, jd_data.get("primary_skills", []), jd_data.get("secondary_skills", [])
+        )
+        primary_total = len(skill_analysis["matching_skills"]) + len(skill_analysis["missing_primary_skills"])
+        summary = f"Matched {len(skill_analysis['matching_skills'])} of {primary_total} primary skills."
+        if skill_analysis["matching_secondary_skills"]:
+            summary += f" Additional Advantage: {', '.join(skill_analysis['matching_secondary_skills'])}."
+
+        suggestions = []
+        if skill_analysis["missing_primary_skills"]:
+            suggestions.append(
+                f"Mention experience with: {', '.join(skill_analysis['missing_primary_skills'])}"
+            )
+
+        result = {
+            "candidate_info": {"candidate_name": extract_candidate_name(resume_text)},
+            "skill_analysis": skill_analysis,
+            "experience_analysis": {"positions": extract_positions(resume_text)},
+            "suggestions": suggestions,
+            "summary": summary,
+        }
+        result = await finalize_analysis(result, resume_text, jd_data, contacts)
+        result["analysis_type"] = "fast"
+        return result
+
+    except Exception as e:
+        raise Exception(f"Fast analysis failed: {str(e)}")
@@ -0,0 +1,534 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import Binary
+from pymongo import ReturnDocument
+
+from mongodb.mongodb_db import get_db, increment_usage
+from cache.resume_cache import get_cached_resume_text
+from parsing.document_normalizer import normalize_document
+from pipeline.progress import (
+    emit_progress,
+    EVENT_UPLOAD_RECEIVED,
+    EVENT_PAGE_COUNT,
+    EVENT_TEXT_EXTRACTED,
+    EVENT_LLM_STARTED,
+    EVENT_LLM_FINISHED,
+    EVENT_STORED,
+    EVENT_DONE,
+    EVENT_FAILED,
+    EVENT_RETRY_SCHEDULED
+)
+from parsing.libreoffice_pool import get_converter_metrics
+from parsing.document_service import get_document_pool_metrics
+from pipeline.analysis_pipeline import (
+    ResumeParseError,
+    get_company_ai_settings,
+    jd_for_gemini,
+    text_extraction_mode_for,
+    extract_resume_text,
+    extraction_summary,
+    analyze_resume_text,
+    store_analysis,
+    DEFAULT_ANALYSIS_MODE
+)
+from parsing.contact_extractor import extract_contacts
+
+# Durable analysis jobs in the analysis_jobs collection.
+# A worker claims a job by taking a lease; if it dies, the lease expires and another worker retries it.
+JOB_STATE_QUEUED = "queued"
+JOB_STATE_PARSING = "parsing"
+JOB_STATE_ANALYZING = "analyzing"
+JOB_STATE_STORING = "storing"
+JOB_STATE_DONE = "done"
+JOB_STATE_FAILED = "failed"
+ACTIVE_JOB_STATES = [JOB_STATE_PARSING, JOB_STATE_ANALYZING, JOB_STATE_STORING]
+
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("ANALYSIS_JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("ANALYSIS_JOB_RETRY_BASE_SECONDS", "10"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_INTERVAL", "1.0"))
+WORKER_HEARTBEAT_INTERVAL_SECONDS = int(os.getenv("ANALYSIS_WORKER_HEARTBEAT_INTERVAL", "10"))
+# Leases are renewed this often while a job runs, so a slow stage (Gemini alone may take
+# 120s, plus waiting for a concurrency slot) never outlives its lease
+JOB_LEASE_RENEW_INTERVAL_SECONDS = max(1, JOB_VISIBILITY_TIMEOUT_SECONDS // 3)
+
+
+class JobLeaseLostError(Exception):
+    """Raised when another worker took over a job whose lease had expired."""
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# ---------- ENQUEUE / READ ----------
+def _bundle_for_job(bundle: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Keep the normalization bundle on the job so a retry does not convert the upload again."""
+    if bundle is None:
+        return None
+    job_bundle = {k: v for k, v in bundle.items() if k != "pdf_bytes"}
+    # A PDF upload is its own normalized PDF; only store converted ones
+    if bundle["pdf_bytes"] is not None and bundle["extension"] != ".pdf":
+        job_bundle["pdf_bytes"] = Binary(bundle["pdf_bytes"])
+    return job_bundle
+
+
+def _bundle_from_job(job: Dict, file_content: bytes) -> Optional[Dict[str, Any]]:
+    job_bundle = job.get("bundle")
+    if not job_bundle:
+        return None
+    bundle = dict(job_bundle)
+    if bundle.get("pdf_bytes") is not None:
+        bundle["pdf_bytes"] = bytes(bundle["pdf_bytes"])
+    else:
+        bundle["pdf_bytes"] = file_content if bundle["extension"] == ".pdf" else None
+    return bundle
+
+
+async def enqueue_analysis_job(
+    current_user: Dict[str, Any],
+    filename: str,
+    file_content: bytes,
+    jd_data: Dict[str, Any],
+    prepared: Dict[str, Any],
+    analysis_mode: Optional[str] = None
+) -> str:
+    db = await get_db()
+    now = datetime.utcnow()
+    job_id = str(uuid.uuid4())
+    await db.analysis_jobs.insert_one({
+        "job_id": job_id,
+        "state": JOB_STATE_QUEUED,
+        "company_id": current_user["company_id"],
+        "created_by": current_user["user_id"],
+        "user": {
+            "user_id": current_user["user_id"],
+            "company_id": current_user["company_id"],
+            "name": current_user.get("name"),
+            "role": current_user.get("role")
+        },
+        "filename": filename,
+        "file_content": Binary(file_content),
+        "file_hash": prepared["file_hash"],
+        "page_count": prepared["page_count"],
+        "bundle": _bundle_for_job(prepared.get("bundle")),
+        "jd_data": jd_data,
+        "analysis_mode": analysis_mode or DEFAULT_ANALYSIS_MODE,
+        "attempts": 0,
+        "max_attempts": JOB_MAX_ATTEMPTS,
+        "available_at": now,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "analysis_id": None,
+        "result": None,
+        "error": None,
+        "history": [{"state": JOB_STATE_QUEUED, "at": now}],
+        "created_at": now,
+        "updated_at": now
+    })
+    await emit_progress(job_id, current_user["company_id"], EVENT_UPLOAD_RECEIVED, filename=filename, size=len(file_content))
+    await emit_progress(job_id, current_user["company_id"], EVENT_PAGE_COUNT, page_count=prepared["page_count"])
+    return job_id
+
+
+async def get_analysis_job(job_id: str, company_id: str) -> Optional[Dict]:
+    db = await get_db()
+    return await db.analysis_jobs.find_one(
+        {"job_id": job_id, "company_id": company_id},
+        {"_id": 0, "file_content": 0, "bundle": 0, "lease_owner": 0}
+    )
+
+
+# ---------- LEASES ----------
+async def claim_next_job(worker_id: str) -> Optional[Dict]:
+    """
+    Atomically lease the oldest runnable job: a queued job whose retry delay has passed,
+    or an in-flight job whose previous worker's lease expired and that has attempts left
+    (see dead_letter_expired_jobs for the others).
+    """
+    db = await get_db()
+    now = datetime.utcnow()
+    return await db.analysis_jobs.find_one_and_update(
+        {
+            "$or": [
+                {"state": JOB_STATE_QUEUED, "available_at": {"$lte": now}},
+                {
+                    "state": {"$in": ACTIVE_JOB_STATES},
+                    "lease_expires_at": {"$lt": now},
+                    "$expr": {"$lt": ["$attempts", "$max_attempts"]}
+                }
+            ]
+        },
+        {
+            "$set": {
+                "state": JOB_STATE_PARSING,
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1},
+            "$push": {"history": {"state": JOB_STATE_PARSING, "at": now, "worker": worker_id}}
+        },
+        sort=[("available_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def renew_job_lease(job_id: str, worker_id: str) -> bool:
+    """Extend the lease of a running job. :return: False if the lease was lost"""
+    db = await get_db()
+    now = datetime.utcnow()
+    result = await db.analysis_jobs.update_one(
+        {"job_id": job_id, "lease_owner": worker_id},
+        {"$set": {"lease_expires_at": now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS), "updated_at": now}}
+    )
+    return result.matched_count > 0
+
+
+async def _lease_renewal_loop(job_id: str, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(JOB_LEASE_RENEW_INTERVAL_SECONDS)
+        try:
+            if not await renew_job_lease(job_id, worker_id):
+                # The next state change raises JobLeaseLostError
+                print(f"Lease lost for job {job_id}")
+                return
+        except Exception as e:
+            print(f"Lease renewal failed for job {job_id}: {e}")
+
+
+async def dead_letter_expired_jobs() -> int:
+    """
+    Fail in-flight jobs whose lease expired after their last allowed attempt (the worker
+    crashed or was killed every time, so fail_job never ran).
+    :return: number of jobs dead-lettered
+    """
+    db = await get_db()
+    now = datetime.utcnow()
+    query = {
+        "state": {"$in": ACTIVE_JOB_STATES},
+        "lease_expires_at": {"$lt": now},
+        "$expr": {"$gte": ["$attempts", "$max_attempts"]}
+    }
+    expired = await db.analysis_jobs.find(query, {"job_id": 1, "company_id": 1, "attempts": 1}).to_list(length=None)
+    failed = 0
+    for job in expired:
+        error = f"Worker lost the job on each of {job['attempts']} attempts"
+        result = await db.analysis_jobs.update_one(
+            {"job_id": job["job_id"], **query},
+            {
+                "$set": {
+                    "state": JOB_STATE_FAILED, "error": error, "dead_lettered_at": now,
+                    "lease_owner": None, "lease_expires_at": None, "updated_at": now
+                },
+                "$push": {"history": {"state": JOB_STATE_FAILED, "at": now, "error": error}},
+                "$unset": {"file_content": "", "bundle": ""}
+            }
+        )
+        if result.modified_count:
+            failed += 1
+            await emit_progress(job["job_id"], job["company_id"], EVENT_FAILED, error=error)
+    return failed
+
+
+async def set_job_state(job_id: str, worker_id: str, state: str, **fields) -> None:
+    """Move a leased job to a new state and renew its lease."""
+    db = await get_db()
+    now = datetime.utcnow()
+    result = await db.analysis_jobs.update_one(
+        {"job_id": job_id, "lease_owner": worker_id},
+        {
+            "$set": {
+                "state": state,
+                "lease_expires_at": now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS),
+                "updated_at": now,
+                **fields
+            },
+            "$push": {"history": {"state": state, "at": now}}
+        }
+    )
+    if result.matched_count == 0:
+        raise JobLeaseLostError(f"Lease lost for job {job_id}")
+
+
+async def charge_job_usage(job: Dict) -> None:
+    """Charge the job's pages once, however many attempts reached the store stage."""
+    db = await get_db()
+    result = await db.analysis_jobs.update_one(
+        {"job_id": job["job_id"], "usage_charged_at": None},
+        {"$set": {"usage_charged_at": datetime.utcnow()}}
+    )
+    if result.modified_count:
+        await increment_usage(job["company_id"], job["page_count"])
+
+
+async def complete_job(job: Dict, worker_id: str, result: Dict[str, Any]) -> None:
+    await set_job_state(
+        job["job_id"], worker_id, JOB_STATE_DONE,
+        result=result, error=None, lease_owner=None, lease_expires_at=None
+    )
+    # The upload is no longer needed once the analysis record exists
+    db = await get_db()
+    await db.analysis_jobs.update_one({"job_id": job["job_id"]}, {"$unset": {"file_content": "", "bundle": ""}})
+
+
+async def fail_job(job: Dict, worker_id: str, error: str, retryable: bool = True) -> None:
+    """Schedule a retry with exponential backoff, or dead-letter the job after max_attempts."""
+    db = await get_db()
+    now = datetime.utcnow()
+    attempts = job.get("attempts", 1)
+
+    if retryable and attempts < job.get("max_attempts", JOB_MAX_ATTEMPTS):
+        delay = JOB_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+        update = {
+            "state": JOB_STATE_QUEUED,
+            "available_at": now + timedelta(seconds=delay),
+            "error": error
+        }
+    else:
+        update = {"state": JOB_STATE_FAILED, "error": error, "dead_lettered_at": now}
+
+    job_update = {
+        "$set": {**update, "lease_owner": None, "lease_expires_at": None, "updated_at": now},
+        "$push": {"history": {"state": update["state"], "at": now, "error": error}}
+    }
+    if update["state"] == JOB_STATE_FAILED:
+        # No attempt will read the upload again
+        job_update["$unset"] = {"file_content": "", "bundle": ""}
+    await db.analysis_jobs.update_one({"job_id": job["job_id"], "lease_owner": worker_id}, job_update)
+    if update["state"] == JOB_STATE_FAILED:
+        await emit_progress(job["job_id"], job["company_id"], EVENT_FAILED, error=error)
+    else:
+        await emit_progress(job["job_id"], job["company_id"], EVENT_RETRY_SCHEDULED, error=error, attempt=attempts)
+
+
+# ---------- EXECUTION ----------
+async def run_analysis_job(job: Dict, worker_id: str) -> None:
+    job_id = job["job_id"]
+    user = job["user"]
+    jd_data = job["jd_data"]
+    analysis_mode = job.get("analysis_mode") or DEFAULT_ANALYSIS_MODE
+    file_content = bytes(job["file_content"])
+    prepared = {
+        "file_hash": job["file_hash"],
+        "page_count": job["page_count"],
+        "cached_text": await get_cached_resume_text(job["file_hash"]),
+        "bundle": _bundle_from_job(job, file_content)
+    }
+
+    company_id = user["company_id"]
+    lease_renewal = asyncio.create_task(_lease_renewal_loop(job_id, worker_id))
+    try:
+        company = await get_company_ai_settings(company_id)
+        if not company:
+            await fail_job(job, worker_id, "Company not found", retryable=False)
+            return
+
+        if prepared["cached_text"] is None and prepared["bundle"] is None:
+            # Enqueue only estimated the pages; normalize here, off the web tier, and keep the
+            # bundle on the job so a retry does not convert the upload again
+            bundle = await normalize_document(file_content, job["filename"], job["file_hash"])
+            prepared["bundle"] = bundle
+            fields = {"bundle": _bundle_for_job(bundle)}
+            if bundle["page_count"] != job["page_count"]:
+                job["page_count"] = prepared["page_count"] = fields["page_count"] = bundle["page_count"]
+                await emit_progress(job_id, company_id, EVENT_PAGE_COUNT, page_count=bundle["page_count"])
+            await set_job_state(job_id, worker_id, JOB_STATE_PARSING, **fields)
+
+        extraction = await extract_resume_text(
+            file_content, job["filename"], prepared, company.get("llama_api_key"),
+            text_extraction_mode_for(company, analysis_mode)
+        )
+        resume_text = extraction["resume_text"]
+        contacts = extract_contacts(resume_text)
+        text_parser = extraction["parser"]
+        await emit_progress(
+            job_id, company_id, EVENT_TEXT_EXTRACTED, parser=text_parser, path=extraction["path"],
+            cache_hit=extraction["path"] == "cache", elapsed_ms=extraction["elapsed_ms"]
+        )
+
+        await set_job_state(job_id, worker_id, JOB_STATE_ANALYZING, text_parser=text_parser)
+        await emit_progress(job_id, company_id, EVENT_LLM_STARTED)
+        started = time.perf_counter()
+        analysis, analysis_cache_hit, token_usage = await analyze_resume_text(
+            company_id, company, resume_text, jd_for_gemini(jd_data), page_count=job["page_count"],
+            analysis_mode=analysis_mode, contacts=contacts
+        )
+        await emit_progress(
+            job_id, company_id, EVENT_LLM_FINISHED, cache_hit=analysis_cache_hit,
+            elapsed_ms=int((time.perf_counter() - started) * 1000)
+        )
+
+        # A previous attempt may have stored the record (and charged it) before its lease
+        # expired: the record is keyed on job_id and usage is charged once per job
+        analysis_id = job.get("analysis_id")
+        if not analysis_id:
+            await set_job_state(job_id, worker_id, JOB_STATE_STORING)
+            analysis_id = await store_analysis(
+                analysis, jd_data, job["filename"], resume_text, file_content, user, job["page_count"],
+                charge_usage=False,
+                extra_fields={
+                    "text_extraction": extraction_summary(extraction),
+                    "token_usage": token_usage,
+                    "analysis_mode": analysis_mode,
+                },
+                contacts=contacts,
+                job_id=job_id
+            )
+            await set_job_state(job_id, worker_id, JOB_STATE_STORING, analysis_id=analysis_id)
+        await charge_job_usage(job)
+        await emit_progress(job_id, company_id, EVENT_STORED, analysis_id=analysis_id)
+
+        await complete_job(job, worker_id, {
+            "analysis_id": analysis_id,
+            "analysis": analysis,
+            "page_count": job["page_count"],
+            "text_parser": text_parser,
+            "text_extraction": extraction_summary(extraction),
+            "analysis_cache_hit": analysis_cache_hit,
+            "analysis_mode": analysis_mode,
+            "token_usage": token_usage
+        })
+        await emit_progress(job_id, company_id, EVENT_DONE, analysis_id=analysis_id)
+    except JobLeaseLostError as e:
+        print(f"Analysis job abandoned: {e}")
+    except ResumeParseError as e:
+        await fail_job(job, worker_id, str(e), retryable=False)
+    except asyncio.CancelledError:
+        # Shutdown: leave the lease to expire so another worker picks the job up
+        raise
+    except Exception as e:
+        await fail_job(job, worker_id, str(e))
+    finally:
+        lease_renewal.cancel()
+
+
+async def job_worker_loop(worker_id: str, stop_event: asyncio.Event, stats: Optional[Dict[str, int]] = None) -> None:
+    """Claim and run jobs until stop_event is set; the job in hand is always finished first."""
+    stats = stats if stats is not None else new_worker_stats()
+    while not stop_event.is_set():
+        try:
+            job = await claim_next_job(worker_id)
+        except Exception as e:
+            print(f"Analysis job claim failed: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        stats["in_flight"] += 1
+        try:
+            await run_analysis_job(job, worker_id)
+            stats["processed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Analysis job {job.get('job_id')} crashed: {e}")
+        finally:
+            stats["in_flight"] -= 1
+
+
+def new_worker_stats() -> Dict[str, int]:
+    return {"in_flight": 0, "processed": 0, "errors": 0}
+
+
+def start_job_workers(
+    concurrency: int,
+    stop_event: asyncio.Event,
+    kind: str = "web",
+    worker_id: Optional[str] = None
+) -> List[asyncio.Task]:
+    """Start `concurrency` consumer loops plus one heartbeat task for this process."""
+    if concurrency <= 0:
+        return []
+    worker_id = worker_id or new_worker_id()
+    stats = new_worker_stats()
+    tasks = [
+        asyncio.create_task(job_worker_loop(f"{worker_id}#{slot}", stop_event, stats))
+        for slot in range(concurrency)
+    ]
+    tasks.append(asyncio.create_task(
+        worker_heartbeat_loop(worker_id, kind, concurrency, stats, stop_event)
+    ))
+    return tasks
+
+
+# ---------- HEARTBEATS ----------
+async def record_worker_heartbeat(worker_id: str, kind: str, concurrency: int, stats: Dict[str, int], state: str = "running") -> None:
+    db = await get_db()
+    now = datetime.utcnow()
+    await db.analysis_workers.update_one(
+        {"_id": worker_id},
+        {
+            "$set": {
+                "kind": kind,
+                "host": socket.gethostname(),
+                "pid": os.getpid(),
+                "concurrency": concurrency,
+                "state": state,
+                "in_flight": stats["in_flight"],
+                "processed": stats["processed"],
+                "errors": stats["errors"],
+                "libreoffice": get_converter_metrics(),
+                "document_pool": get_document_pool_metrics(),
+                "last_heartbeat": now
+            },
+            "$setOnInsert": {"started_at": now}
+        },
+        upsert=True
+    )
+
+
+async def worker_heartbeat_loop(
+    worker_id: str,
+    kind: str,
+    concurrency: int,
+    stats: Dict[str, int],
+    stop_event: asyncio.Event
+) -> None:
+    while not stop_event.is_set():
+        try:
+            await record_worker_heartbeat(worker_id, kind, concurrency, stats)
+        except Exception as e:
+            print(f"Worker heartbeat failed: {e}")
+        try:
+            await dead_letter_expired_jobs()
+        except Exception as e:
+            print(f"Expired job sweep failed: {e}")
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=WORKER_HEARTBEAT_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    try:
+        await record_worker_heartbeat(worker_id, kind, concurrency, stats, state="draining")
+    except Exception:
+        pass
+
+
+async def remove_worker_heartbeat(worker_id: str) -> None:
+    db = await get_db()
+    await db.analysis_workers.delete_one({"_id": worker_id})
+
+
+async def list_live_workers() -> List[Dict]:
+    """Workers that sent a heartbeat within the last three intervals."""
+    db = await get_db()
+    cutoff = datetime.utcnow() - timedelta(seconds=WORKER_HEARTBEAT_INTERVAL_SECONDS * 3)
+    workers = await db.analysis_workers.find(
+        {"last_heartbeat": {"$gte": cutoff}}
+    ).sort("started_at", 1).to_list(length=None)
+    for worker in workers:
+        worker["worker_id"] = worker.pop("_id")
+    return workers
@@ -0,0 +1,106 @@
+import os
+import json
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from mongodb.mongodb_db import get_db
+
+# Stage events for an analysis (sync request, queued job or batch), stored in
+# analysis_events so any web worker can stream them, whichever process ran the analysis.
+# Events of one job come from several processes (web node, worker), so they are ordered by
+# a per-job sequence number from analysis_event_counters, not by their ObjectIds.
+EVENT_UPLOAD_RECEIVED = "upload_received"
+EVENT_PAGE_COUNT = "page_count"
+EVENT_TEXT_EXTRACTED = "text_extracted"
+EVENT_LLM_STARTED = "llm_started"
+EVENT_LLM_FINISHED = "llm_finished"
+EVENT_STORED = "stored"
+EVENT_FILE_COMPLETED = "file_completed"
+EVENT_DONE = "done"
+EVENT_FAILED = "failed"
+EVENT_RETRY_SCHEDULED = "retry_scheduled"
+EVENT_BATCH_COMPLETED = "batch_completed"
+TERMINAL_EVENTS = {EVENT_DONE, EVENT_FAILED, EVENT_BATCH_COMPLETED}
+
+PROGRESS_POLL_INTERVAL_SECONDS = float(os.getenv("PROGRESS_POLL_INTERVAL", "0.5"))
+PROGRESS_KEEPALIVE_SECONDS = int(os.getenv("PROGRESS_KEEPALIVE_SECONDS", "15"))
+PROGRESS_STREAM_TIMEOUT_SECONDS = int(os.getenv("PROGRESS_STREAM_TIMEOUT", "900"))
+# How long a stream waits for a missing sequence number (an event still being written, or
+# one whose write failed) before moving past it
+PROGRESS_GAP_WAIT_SECONDS = float(os.getenv("PROGRESS_GAP_WAIT_SECONDS", "5"))
+
+
+async def emit_progress(job_id: Optional[str], company_id: str, event: str, **data: Any) -> None:
+    """Record a stage event. No-op without a job_id; never fails the analysis itself."""
+    if not job_id:
+        return
+    try:
+        db = await get_db()
+        now = datetime.utcnow()
+        counter = await db.analysis_event_counters.find_one_and_update(
+            {"_id": job_id},
+            {"$inc": {"seq": 1}, "$set": {"updated_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await db.analysis_events.insert_one({
+            "job_id": job_id,
+            "seq": counter["seq"],
+            "company_id": company_id,
+            "event": event,
+            "data": data,
+            "at": now
+        })
+    except Exception as e:
+        print(f"Progress event {event} for {job_id} not recorded: {e}")
+
+
+def _format_sse(event: str, payload: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_progress(job_id: str, company_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Yield Server-Sent Events for a job until a terminal event is seen.
+    Supports resuming from the browser's Last-Event-ID (the last sequence number sent).
+    """
+    db = await get_db()
+    last_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    last_sent = started
+    gap_since = None
+
+    while loop.time() - started < PROGRESS_STREAM_TIMEOUT_SECONDS:
+        events = await db.analysis_events.find(
+            {"job_id": job_id, "company_id": company_id, "seq": {"$gt": last_seq}}
+        ).sort("seq", 1).to_list(length=100)
+
+        for doc in events:
+            if doc["seq"] != last_seq + 1:
+                # A lower number is taken but its event is not written yet: wait for it
+                gap_since = gap_since if gap_since is not None else loop.time()
+                if loop.time() - gap_since < PROGRESS_GAP_WAIT_SECONDS:
+                    break
+            gap_since = None
+            last_seq = doc["seq"]
+            last_sent = loop.time()
+            payload = {"job_id": job_id, "at": doc["at"].isoformat(), **doc.get("data", {})}
+            yield _format_sse(doc["event"], payload, str(doc["seq"]))
+            if doc["event"] in TERMINAL_EVENTS:
+                return
+
+        if loop.time() - last_sent >= PROGRESS_KEEPALIVE_SECONDS:
+            last_sent = loop.time()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(PROGRESS_POLL_INTERVAL_SECONDS)
+
+    yield _format_sse("timeout", {"job_id": job_id})
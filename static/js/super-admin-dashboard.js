@@ -218,11 +218,13 @@ async function loadAuditLogs() {
     }
 }
 
-async function fetchAuditLogs(companyId = "", companyNameMap = {}) {
+async function fetchAuditLogs(companyId = "", companyNameMap = {}, cursor = null, loadedLogs = []) {
     try {
-        const url = companyId
-            ? `${API_BASE_URL}/audit-logs?company_id=${companyId}`
-            : `${API_BASE_URL}/audit-logs`;
+        // 🔹 Keyset-paginated: each "Load more" follows next_cursor
+        const params = new URLSearchParams();
+        if (companyId) params.set('company_id', companyId);
+        if (cursor) params.set('cursor', cursor);
+        const url = `${API_BASE_URL}/audit-logs?${params}`;
 
         const response = await apiFetch(url, {
             headers: { "X-User-Role": "super_admin" }
@@ -230,7 +232,11 @@ async function fetchAuditLogs(companyId = "", companyNameMap = {}) {
 
         if (response.ok) {
             const data = await response.json();
-            displayAuditLogs(data.logs || [], companyNameMap);
+            const logs = loadedLogs.concat(data.logs || []);
+            displayAuditLogs(logs, companyNameMap);
+            if (data.next_cursor) {
+                appendLoadMoreAuditLogs(() => fetchAuditLogs(companyId, companyNameMap, data.next_cursor, logs));
+            }
         } else {
             document.getElementById('dataContent').innerHTML =
                 `<div class="alert alert-danger">Failed to load audit logs</div>`;
@@ -240,6 +246,17 @@ async function fetchAuditLogs(companyId = "", companyNameMap = {}) {
             `<div class="alert alert-danger">Error loading audit logs: ${error.message}</div>`;
     }
 }
+function appendLoadMoreAuditLogs(onLoadMore) {
+    const button = document.createElement('button');
+    button.className = 'btn btn-outline-primary btn-sm d-block mx-auto my-3';
+    button.textContent = 'Load more';
+    button.addEventListener('click', () => {
+        button.disabled = true;
+        onLoadMore();
+    });
+    document.getElementById('dataContent').appendChild(button);
+}
+
 function displayAuditLogs(logs, companyNameMap = {}) {
     const content = document.getElementById("dataContent");
 
@@ -4,7 +4,7 @@ const API_BASE_URL = 'https://new-one-vnnv.onrender.com';
         
         let userData = null;
         let companyData = null;
-        let analysisHistory = [];
+        let historyStats = null;
         function updateSidebarLogo(completeUserData1) {
     const sidebarLogo = document.getElementById('sidebarCompanyLogo');
 
@@ -98,8 +98,8 @@ const API_BASE_URL = 'https://new-one-vnnv.onrender.com';
         // Function to update dashboard stats
 async function updateDashboardStats() {
     try {
-        // Ensure analysisHistory is loaded
-        if (!analysisHistory || analysisHistory.length === 0) {
+        // Ensure historyStats is loaded
+        if (!historyStats) {
             await loadAnalysisHistory();
         }
 
@@ -114,22 +114,11 @@ async function updateDashboardStats() {
         }
 
         // Monthly pages and analyses
-        const now = new Date();
-        const currentMonth = now.getMonth();
-        const currentYear = now.getFullYear();
-
-        const monthlyPages = analysisHistory
-            .filter(a => a.timestamp && new Date(a.timestamp).getMonth() === currentMonth && new Date(a.timestamp).getFullYear() === currentYear)
-            .reduce((sum, a) => sum + (a.page_count || 0), 0);
-
         const monthlyPagesEl = document.getElementById("monthlyPagesCount");
-        if (monthlyPagesEl) monthlyPagesEl.textContent = monthlyPages;
-
-        const monthlyAnalyses = analysisHistory
-            .filter(a => a.timestamp && new Date(a.timestamp).getMonth() === currentMonth && new Date(a.timestamp).getFullYear() === currentYear);
+        if (monthlyPagesEl) monthlyPagesEl.textContent = historyStats.current_month.pages;
 
         const monthlyAnalysesEl = document.getElementById("monthlyAnalysesCount");
-        if (monthlyAnalysesEl) monthlyAnalysesEl.textContent = monthlyAnalyses.length;
+        if (monthlyAnalysesEl) monthlyAnalysesEl.textContent = historyStats.current_month.analyses;
 
     } catch (error) {
         console.error("Error updating dashboard stats:", error);
@@ -202,19 +191,12 @@ async function updateDashboardChart() {
             labels.push(`${monthNames[i]} ${selectedYear}`);
         }
 
+        const stats = await fetchHistoryStats(selectedYear);
         const userPages = [];
         for (let month = 0; month < monthCount; month++) {
-            const pages = analysisHistory
-                .filter(a => {
-                    if (!a.timestamp) return false;
-                    const d = new Date(a.timestamp);
-                    return (
-                        d.getMonth() === month &&
-                        d.getFullYear() === selectedYear &&
-                        a.created_by === userData.user_id   // ✅ only current user
-                    );
-                })
-                .reduce((sum, a) => sum + (a.page_count || 0), 0);
+            const pages = stats.monthly
+                .filter(m => m.month === month + 1 && m.user_id === userData.user_id)   // ✅ only current user
+                .reduce((sum, m) => sum + m.pages, 0);
             userPages.push(pages);
         }
 
@@ -592,15 +574,13 @@ async function updateDashboardChart() {
     populateClientAndJDFilters();
 }
 
-async function loadHistory_report() {
+async function loadHistory_report(cursor = null, loadedItems = []) {
     const historyTable = document.getElementById('history_table');
     if (!historyTable) return;
 
-    historyTable.innerHTML = '<div class="text-center p-4">Loading history...</div>';
+    if (!cursor) historyTable.innerHTML = '<div class="text-center p-4">Loading history...</div>';
 
     try {
-        let items = [...analysisHistory]; // clone
-
         // 🔹 Get filters
         const selectedUserIds = Array.from(document.getElementById('user_filter')?.selectedOptions || []).map(opt => opt.value);
         const clientFilter = document.getElementById('client_filter')?.value || 'all';
@@ -610,38 +590,20 @@ async function loadHistory_report() {
         const fromDate = document.getElementById('from_date')?.value;
         const toDate = document.getElementById('to_date')?.value;
 
-        // 🔹 Apply filters
-        if (selectedUserIds.length > 0 && !selectedUserIds.includes('all')) {
-            items = items.filter(x => selectedUserIds.includes(x.created_by));
-        }
-        if (clientFilter !== 'all') {
-            items = items.filter(x => x.client_name === clientFilter);
-        }
-        if (jdFilter !== 'all') {
-            items = items.filter(x => x.jd_title === jdFilter);
-        }
-        if (expMatchFilter !== 'all') {
-            const isMatch = expMatchFilter === 'true';
-            items = items.filter(x => !!x.experience_match === isMatch);
-        }
+        // 🔹 Apply filters server-side; pages come back newest first
+        const filters = {
+            created_by: selectedUserIds.length > 0 && !selectedUserIds.includes('all') ? selectedUserIds.join(',') : null,
+            client_name: clientFilter !== 'all' ? clientFilter : null,
+            jd_title: jdFilter !== 'all' ? jdFilter : null,
+            experience_match: expMatchFilter !== 'all' ? expMatchFilter : null,
+            date_from: fromDate ? `${fromDate}T00:00:00` : null,
+            date_to: toDate ? `${toDate}T23:59:59` : null
+        };
         if (scoreFilter !== 'all') {
-            const [min, max] = scoreFilter.split('-').map(Number);
-            items = items.filter(x => {
-                const score = Number(x.match_score || 0);
-                return score >= min && score <= max;
-            });
-        }
-        if (fromDate) {
-            const from = new Date(fromDate);
-            items = items.filter(x => new Date(x.timestamp) >= from);
-        }
-        if (toDate) {
-            const to = new Date(toDate);
-            items = items.filter(x => new Date(x.timestamp) <= to);
+            [filters.min_score, filters.max_score] = scoreFilter.split('-');
         }
-
-        // 🔹 Sort newest first
-        items.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+        const page = await fetchHistoryPage(filters, cursor);
+        const items = loadedItems.concat(page.items || []);
 
         if (items.length === 0) {
             historyTable.innerHTML = '<div class="text-center p-4">No analysis history found</div>';
@@ -875,6 +837,10 @@ async function loadHistory_report() {
             ]
         });
 
+        if (page.next_cursor) {
+            appendLoadMore(historyTable, () => loadHistory_report(page.next_cursor, items));
+        }
+
     } catch (e) {
         console.error('Error loading history:', e);
         historyTable.innerHTML = '<div class="alert alert-danger">Failed to load history</div>';
@@ -889,12 +855,13 @@ function formatDate(date, format = 'dd-mm-yyyy') {
 }
 
 
-function populateClientAndJDFilters() {
+async function populateClientAndJDFilters() {
     const clientFilter = document.getElementById('client_filter');
     const jdFilter = document.getElementById('jd_filter');
 
-    const clients = [...new Set(analysisHistory.map(x => x.client_name).filter(Boolean))];
-    const jds = [...new Set(analysisHistory.map(x => x.jd_title).filter(Boolean))];
+    if (!historyStats) await loadAnalysisHistory();
+    const clients = historyStats ? historyStats.clients : [];
+    const jds = historyStats ? historyStats.jd_titles : [];
 
     clients.forEach(c => {
         const opt = document.createElement('option');
@@ -1983,18 +1950,44 @@ async function uploadUserProfile(id) {
         }
 
 
-        // Load analysis history
+        // Load analysis history: one keyset page of table columns at a time
+        async function fetchHistoryPage(filters = {}, cursor = null) {
+            const params = new URLSearchParams({ limit: '50', view: 'list' });
+            Object.entries(filters).forEach(([key, value]) => {
+                if (value !== null && value !== undefined && value !== '') params.set(key, value);
+            });
+            if (cursor) params.set('cursor', cursor);
+            const res = await apiFetch(`${API_BASE_URL}/history?${params}`);
+            if (!res.ok) throw new Error('Failed to load history');
+            return await res.json();
+        }
+
+        // Counts for the cards and chart, computed server-side
+        async function fetchHistoryStats(year = null) {
+            const query = year ? `?year=${year}` : '';
+            const res = await apiFetch(`${API_BASE_URL}/history/stats${query}`);
+            if (!res.ok) throw new Error('Failed to load history stats');
+            return await res.json();
+        }
+
+        function appendLoadMore(container, onLoadMore) {
+            const button = document.createElement('button');
+            button.className = 'btn btn-outline-primary btn-sm d-block mx-auto my-3';
+            button.textContent = 'Load more';
+            button.addEventListener('click', () => {
+                button.disabled = true;
+                onLoadMore();
+            });
+            container.appendChild(button);
+        }
+
         async function loadAnalysisHistory() {
     try {
-        // Fetch resume analyses history
-        const res = await apiFetch(`${API_BASE_URL}/history`);
-        if (res.ok) {
-            analysisHistory = await res.json();
-
-            // Update analyses count safely
-            const analysesEl = document.getElementById("analysesCount");
-            if (analysesEl) analysesEl.textContent = analysisHistory.length;
-        }
+        historyStats = await fetchHistoryStats();
+
+        // Update analyses count safely
+        const analysesEl = document.getElementById("analysesCount");
+        if (analysesEl) analysesEl.textContent = historyStats.total;
 
         // Fetch clients
         const clientsResponse = await apiFetch(`${API_BASE_URL}/clients/table-data`);
@@ -2014,41 +2007,25 @@ async function uploadUserProfile(id) {
 
 
         // History functionality
-        async function loadHistory() {
+        async function loadHistory(cursor = null, loadedItems = []) {
             const historyTable = document.getElementById('history_table');
             const userFilter = document.getElementById('user_filter');
 
             if (!historyTable) return;
 
-            historyTable.innerHTML = '<div class="text-center p-4">Loading history...</div>';
+            if (!cursor) historyTable.innerHTML = '<div class="text-center p-4">Loading history...</div>';
 
             try {
-                let items = analysisHistory;
-
                 const selectedUserId = userFilter ? userFilter.value : 'all';
 
-                // 🔹 Apply user filter
-               
-                if (selectedUserId !== 'all') {
-                    // Show only selected user’s history (admin or regular user)
-                    items = items.filter(x => x.created_by === selectedUserId);
-                }
-
-
-
-                // 🔹 Apply current month filter
+                // 🔹 Current month, newest first (filtered and sorted server-side)
                 const now = new Date();
-                const currentMonth = now.getMonth();  // 0 = Jan
-                const currentYear = now.getFullYear();
-
-                items = items.filter(x => {
-                    if (!x.timestamp) return false;
-                    const date = new Date(x.timestamp);
-                    return date.getMonth() === currentMonth && date.getFullYear() === currentYear;
-                });
-
-                // 🔹 Sort newest first
-                items.sort((a, b) => (a.timestamp || '').localeCompare(b.timestamp || '')).reverse();
+                const monthStart = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}-01T00:00:00`;
+                const page = await fetchHistoryPage({
+                    date_from: monthStart,
+                    created_by: selectedUserId !== 'all' ? selectedUserId : null
+                }, cursor);
+                const items = loadedItems.concat(page.items || []);
 
                 if (items.length === 0) {
                     historyTable.innerHTML = '<div class="text-center p-4">No analysis history found for this month</div>';
@@ -2271,6 +2248,10 @@ async function uploadUserProfile(id) {
                     ]
                 });
 
+                if (page.next_cursor) {
+                    appendLoadMore(historyTable, () => loadHistory(page.next_cursor, items));
+                }
+
             } catch (e) {
                 console.error('Error loading history:', e);
                 historyTable.innerHTML = '<div class="alert alert-danger">Failed to load history</div>';
@@ -0,0 +1,212 @@
+import os
+import hashlib
+import asyncio
+import tempfile
+import mimetypes
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional
+
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from mongodb.mongodb_db import get_db
+
+# ---------- RESUME BLOB STORE ----------
+# Uploaded files are stored once per content hash instead of inside every analysis_history
+# record. resume_blob_refs holds one document per blob (size, MIME type, backend, refcount);
+# the bytes live in GridFS (shared by every instance) or, with BLOB_STORE_BACKEND=disk, in a
+# local directory sharded by hash prefix (served with sendfile where the server supports it).
+# The first upload of some content inserts its ref in the "writing" state and is the only one
+# that writes the bytes; concurrent uploads of the same content wait for "ready", and take the
+# write over if the claim is older than BLOB_WRITE_CLAIM_SECONDS (the writer died).
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "gridfs")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+BLOB_GRIDFS_BUCKET = os.getenv("BLOB_GRIDFS_BUCKET", "resume_blobs")
+BLOB_CHUNK_SIZE = int(os.getenv("BLOB_CHUNK_SIZE", str(255 * 1024)))
+BLOB_WRITE_CLAIM_SECONDS = int(os.getenv("BLOB_WRITE_CLAIM_SECONDS", "60"))
+BLOB_WRITE_POLL_SECONDS = 0.2
+BLOB_STATE_WRITING = "writing"
+BLOB_STATE_READY = "ready"
+
+_MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+}
+
+_gridfs_bucket = None
+
+
+def guess_mime_type(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return _MIME_TYPES.get(extension) or mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+
+def _blob_path(file_hash: str) -> str:
+    return os.path.join(BLOB_STORE_DIR, file_hash[:2], file_hash[2:4], file_hash)
+
+
+async def _get_bucket() -> AsyncIOMotorGridFSBucket:
+    global _gridfs_bucket
+    if _gridfs_bucket is None:
+        _gridfs_bucket = AsyncIOMotorGridFSBucket(await get_db(), bucket_name=BLOB_GRIDFS_BUCKET, chunk_size_bytes=BLOB_CHUNK_SIZE)
+    return _gridfs_bucket
+
+
+def _write_file_atomic(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+async def _write_blob(file_hash: str, content: bytes, backend: str) -> None:
+    if backend == "disk":
+        path = _blob_path(file_hash)
+        if not os.path.exists(path):
+            await asyncio.to_thread(_write_file_atomic, path, content)
+        return
+    bucket = await _get_bucket()
+    await bucket.upload_from_stream_with_id(file_hash, file_hash, content)
+
+
+async def _delete_blob_data(file_hash: str, backend: str) -> None:
+    if backend == "disk":
+        try:
+            await asyncio.to_thread(os.remove, _blob_path(file_hash))
+        except FileNotFoundError:
+            pass
+        return
+    bucket = await _get_bucket()
+    try:
+        await bucket.delete(file_hash)
+    except Exception as e:
+        print(f"Blob {file_hash} not deleted from GridFS: {e}")
+
+
+async def _write_claimed_blob(db, file_hash: str, content: bytes, backend: str) -> None:
+    """Write the bytes of a blob whose ref this call claimed, then mark it ready."""
+    try:
+        await _write_blob(file_hash, content, backend)
+    except Exception:
+        # Let a waiting upload of the same content take over right away
+        await db.resume_blob_refs.update_one(
+            {"_id": file_hash, "state": BLOB_STATE_WRITING}, {"$set": {"claimed_at": None}}
+        )
+        raise
+    await db.resume_blob_refs.update_one(
+        {"_id": file_hash}, {"$set": {"state": BLOB_STATE_READY}, "$unset": {"claimed_at": ""}}
+    )
+
+
+async def _wait_for_blob(db, file_hash: str, content: bytes) -> None:
+    """Wait until the upload that claimed the blob has written it; take over a stale claim."""
+    while True:
+        ref = await db.resume_blob_refs.find_one({"_id": file_hash}, {"state": 1, "claimed_at": 1, "backend": 1})
+        # Refs written before claims existed have no state and always have their bytes
+        if ref is None or ref.get("state", BLOB_STATE_READY) == BLOB_STATE_READY:
+            return
+        claimed_at = ref.get("claimed_at")
+        now = datetime.utcnow()
+        if claimed_at is None or now - claimed_at > timedelta(seconds=BLOB_WRITE_CLAIM_SECONDS):
+            taken = await db.resume_blob_refs.update_one(
+                {"_id": file_hash, "state": BLOB_STATE_WRITING, "claimed_at": claimed_at},
+                {"$set": {"claimed_at": now}}
+            )
+            if taken.modified_count:
+                backend = ref.get("backend", BLOB_STORE_BACKEND)
+                # Partial chunks of the writer that gave up
+                await _delete_blob_data(file_hash, backend)
+                await _write_claimed_blob(db, file_hash, content, backend)
+                return
+        await asyncio.sleep(BLOB_WRITE_POLL_SECONDS)
+
+
+async def put_blob(content: bytes, filename: str) -> Dict:
+    """
+    Store the upload (once per content) and take a reference on it.
+    Returns only once the bytes are stored, by this call or a concurrent one.
+    :return: {"file_hash", "file_size", "mime_type"} for the analysis record
+    """
+    try:
+        db = await get_db()
+        file_hash = hashlib.sha256(content).hexdigest()
+        now = datetime.utcnow()
+
+        # Claim and reference in one atomic upsert: only the call that inserts the ref writes
+        existing = await db.resume_blob_refs.find_one_and_update(
+            {"_id": file_hash},
+            {
+                "$inc": {"refcount": 1},
+                "$set": {"last_referenced_at": now},
+                "$setOnInsert": {
+                    "size": len(content),
+                    "mime_type": guess_mime_type(filename),
+                    "backend": BLOB_STORE_BACKEND,
+                    "state": BLOB_STATE_WRITING,
+                    "claimed_at": now,
+                    "created_at": now,
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        try:
+            if existing is None:
+                await _write_claimed_blob(db, file_hash, content, BLOB_STORE_BACKEND)
+            else:
+                await _wait_for_blob(db, file_hash, content)
+        except Exception:
+            await release_blob(file_hash)
+            raise
+
+        mime_type = (existing or {}).get("mime_type") or guess_mime_type(filename)
+        return {"file_hash": file_hash, "file_size": len(content), "mime_type": mime_type}
+
+    except Exception as e:
+        raise Exception(f"Blob store failed: {str(e)}")
+
+
+async def release_blob(file_hash: str) -> None:
+    """Drop one reference; the bytes are deleted with the last one."""
+    db = await get_db()
+    doc = await db.resume_blob_refs.find_one_and_update(
+        {"_id": file_hash},
+        {"$inc": {"refcount": -1}},
+        return_document=True
+    )
+    if doc is None or doc.get("refcount", 0) > 0:
+        return
+    deleted = await db.resume_blob_refs.delete_one({"_id": file_hash, "refcount": {"$lte": 0}})
+    if deleted.deleted_count:
+        await _delete_blob_data(file_hash, doc.get("backend", BLOB_STORE_BACKEND))
+
+
+async def get_blob_info(file_hash: str) -> Optional[Dict]:
+    db = await get_db()
+    return await db.resume_blob_refs.find_one({"_id": file_hash})
+
+
+def get_blob_path(info: Dict) -> Optional[str]:
+    """Local path of a disk-backed blob (for FileResponse/sendfile), None for GridFS."""
+    if info.get("backend") != "disk":
+        return None
+    path = _blob_path(info["_id"])
+    return path if os.path.exists(path) else None
+
+
+async def iter_blob_chunks(file_hash: str) -> AsyncIterator[bytes]:
+    """Stream a GridFS blob chunk by chunk without loading the whole file."""
+    bucket = await _get_bucket()
+    grid_out = await bucket.open_download_stream(file_hash)
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,38 @@
+import asyncio
+import inspect
+
+import pytest
+
+genai = pytest.importorskip("google.generativeai")
+
+from gemini import gemini_utils
+
+
+def test_model_is_bound_to_its_own_key():
+    model = gemini_utils._build_gemini_model("key-a", "gemini-2.5-flash")
+    assert model._async_client is not None and model._client is not None
+    other = gemini_utils._build_gemini_model("key-b", "gemini-2.5-flash")
+    assert other._async_client is not model._async_client
+
+
+def test_sdk_only_falls_back_to_the_global_client_when_unset():
+    # The per-key clients rely on this; a release that always takes the global client breaks them
+    for method in (genai.GenerativeModel.generate_content_async, genai.GenerativeModel.count_tokens_async):
+        assert "if self._async_client is None" in inspect.getsource(method)
+    assert "if self._client is None" in inspect.getsource(genai.GenerativeModel.generate_content)
+
+
+def test_unsupported_sdk_version_fails_at_build_time(monkeypatch):
+    monkeypatch.setattr(genai, "__version__", "1.0.0")
+    with pytest.raises(Exception, match="not supported"):
+        gemini_utils._build_gemini_model("key-a", "gemini-2.5-flash")
+
+
+def test_semaphore_registry_is_bounded(monkeypatch):
+    monkeypatch.setattr(gemini_utils, "_gemini_semaphores", gemini_utils.LRUCache(maxsize=2))
+
+    async def _create():
+        return [gemini_utils._gemini_semaphore(f"key-{i}") for i in range(5)]
+
+    asyncio.run(_create())
+    assert len(gemini_utils._gemini_semaphores) == 2
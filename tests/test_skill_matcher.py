@@ -0,0 +1,65 @@
+import time
+
+from utils.skill_matcher import match_skills, skill_variants
+
+
+def _found(resume_text, skills):
+    return match_skills(resume_text, skills, [])["matching_skills"]
+
+
+def test_word_boundaries():
+    assert _found("Built SPAs in JavaScript", ["Java"]) == []
+    assert _found("Frontend in React", ["R"]) == []
+    assert _found("Backend in Java, frontend in React", ["Java"]) == ["Java"]
+    assert _found("Statistics in R.", ["R"]) == ["R"]
+
+
+def test_plus_and_hash_extend_a_name():
+    assert _found("10 years of C++ and C#", ["C"]) == []
+    assert _found("10 years of C++ and C#", ["C++", "C#"]) == ["C++", "C#"]
+    assert _found("Embedded C, some Python", ["C"]) == ["C"]
+
+
+def test_short_names_do_not_match_inside_hyphenated_words():
+    assert _found("Owned the go-to-market plan", ["Go"]) == []
+    assert _found("Services in Go (gRPC)", ["Go"]) == ["Go"]
+    assert _found("Python-based ETL tooling", ["Python"]) == ["Python"]
+
+
+def test_synonyms_count_as_the_jd_skill():
+    assert "k8s" in skill_variants("Kubernetes")
+    assert _found("Deployed on k8s with AWS", ["Kubernetes", "Amazon Web Services"]) == [
+        "Kubernetes", "Amazon Web Services"
+    ]
+    assert _found("Node.js and ReactJS", ["nodejs", "React"]) == ["nodejs", "React"]
+
+
+def test_line_wrapped_multi_word_skills():
+    text = "Applied Machine\nLearning and Natural  Language\r\n  Processing"
+    assert _found(text, ["Machine Learning", "Natural Language Processing"]) == [
+        "Machine Learning", "Natural Language Processing"
+    ]
+
+
+def test_scores_and_missing_lists():
+    result = match_skills("Python, Docker, SQL", ["Python", "Kubernetes"], ["Docker", "Terraform"])
+    assert result["match_score"] == 50
+    assert result["missing_primary_skills"] == ["Kubernetes"]
+    assert result["matching_secondary_skills"] == ["Docker"]
+    assert result["missing_secondary_skills"] == ["Terraform"]
+    assert match_skills("Python", [], [])["match_score"] == 0
+
+
+def test_two_page_resume_under_50ms():
+    resume = ("Senior engineer building Python microservices on AWS with Docker, Kubernetes, "
+              "PostgreSQL and React. Led CI/CD migration and mentored the team.\n") * 60
+    primary = ["Python", "Java", "Go", "Kubernetes", "Docker", "AWS", "Terraform", "React",
+               "Angular", "PostgreSQL", "MongoDB", "Kafka", "Redis", "CI/CD", "Microservices"]
+    secondary = ["GraphQL", "Scala", "Spark", "Airflow", "Machine Learning", "C++", "Rust"]
+    match_skills(resume, primary, secondary)
+
+    runs = 20
+    started = time.perf_counter()
+    for _ in range(runs):
+        match_skills(resume, primary, secondary)
+    assert (time.perf_counter() - started) / runs < 0.05
@@ -0,0 +1,106 @@
+from parsing.text_compaction import (
+    PAGE_SEPARATOR,
+    apply_token_budget,
+    compact_resume_text,
+    estimate_tokens,
+)
+
+
+def _pages(*pages):
+    return PAGE_SEPARATOR.join("\n".join(lines) for lines in pages)
+
+
+THREE_ROLE_RESUME = _pages(
+    [
+        "Jane Doe | Resume",
+        "jane@example.com",
+        "Experience",
+        "Senior Engineer, Acme",
+        "06/2018 - 02/2021",
+        "Responsibilities:",
+        "Built the billing platform",
+        "Page 1 of 2",
+        "Confidential",
+    ],
+    [
+        "Jane Doe | Resume",
+        "Engineer, Globex",
+        "01/2016 - 05/2018",
+        "Responsibilities:",
+        "Maintained the payments API",
+        "Junior Engineer, Initech",
+        "03/2014 - 12/2015",
+        "Responsibilities:",
+        "Wrote internal tools",
+        "Page 2 of 2",
+        "Confidential",
+    ],
+)
+
+
+def test_keeps_every_role_date_range():
+    text = compact_resume_text(THREE_ROLE_RESUME, page_count=2)
+    for dates in ("06/2018 - 02/2021", "01/2016 - 05/2018", "03/2014 - 12/2015"):
+        assert dates in text
+
+
+def test_keeps_repeated_labels_inside_pages():
+    text = compact_resume_text(THREE_ROLE_RESUME, page_count=2)
+    assert text.count("Responsibilities:") == 3
+
+
+def test_drops_running_header_and_footer_after_first_page():
+    text = compact_resume_text(THREE_ROLE_RESUME, page_count=2)
+    assert text.count("Jane Doe | Resume") == 1
+    assert text.count("Confidential") == 1
+    assert "Page 1 of 2" not in text
+
+
+def test_single_page_keeps_repeated_lines():
+    text = compact_resume_text("Acme\nfoo\nAcme\nbar\nAcme", page_count=1)
+    assert text.count("Acme") == 3
+
+
+def test_edge_line_on_one_page_only_is_kept():
+    text = compact_resume_text(_pages(["Summary", "a"], ["Skills", "b"], ["Summary", "c"], ["Projects", "d"]), page_count=4)
+    assert text.count("Summary") == 2
+
+
+def test_collapses_blank_lines_borders_and_duplicate_paragraphs():
+    paragraph = "Led a team of five engineers delivering a data platform."
+    text = compact_resume_text(f"Skills\n\n\n\n+-----+-----+\nPython   |  SQL\n{paragraph}\n\n{paragraph}")
+    assert text == f"Skills\n\nPython | SQL\n{paragraph}"
+
+
+def test_unwraps_llama_json():
+    raw = '[{"pages": [{"text": "Jane Doe"}, {"text": "Experience"}]}]'
+    assert compact_resume_text(raw) == "Jane Doe\n\nExperience"
+
+
+def test_budget_leaves_short_text_alone():
+    assert apply_token_budget("Experience\nAcme", 100) == ("Experience\nAcme", [])
+    assert apply_token_budget("x" * 1000, 0) == ("x" * 1000, [])
+
+
+def test_budget_drops_low_value_sections_first():
+    text = "\n".join([
+        "Experience",
+        "Engineer at Acme " * 20,
+        "Hobbies",
+        "Chess and hiking " * 20,
+        "Declaration",
+        "I hereby declare " * 20,
+    ])
+    budget = estimate_tokens("Experience\n" + "Engineer at Acme " * 20) + 5
+    trimmed, dropped = apply_token_budget(text, budget)
+    assert dropped == ["declaration", "hobbies"]
+    assert "Engineer at Acme" in trimmed
+    assert "Chess" not in trimmed and "declare" not in trimmed
+
+
+def test_budget_truncates_core_text_at_a_line_break():
+    text = "\n".join(f"Skill line {i}" for i in range(200))
+    trimmed, dropped = apply_token_budget(text, 50)
+    assert dropped == ["truncated"]
+    assert estimate_tokens(trimmed) <= 50
+    assert trimmed.endswith(tuple(f"Skill line {i}" for i in range(200)))
@@ -0,0 +1,208 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from dateutil import parser as date_parser
+
+# ---------- EXPERIENCE CALCULATOR ----------
+# Deterministic replacement for the date arithmetic the prompt used to ask Gemini for.
+# Dates are month indexes (year * 12 + month - 1), so every duration is integer month math.
+#
+# Rules (same as the former prompt's "Continuous and Overlap Month Handling Rules"):
+#   - duration of a role = end month - start month
+#   - a role that starts the month right after the previous role ended (no gap) gets one extra
+#     month, so a continuous career adds up to last end - first start
+#   - roles that share a month (end month == next start month) or overlap use the plain duration
+#   - internships are excluded from totals, continuity and hopper detection
+#   - frequent hopper: any non-internship role of 1-11 months
+
+PRESENT_WORDS = {"present", "current", "currently", "now", "till date", "till now", "to date", "ongoing", "today"}
+
+_MONTH_YEAR_RE = re.compile(r"^(\d{1,2})\s*[/\-.]\s*(\d{4})$")
+_YEAR_MONTH_RE = re.compile(r"^(\d{4})\s*[/\-.]\s*(\d{1,2})$")
+_YEAR_RE = re.compile(r"^(\d{4})$")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _is_present(value: Optional[str]) -> bool:
+    text = (value or "").strip().strip(".,").lower()
+    return text in PRESENT_WORDS or text.startswith("present")
+
+
+def _month_index(year: int, month: int) -> Optional[int]:
+    if not (1 <= month <= 12 and 1900 <= year <= 2100):
+        return None
+    return year * 12 + month - 1
+
+
+def today_month_index(today: Optional[datetime] = None) -> int:
+    today = today or datetime.now()
+    return today.year * 12 + today.month - 1
+
+
+def parse_month(value: Optional[str], is_end: bool = False, today: Optional[datetime] = None) -> Optional[int]:
+    """
+    Parse a resume date ("03/2021", "2021-03", "Mar 2021", "March, 2021", "2021", "Present").
+    A bare year means January for a start date and December for an end date.
+    :return: Month index, or None if the value is not a usable date
+    """
+    text = (value or "").strip().strip(".,").lower()
+    if not text or text in {"n/a", "na", "not specified", "dates not available"}:
+        return None
+    if _is_present(text):
+        return today_month_index(today)
+
+    match = _MONTH_YEAR_RE.match(text)
+    if match:
+        return _month_index(int(match.group(2)), int(match.group(1)))
+    match = _YEAR_MONTH_RE.match(text)
+    if match:
+        return _month_index(int(match.group(1)), int(match.group(2)))
+    match = _YEAR_RE.match(text)
+    if match:
+        return _month_index(int(match.group(1)), 12 if is_end else 1)
+
+    # Free-form: parse twice with different defaults to tell which parts were really present
+    try:
+        first = date_parser.parse(text, default=datetime(2000, 1, 1), fuzzy=True)
+        second = date_parser.parse(text, default=datetime(2001, 12, 1), fuzzy=True)
+    except (ValueError, OverflowError):
+        return None
+    if first.year != second.year:
+        return None
+    month = first.month if first.month == second.month else (12 if is_end else 1)
+    return _month_index(first.year, month)
+
+
+def format_month(index: int) -> str:
+    return f"{index % 12 + 1:02d}/{index // 12}"
+
+
+def format_months(months: int) -> str:
+    """'X years Y months', 'X years' or 'Y months'."""
+    years, months = divmod(max(0, months), 12)
+    if years == 0:
+        return f"{months} months"
+    if months == 0:
+        return f"{years} years"
+    return f"{years} years {months} months"
+
+
+def _required_months(
+    required_experience: Any,
+    min_experience: Any = None,
+    max_experience: Any = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Required experience range in months from "3+", "2-5", "4", "3-5 years"; falls back to
+    the JD's min/max_experience. (None, None) if nothing usable is given.
+    """
+    text = str(required_experience or "").strip()
+    numbers = [float(n) for n in _NUMBER_RE.findall(text)]
+    if numbers:
+        if len(numbers) >= 2 and "+" not in text:
+            return int(numbers[0] * 12), int(numbers[1] * 12)
+        return int(numbers[0] * 12), None
+
+    try:
+        low = float(min_experience or 0)
+        high = float(max_experience or 0)
+    except (TypeError, ValueError):
+        return None, None
+    if not low and not high:
+        return None, None
+    return int(low * 12), int(high * 12) if high else None
+
+
+def calculate_experience(
+    positions: List[Dict[str, Any]],
+    required_experience: Any = None,
+    min_experience: Any = None,
+    max_experience: Any = None,
+    today: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Compute durations, totals and flags from the raw start/end dates of each position.
+    :param positions: dicts with "start_date"/"end_date" as written in the resume and "is_internship";
+                      other keys are kept
+    :return: experience_analysis fields: positions (with duration, duration_length,
+             duration_months, duration_missing), total_months, total_experience,
+             experience_match, frequent_hopper, is_fresher, positions_with_missing_dates,
+             experience_status
+    """
+    enriched = []
+    for position in positions or []:
+        position = dict(position)
+        start = parse_month(position.get("start_date"), today=today)
+        end = parse_month(position.get("end_date"), is_end=True, today=today)
+        is_present = _is_present(position.get("end_date"))
+        if start is None or end is None or end < start:
+            position.update({
+                "duration": "Dates not available",
+                "duration_length": "N/A",
+                "duration_months": None,
+                "duration_missing": True,
+            })
+        else:
+            position.update({
+                "duration": f"{format_month(start)} - {'Present' if is_present else format_month(end)}",
+                "duration_months": end - start,
+                "duration_missing": False,
+                "_start": start,
+                "_end": end,
+            })
+        enriched.append(position)
+
+    # Continuity: a role starting the month after the previous one ended gets the gap month
+    dated = sorted(
+        (p for p in enriched if not p["duration_missing"] and not p.get("is_internship", False)),
+        key=lambda p: (p["_start"], p["_end"])
+    )
+    for previous, current in zip(dated, dated[1:]):
+        if current["_start"] == previous["_end"] + 1:
+            current["duration_months"] += 1
+
+    for position in enriched:
+        if not position["duration_missing"]:
+            position["duration_length"] = format_months(position["duration_months"])
+        position.pop("_start", None)
+        position.pop("_end", None)
+
+    total_months = sum(p["duration_months"] for p in dated)
+    frequent_hopper = any(1 <= p["duration_months"] <= 11 for p in dated)
+    missing = sum(1 for p in enriched if p["duration_missing"])
+
+    if not enriched:
+        status = "Fresher (no work experience found)"
+    elif missing == 0:
+        status = "Complete dates available"
+    elif missing == len(enriched):
+        status = "No dates available for any position"
+    else:
+        status = f"Partial dates available ({missing} positions missing dates)"
+
+    if not enriched:
+        total_experience = "0 years"
+    elif dated:
+        total_experience = format_months(total_months)
+    elif all(p.get("is_internship", False) for p in enriched):
+        total_experience = "0 years"
+    else:
+        total_experience = "Unable to Calculate (Missing Duration)"
+
+    low, high = _required_months(required_experience, min_experience, max_experience)
+    if low is None:
+        experience_match = False
+    else:
+        experience_match = total_months >= low and (high is None or total_months <= high)
+
+    return {
+        "positions": enriched,
+        "total_months": total_months,
+        "total_experience": total_experience,
+        "experience_match": experience_match,
+        "frequent_hopper": frequent_hopper,
+        "is_fresher": not enriched,
+        "positions_with_missing_dates": missing,
+        "experience_status": status,
+    }
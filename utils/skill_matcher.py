@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from cache.memory_cache import LRUCache
+
+# ---------- LOCAL SKILL MATCHING ----------
+# JD skills (plus their synonyms) are compiled into one Aho-Corasick automaton, so a resume is
+# scanned once no matter how many skills the JD lists. A hit only counts on word boundaries,
+# so "Java" does not match inside "JavaScript", "R" not inside "React" and "C" not inside "C++".
+# Short names (up to SHORT_SKILL_MAX_LENGTH characters) also do not match inside hyphenated
+# words ("Go" in "Go-to-market").
+
+# Each group is one skill: the canonical name first, then its aliases.
+# Extend or override with a JSON file ({"Canonical": ["alias", ...]}) at SKILL_SYNONYMS_FILE.
+DEFAULT_SKILL_SYNONYMS: Dict[str, List[str]] = {
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "Kubernetes": ["k8s"],
+    "Node.js": ["nodejs", "node js"],
+    "React": ["react.js", "reactjs"],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs"],
+    "Next.js": ["nextjs"],
+    "Python": ["python3", "py"],
+    "Golang": ["go lang"],
+    "C#": ["c sharp", "csharp"],
+    "C++": ["cpp"],
+    ".NET": ["dotnet", "dot net", "asp.net", ".net core"],
+    "PostgreSQL": ["postgres", "psql"],
+    "MongoDB": ["mongo"],
+    "MySQL": ["my sql"],
+    "SQL Server": ["mssql", "ms sql"],
+    "Amazon Web Services": ["aws"],
+    "Google Cloud Platform": ["gcp", "google cloud"],
+    "Microsoft Azure": ["azure"],
+    "Machine Learning": ["ml"],
+    "Deep Learning": ["dl"],
+    "Artificial Intelligence": ["ai"],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": ["opencv"],
+    "Continuous Integration / Continuous Delivery": ["ci/cd", "cicd", "ci cd"],
+    "Docker": ["dockerfile", "docker compose"],
+    "Spring Boot": ["springboot"],
+    "REST APIs": ["restful", "rest api", "restful apis", "restful services"],
+    "Microservices": ["micro services", "microservice"],
+    "Power BI": ["powerbi"],
+    "Scikit-learn": ["sklearn", "scikit learn"],
+    "TensorFlow": ["tensorflow2", "tf.keras"],
+    "PyTorch": ["torch"],
+    "User Experience": ["ux"],
+    "User Interface": ["ui"],
+}
+SKILL_SYNONYMS_FILE = os.getenv("SKILL_SYNONYMS_FILE")
+SKILL_MATCHER_CACHE_SIZE = int(os.getenv("SKILL_MATCHER_CACHE_SIZE", "128"))
+SHORT_SKILL_MAX_LENGTH = 2
+# Characters that extend a name ("C" + "++", "C" + "#") rather than end it
+_NAME_SUFFIX_CHARS = "+#"
+
+_compiled_matchers = LRUCache(maxsize=SKILL_MATCHER_CACHE_SIZE)
+
+
+def _normalize(term: str) -> str:
+    return " ".join((term or "").lower().split())
+
+
+def _load_synonym_groups() -> List[Set[str]]:
+    table = dict(DEFAULT_SKILL_SYNONYMS)
+    if SKILL_SYNONYMS_FILE:
+        try:
+            with open(SKILL_SYNONYMS_FILE, "r", encoding="utf-8") as f:
+                table.update(json.load(f))
+        except Exception as e:
+            print(f"Skill synonyms not loaded from {SKILL_SYNONYMS_FILE}: {e}")
+    return [{_normalize(canonical), *(_normalize(a) for a in aliases)} for canonical, aliases in table.items()]
+
+
+_SYNONYM_GROUPS = _load_synonym_groups()
+_GROUP_BY_TERM: Dict[str, Set[str]] = {term: group for group in _SYNONYM_GROUPS for term in group}
+
+
+def skill_variants(skill: str) -> Set[str]:
+    """Every surface form that counts as the given JD skill."""
+    term = _normalize(skill)
+    return set(_GROUP_BY_TERM.get(term, ())) | {term}
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton over lower-cased text; values are attached per pattern."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern: str, value: Any) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str):
+        """Yield (start, end, value) for every occurrence, end exclusive."""
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield index - length + 1, index + 1, value
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    if before.isalnum() or after.isalnum() or after in _NAME_SUFFIX_CHARS:
+        return False
+    if end - start <= SHORT_SKILL_MAX_LENGTH:
+        # "go-to-market", "objective-c"
+        if after == "-" and text[end + 1:end + 2].isalnum():
+            return False
+        if before == "-" and start > 1 and text[start - 2].isalnum():
+            return False
+    return True
+
+
+def _matcher_for(primary_skills: List[str], secondary_skills: List[str]) -> AhoCorasick:
+    key = hashlib.sha256(json.dumps([primary_skills, secondary_skills]).encode("utf-8")).hexdigest()
+    matcher = _compiled_matchers.get(key)
+    if matcher is None:
+        patterns = []
+        for kind, skills in (("primary", primary_skills), ("secondary", secondary_skills)):
+            for skill in skills:
+                for variant in skill_variants(skill):
+                    patterns.append((variant, (kind, skill)))
+        matcher = AhoCorasick(patterns)
+        _compiled_matchers.set(key, matcher)
+    return matcher
+
+
+def match_skills(resume_text: str, primary_skills: Optional[List[str]], secondary_skills: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Single pass over the resume for all JD skills.
+    match_score is the share of primary skills found (0-100); secondary skills do not count.
+    :return: skill_analysis dict (same keys as the Gemini result)
+    """
+    primary = [s for s in dict.fromkeys(primary_skills or []) if s and s.strip()]
+    secondary = [s for s in dict.fromkeys(secondary_skills or []) if s and s.strip() and s not in primary]
+    # Same single-space form as the patterns, so line-wrapped multi-word skills still match
+    text = _normalize(resume_text)
+
+    found = {"primary": set(), "secondary": set()}
+    if primary or secondary:
+        for start, end, (kind, skill) in _matcher_for(primary, secondary).iter_matches(text):
+            if skill not in found[kind] and _is_boundary(text, start, end):
+                found[kind].add(skill)
+
+    return {
+        "match_score": round(100 * len(found["primary"]) / len(primary)) if primary else 0,
+        "matching_skills": [s for s in primary if s in found["primary"]],
+        "missing_primary_skills": [s for s in primary if s not in found["primary"]],
+        "matching_secondary_skills": [s for s in secondary if s in found["secondary"]],
+        "missing_secondary_skills": [s for s in secondary if s not in found["secondary"]],
+    }
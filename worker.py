@@ -0,0 +1,89 @@
+"""
+Standalone analysis worker.
+
+Consumes the Mongo-backed analysis_jobs queue without loading the web app, so
+analysis capacity scales independently of the API tier:
+
+    python -m worker --concurrency 8
+
+Web nodes run no consumers by default (ANALYSIS_JOB_WORKERS=0): they only count
+pages for the quota check, enqueue and serve reads. Normalization, text extraction
+and the analysis itself all run here.
+SIGTERM/SIGINT drains: no new jobs are claimed and in-flight jobs get
+ANALYSIS_WORKER_DRAIN_TIMEOUT seconds to finish before they are cancelled
+(their leases then expire and another worker retries them).
+"""
+import os
+import signal
+import asyncio
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from mongodb.mongodb_db import get_db
+from parsing.libreoffice_pool import shutdown_libreoffice_pool
+from parsing.document_service import shutdown_document_pool
+from mongodb.audit_buffer import shutdown_audit_buffer
+from pipeline.job_queue import (
+    new_worker_id,
+    start_job_workers,
+    remove_worker_heartbeat
+)
+from mongodb.indexes import reconcile_indexes_on_startup
+
+load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+WORKER_CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "4"))
+WORKER_DRAIN_TIMEOUT_SECONDS = int(os.getenv("ANALYSIS_WORKER_DRAIN_TIMEOUT", "60"))
+
+
+async def run_worker(concurrency: int) -> None:
+    await get_db()
+    try:
+        await reconcile_indexes_on_startup()
+    except Exception as e:
+        print(f"Indexes not reconciled: {e}")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+
+    worker_id = new_worker_id()
+    tasks = start_job_workers(concurrency, stop_event, kind="worker", worker_id=worker_id)
+    print(f"Analysis worker {worker_id} started with concurrency {concurrency}")
+
+    await stop_event.wait()
+    print(f"Analysis worker {worker_id} draining...")
+    _, pending = await asyncio.wait(tasks, timeout=WORKER_DRAIN_TIMEOUT_SECONDS)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    try:
+        await remove_worker_heartbeat(worker_id)
+    except Exception:
+        pass
+    await shutdown_libreoffice_pool()
+    shutdown_document_pool()
+    await shutdown_audit_buffer()
+    print(f"Analysis worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume analysis queue worker")
+    parser.add_argument(
+        "--concurrency", type=int, default=WORKER_CONCURRENCY,
+        help="Number of jobs processed at the same time"
+    )
+    args = parser.parse_args()
+    asyncio.run(run_worker(max(1, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()